@@ -1,4 +1,8 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -20,6 +24,9 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# shared_transaction() 안에서 get_session()이 공유할 연결 (태스크별 컨텍스트)
+_shared_connection: ContextVar[Optional[Connection]] = ContextVar("shared_connection", default=None)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -32,5 +39,30 @@ def get_session():
 
     Prefer using `with SessionLocal() as db:` in services to ensure timely close.
     This helper exists for rare cases where a plain function call is desired.
+    Inside `shared_transaction()` the session joins the shared transaction:
+    its commit() only releases a SAVEPOINT and the outer COMMIT happens once.
     """
+    conn = _shared_connection.get()
+    if conn is not None:
+        return SessionLocal(bind=conn, join_transaction_mode="create_savepoint")
     return SessionLocal()
+
+@contextmanager
+def shared_transaction() -> Iterator[Connection]:
+    """Run every get_session() in this context on one connection and transaction.
+
+    Each session still commits or rolls back its own work as a SAVEPOINT, so
+    one failing call does not undo the others; the transaction commits when
+    the block exits (and rolls back if it raises).
+    """
+    conn = _shared_connection.get()
+    if conn is not None:
+        yield conn
+        return
+    with engine.connect() as conn:
+        with conn.begin():
+            token = _shared_connection.set(conn)
+            try:
+                yield conn
+            finally:
+                _shared_connection.reset(token)
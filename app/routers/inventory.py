@@ -4,6 +4,7 @@ from app.auth import get_current_active_user
 from app.models import User
 from app.schemas.inventory import InventoryItem, InventoryItemCreate, InventoryItem as InventoryItemSchema, InventoryPlaceRequest
 from app.services.inventory_service import InventoryService
+from app.services.occupancy import PlacementBlocked
 import json
 
 
@@ -52,6 +53,8 @@ async def place_from_inventory(
             rotation=payload.rotation,
         )
         return {"status": "ok", "object_id": obj.id}
+    except PlacementBlocked as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
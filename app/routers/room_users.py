@@ -309,6 +309,11 @@ async def leave_room(
 }
 ```
 
+## 이동 제한
+WebSocket과 같은 규칙을 따릅니다. 방 밖의 좌표는 방 안으로 당겨지고, 벽/오브젝트 셀로는
+갈 수 없어 막히지 않은 축으로만 이동하거나 제자리에 머뭅니다. 응답의 `x`, `y`가 실제 위치입니다.
+현재 위치를 알 수 없는데 목표 셀이 막혀 있으면 400을 반환합니다.
+
 ## 실시간 위치 업데이트
 WebSocket을 통해 실시간으로 위치를 업데이트할 수도 있습니다:
 ```javascript
@@ -344,6 +349,16 @@ ws.send(JSON.stringify({
                 }
             }
         },
+        400: {
+            "description": "막힌 위치",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Position is blocked"
+                    }
+                }
+            }
+        },
         401: {
             "description": "인증 필요",
             "content": {
@@ -373,4 +388,8 @@ async def update_position(
     current_user: User = Depends(get_current_active_user)
 ):
     """Update user position in a room"""
+    # WebSocket update_position과 같은 규칙 – 방 밖이나 벽/오브젝트 위로는 갈 수 없다
+    x, y = room_service.clamp_position(current_user.id, room_id, x, y)
+    if not room_service.occupancy(room_id).walkable(x, y):
+        raise HTTPException(status_code=400, detail="Position is blocked")
     return await room_service.update_user_position(current_user.id, room_id, x, y)
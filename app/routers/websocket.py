@@ -1,5 +1,7 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, Depends
+from app.models import User
 from app.services.websocket_service import WebSocketService
+from app.auth import get_current_active_user
 
 router = APIRouter()
 
@@ -9,3 +11,14 @@ websocket_service = WebSocketService()
 async def websocket_endpoint(websocket: WebSocket, token: str = Query(...)):
     """WebSocket endpoint for real-time communication"""
     await websocket_service.handle_websocket(websocket, token)
+
+@router.get("/ws/stats",
+    summary="WebSocket 송신 큐 상태",
+    description="연결별(사용자·방 ID 없이) 송신 큐 깊이, 전송/드롭/병합 횟수와 이벤트별 속도 제한 횟수를 조회합니다. 느린 클라이언트를 찾는 데 사용합니다."
+)
+async def websocket_stats(current_user: User = Depends(get_current_active_user)):
+    """Get per-connection outbound queue statistics"""
+    return {
+        "connections": websocket_service.manager.queue_stats(),
+        "rate_limited": websocket_service.rate_limited,
+    }
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Union
 from enum import Enum
 from datetime import datetime
 from app.models import ObjectType, ActionType
@@ -9,8 +9,12 @@ class WebSocketEvent(str, Enum):
     JOIN_ROOM = "join_room"
     LEAVE_ROOM = "leave_room"
     UPDATE_POSITION = "update_position"
+    MOVE_TO = "move_to"
+    MOVE_INTENT = "move_intent"
     SEND_MESSAGE = "send_message"
     USE_TOOL = "use_tool"
+    BATCH = "batch"
+    PONG = "pong"
     # WebRTC signaling
     RTC_JOIN = "rtc_join"
     RTC_LEAVE = "rtc_leave"
@@ -19,7 +23,25 @@ class WebSocketEvent(str, Enum):
     RTC_ICE_CANDIDATE = "rtc_ice_candidate"
     USER_JOINED = "user_joined"
     USER_LEFT = "user_left"
+    USERS_LEFT = "users_left"
     POSITION_UPDATED = "position_updated"
+    POSITIONS_BATCH = "positions_batch"
+    POSITION_CORRECTED = "position_corrected"
+    USER_PATH = "user_path"
+    USER_INTENT = "user_intent"
+    USER_ENTERED_VIEW = "user_entered_view"
+    USER_LEFT_VIEW = "user_left_view"
+    ROOM_REDIRECT = "room_redirect"
+    ACK = "ack"
+    SESSION = "session"
+    PING = "ping"
+    BATCH_RESULT = "batch_result"
+    ROOM_STATE_CHUNK = "room_state_chunk"
+    ROOM_STATE_END = "room_state_end"
+    SET_VIEWPORT = "set_viewport"
+    CHUNK_LOAD = "chunk_load"
+    CHUNK_UNLOAD = "chunk_unload"
+    LOD_CELLS = "lod_cells"
     MESSAGE_RECEIVED = "message_received"
     TOOL_USED = "tool_used"
     ERROR = "error"
@@ -30,11 +52,31 @@ class WebSocketMessage(BaseModel):
     data: Dict[str, Any]
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
+class Viewport(BaseModel):
+    """Visible area of the room (world coordinates)"""
+    x: int
+    y: int
+    width: int = Field(gt=0)
+    height: int = Field(gt=0)
+
 class JoinRoomMessage(BaseModel):
     """Join room message"""
     room_id: int
     x: int = 0
     y: int = 0
+    # true면 위치를 sid + 양자화 델타(pk/pd 이벤트)로 받는다
+    compact_positions: bool = False
+    # 재접속: 이전 session 이벤트의 resume_token과 마지막으로 받은 seq
+    resume_token: Optional[str] = None
+    last_seq: Optional[int] = None
+    # true면 큰 room_state를 zlib으로 압축한 바이너리 프레임으로 받는다 (JSON 연결만)
+    compress_state: bool = False
+    # 주면 room_state 대신 시야 안부터 room_state_chunk로 나눠 받는다
+    viewport: Optional[Viewport] = None
+    # true면 (viewport와 함께) 오브젝트를 시야 주변 청크 단위로 받는다 – chunk_load / chunk_unload
+    object_chunks: bool = False
+    # true면 멀리 있는 셀의 같은 타입 오브젝트 무리를 aggregate로 받는다 – lod_cells로 펼쳐진다
+    lod: bool = False
 
 class LeaveRoomMessage(BaseModel):
     """Leave room message"""
@@ -46,6 +88,22 @@ class UpdatePositionMessage(BaseModel):
     x: int
     y: int
 
+class MoveToData(BaseModel):
+    """Walk to a point along a server-computed path"""
+    room_id: int
+    x: int
+    y: int
+
+class MoveIntentData(BaseModel):
+    """Keep moving from (x, y) at (vx, vy) world units per second; zero velocity stops"""
+    room_id: int
+    x: int
+    y: int
+    vx: float = Field(0.0, allow_inf_nan=False)
+    vy: float = Field(0.0, allow_inf_nan=False)
+    # 클라이언트가 (x, y)에 있던 시각 (epoch ms)
+    ts: Optional[int] = None
+
 class SendMessageData(BaseModel):
     """Send message data"""
     room_id: int
@@ -57,6 +115,21 @@ class UseToolData(BaseModel):
     target_object_id: int
     action: ActionType
 
+class BatchData(BaseModel):
+    """Several client events in one frame, processed in order"""
+    events: List[Dict[str, Any]]
+
+class SetViewportData(Viewport):
+    """Move/resize the viewport of a chunk-subscribed connection"""
+    room_id: int
+
+class GetRoomStateData(BaseModel):
+    """Get room state data"""
+    room_id: int
+    compress_state: bool = False
+    viewport: Optional[Viewport] = None
+    lod: bool = False
+
 class RtcJoinData(BaseModel):
     """RTC join data"""
     room_id: int
@@ -111,3 +184,7 @@ class ErrorData(BaseModel):
     """Error data"""
     error: str
     details: Optional[str] = None
+    # 요청에 cid가 있었으면 그대로 돌려준다
+    cid: Optional[Union[str, int]] = None
+    # 속도 제한에 걸렸을 때 다시 보내도 되는 시점까지 남은 초
+    retry_after: Optional[float] = None
@@ -0,0 +1,319 @@
+import abc
+import json
+import uuid
+import base64
+import asyncio
+import contextvars
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+Frame = Union[str, bytes]
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class Backplane(abc.ABC):
+    """Cross-worker fan-out of room frames.
+
+    Each worker subscribes only to the rooms it has local members in. The
+    publishing worker delivers to its own sockets directly; envelopes it
+    receives back from the bus are recognised by ``origin`` and ignored.
+
+    Envelope fields: ``o`` origin worker, ``k`` kind ("room", "user", or
+    "objects" when the room's objects changed and there is no frame),
+    ``r`` room_id, ``u`` target user_id, ``l`` lane, ``y`` coalescing key,
+    ``p`` [x, y] where a positional room event happened, ``f`` frame (``b``
+    set when the frame is base64-encoded bytes).
+
+    ``subscribe``/``unsubscribe`` return at once; the channel changes run as
+    background tasks, one at a time in call order.
+    """
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex
+        self.rooms: Set[int] = set()
+        self._handler: Optional[Handler] = None
+        self.published = 0
+        self.received = 0
+        self._changes: Set[asyncio.Task] = set()
+        self._changes_lock = asyncio.Lock()
+
+    async def start(self, handler: Handler):
+        self._handler = handler
+
+    async def stop(self):
+        self._handler = None
+
+    def subscribe(self, room_id: int):
+        if room_id not in self.rooms:
+            self.rooms.add(room_id)
+            self._subscribe(room_id)
+
+    def unsubscribe(self, room_id: int):
+        if room_id in self.rooms:
+            self.rooms.discard(room_id)
+            self._unsubscribe(room_id)
+
+    async def publish_room(self, room_id: int, frame: Frame, lane: int, key: Any = None, at: Optional[Tuple[int, int]] = None):
+        await self._publish(room_id, self._envelope("room", room_id, frame, lane, key=key, at=at))
+
+    async def publish_user(self, room_id: int, user_id: int, frame: Frame, lane: int):
+        await self._publish(room_id, self._envelope("user", room_id, frame, lane, user_id=user_id))
+
+    async def publish_objects_changed(self, room_id: int):
+        await self._publish(room_id, self._envelope("objects", room_id, "", 0))
+
+    def _envelope(
+        self, kind: str, room_id: int, frame: Frame, lane: int,
+        user_id: Optional[int] = None, key: Any = None, at: Optional[Tuple[int, int]] = None,
+    ) -> str:
+        env: Dict[str, Any] = {"o": self.worker_id, "k": kind, "r": room_id, "l": lane}
+        if user_id is not None:
+            env["u"] = user_id
+        if key is not None:
+            env["y"] = key
+        if at is not None:
+            env["p"] = list(at)
+        if isinstance(frame, bytes):
+            env["f"] = base64.b64encode(frame).decode("ascii")
+            env["b"] = 1
+        else:
+            env["f"] = frame
+        self.published += 1
+        return json.dumps(env, separators=(",", ":"))
+
+    async def _dispatch(self, payload: Union[str, bytes]):
+        try:
+            env = json.loads(payload)
+        except Exception:
+            logger.warning("Dropping malformed backplane payload")
+            return
+        if env.get("o") == self.worker_id or self._handler is None:
+            return
+        if env.get("r") not in self.rooms:
+            return
+        if env.get("b"):
+            env["f"] = base64.b64decode(env["f"])
+        self.received += 1
+        try:
+            await self._handler(env)
+        except Exception:
+            logger.exception("Backplane delivery failed")
+
+    @staticmethod
+    def channel(room_id: int) -> str:
+        return f"cafe_room_{room_id}"
+
+    def _subscribe(self, room_id: int):
+        pass
+
+    def _unsubscribe(self, room_id: int):
+        pass
+
+    def _change(self, what: str, fn: Callable[..., Awaitable[Any]], *args: Any):
+        """Run a channel (un)subscription in the background, after the ones before it"""
+        task = asyncio.get_running_loop().create_task(self._run_change(what, fn, *args), context=contextvars.Context())
+        self._changes.add(task)
+        task.add_done_callback(self._changes.discard)
+
+    async def _run_change(self, what: str, fn: Callable[..., Awaitable[Any]], *args: Any):
+        async with self._changes_lock:
+            try:
+                await fn(*args)
+            except Exception:
+                logger.exception("Backplane %s failed", what)
+
+    def _cancel_changes(self):
+        for task in list(self._changes):
+            task.cancel()
+        self._changes.clear()
+
+    @abc.abstractmethod
+    async def _publish(self, room_id: int, payload: str):
+        """Send an envelope to every worker subscribed to the room"""
+
+
+class InMemoryHub:
+    """Bus shared by InMemoryBackplane instances in one process"""
+
+    def __init__(self):
+        self.members: Set["InMemoryBackplane"] = set()
+
+    def deliver(self, room_id: int, payload: str):
+        for member in list(self.members):
+            if room_id in member.rooms:
+                asyncio.get_running_loop().create_task(member._dispatch(payload), context=contextvars.Context())
+
+
+class InMemoryBackplane(Backplane):
+    """In-process backplane; several instances on one hub act as separate workers"""
+
+    default_hub = InMemoryHub()
+
+    def __init__(self, hub: Optional[InMemoryHub] = None):
+        super().__init__()
+        self.hub = hub or self.default_hub
+
+    async def start(self, handler: Handler):
+        await super().start(handler)
+        self.hub.members.add(self)
+
+    async def stop(self):
+        self.hub.members.discard(self)
+        await super().stop()
+
+    async def _publish(self, room_id: int, payload: str):
+        self.hub.deliver(room_id, payload)
+
+
+class RedisBackplane(Backplane):
+    """Redis pub/sub backplane, one channel per room"""
+
+    def __init__(self, url: str):
+        super().__init__()
+        self.url = url
+        self._redis = None
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def start(self, handler: Handler):
+        import redis.asyncio as aioredis
+
+        await super().start(handler)
+        self._redis = aioredis.from_url(self.url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._reader = asyncio.create_task(self._read(), context=contextvars.Context())
+
+    async def stop(self):
+        self._cancel_changes()
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.close()
+        if self._redis is not None:
+            await self._redis.close()
+        await super().stop()
+
+    def _subscribe(self, room_id: int):
+        if self._pubsub is not None:
+            self._change(f"subscribe to room {room_id}", self._pubsub.subscribe, self.channel(room_id))
+
+    def _unsubscribe(self, room_id: int):
+        if self._pubsub is not None:
+            self._change(f"unsubscribe from room {room_id}", self._pubsub.unsubscribe, self.channel(room_id))
+
+    async def _publish(self, room_id: int, payload: str):
+        await self._redis.publish(self.channel(room_id), payload)
+
+    async def _read(self):
+        while True:
+            try:
+                if not self._pubsub.subscribed:
+                    await asyncio.sleep(0.1)
+                    continue
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message.get("type") == "message":
+                    await self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Redis backplane read failed")
+                await asyncio.sleep(1.0)
+
+
+class PostgresBackplane(Backplane):
+    """Postgres LISTEN/NOTIFY backplane, one channel per room.
+
+    NOTIFY payloads are limited to 8000 bytes; larger frames are delivered
+    locally only and logged.
+    """
+
+    MAX_PAYLOAD = 7999
+
+    def __init__(self, dsn: str):
+        super().__init__()
+        self.dsn = dsn
+        self._listen_conn = None
+        self._notify_conn = None
+        self._notify_lock = asyncio.Lock()
+
+    async def start(self, handler: Handler):
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        await super().start(handler)
+        loop = asyncio.get_running_loop()
+        self._listen_conn = await loop.run_in_executor(None, psycopg2.connect, self.dsn)
+        self._listen_conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        self._notify_conn = await loop.run_in_executor(None, psycopg2.connect, self.dsn)
+        self._notify_conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        loop.add_reader(self._listen_conn.fileno(), self._on_readable)
+        for room_id in self.rooms:
+            self._subscribe(room_id)
+
+    async def stop(self):
+        self._cancel_changes()
+        if self._listen_conn is not None:
+            asyncio.get_running_loop().remove_reader(self._listen_conn.fileno())
+            self._listen_conn.close()
+            self._listen_conn = None
+        if self._notify_conn is not None:
+            self._notify_conn.close()
+            self._notify_conn = None
+        await super().stop()
+
+    async def _execute(self, sql: str):
+        # psycopg2 호출은 블로킹이라 이벤트 루프 밖에서 실행한다
+        await asyncio.get_running_loop().run_in_executor(None, self._execute_sync, sql)
+
+    def _execute_sync(self, sql: str):
+        conn = self._listen_conn
+        if conn is None:
+            return
+        with conn.cursor() as cur:
+            cur.execute(sql)
+
+    def _subscribe(self, room_id: int):
+        if self._listen_conn is not None:
+            self._change(f"LISTEN for room {room_id}", self._execute, f'LISTEN "{self.channel(room_id)}"')
+
+    def _unsubscribe(self, room_id: int):
+        if self._listen_conn is not None:
+            self._change(f"UNLISTEN for room {room_id}", self._execute, f'UNLISTEN "{self.channel(room_id)}"')
+
+    def _on_readable(self):
+        conn = self._listen_conn
+        if conn is None:
+            return
+        conn.poll()
+        while conn.notifies:
+            notify = conn.notifies.pop(0)
+            asyncio.get_running_loop().create_task(self._dispatch(notify.payload), context=contextvars.Context())
+
+    async def _publish(self, room_id: int, payload: str):
+        if len(payload.encode("utf-8")) > self.MAX_PAYLOAD:
+            logger.warning("Frame too large for NOTIFY (room %s), delivered locally only", room_id)
+            return
+        loop = asyncio.get_running_loop()
+        async with self._notify_lock:
+            await loop.run_in_executor(None, self._notify, self.channel(room_id), payload)
+
+    def _notify(self, channel: str, payload: str):
+        with self._notify_conn.cursor() as cur:
+            cur.execute("SELECT pg_notify(%s, %s)", (channel, payload))
+
+
+def create_backplane(kind: str, redis_url: Optional[str] = None, database_url: Optional[str] = None) -> Optional[Backplane]:
+    """Build a backplane from a WS_BACKPLANE setting ("none", "memory", "redis", "postgres")"""
+    kind = (kind or "none").lower()
+    if kind == "none":
+        return None
+    if kind == "memory":
+        return InMemoryBackplane()
+    if kind == "redis":
+        return RedisBackplane(redis_url)
+    if kind == "postgres":
+        return PostgresBackplane(database_url)
+    raise ValueError(f"Unknown backplane: {kind}")
@@ -0,0 +1,79 @@
+from typing import Any, Dict, Optional, Set, Tuple
+
+Chunk = Tuple[int, int]
+Rect = Tuple[int, int, int, int]  # (x, y, width, height)
+Change = Tuple[int, Set[Chunk], Set[Chunk]]  # (room_id, loaded, unloaded)
+
+
+class _Subscription:
+    __slots__ = ("room_id", "rect", "center", "chunks")
+
+    def __init__(self, room_id: int, rect: Rect, center: Chunk, chunks: Set[Chunk]):
+        self.room_id = room_id
+        self.rect = rect
+        self.center = center
+        self.chunks = chunks
+
+
+class ChunkSubscriptions:
+    """Which object chunks of its room each connection watches.
+
+    A room is cut into ``size`` x ``size`` chunks. A subscribed connection
+    watches the chunks its viewport touches plus ``margin`` chunks around
+    them, and follows its avatar as it moves. Object events that happen at a
+    position go only to watchers of that chunk; connections that never
+    subscribed keep receiving every object event of the room.
+    """
+
+    def __init__(self, size: int, margin: int = 1):
+        self.size = max(1, size)
+        self.margin = max(0, margin)
+        self._subs: Dict[Any, _Subscription] = {}
+
+    def __len__(self) -> int:
+        return len(self._subs)
+
+    def chunk_of(self, x: int, y: int) -> Chunk:
+        return (x // self.size, y // self.size)
+
+    def chunks_for(self, rect: Rect) -> Set[Chunk]:
+        x, y, width, height = rect
+        left, top = self.chunk_of(x, y)
+        right, bottom = self.chunk_of(x + max(1, width) - 1, y + max(1, height) - 1)
+        m = self.margin
+        return {
+            (cx, cy)
+            for cx in range(left - m, right + m + 1)
+            for cy in range(top - m, bottom + m + 1)
+        }
+
+    def chunks(self, websocket: Any) -> Optional[Set[Chunk]]:
+        sub = self._subs.get(websocket)
+        return sub.chunks if sub is not None else None
+
+    def sees(self, websocket: Any, chunk: Chunk) -> bool:
+        sub = self._subs.get(websocket)
+        return sub is None or chunk in sub.chunks
+
+    def set_viewport(self, websocket: Any, room_id: int, rect: Rect) -> Change:
+        """Subscribe (or move the viewport); returns the chunks to load and unload"""
+        chunks = self.chunks_for(rect)
+        center = self.chunk_of(rect[0] + rect[2] // 2, rect[1] + rect[3] // 2)
+        previous = self._subs.get(websocket)
+        if previous is None or previous.room_id != room_id:
+            self._subs[websocket] = _Subscription(room_id, rect, center, chunks)
+            return room_id, chunks, set()
+        loaded, unloaded = chunks - previous.chunks, previous.chunks - chunks
+        previous.rect, previous.center, previous.chunks = rect, center, chunks
+        return room_id, loaded, unloaded
+
+    def follow(self, websocket: Any, x: int, y: int) -> Optional[Change]:
+        """Re-center a subscribed viewport on (x, y); None while the center stays in its chunk"""
+        sub = self._subs.get(websocket)
+        if sub is None or self.chunk_of(x, y) == sub.center:
+            return None
+        _, _, width, height = sub.rect
+        return self.set_viewport(websocket, sub.room_id, (x - width // 2, y - height // 2, width, height))
+
+    def remove(self, websocket: Any):
+        self._subs.pop(websocket, None)
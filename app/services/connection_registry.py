@@ -0,0 +1,111 @@
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class Connection:
+    """One WebSocket and what we know about it"""
+    __slots__ = ("websocket", "user_id", "room_id", "queue", "codec", "compact", "limiter", "last_seen", "pinged_at", "lod_cell")
+
+    def __init__(self, websocket: Any, user_id: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.room_id: Optional[int] = None
+        self.queue = None
+        self.codec = None
+        self.compact = False
+        self.limiter = None
+        # 마지막 수신 시각 / 마지막 ping 시각 (time.monotonic)
+        self.last_seen = time.monotonic()
+        self.pinged_at = 0.0
+        # lod room_state를 받은 연결이 보고 있는 LOD 셀 (None = 전체 상태)
+        self.lod_cell = None
+
+
+class ConnectionRegistry:
+    """Connection records indexed by socket, user, room and (room, user).
+
+    Every index maps to an insertion-ordered dict keyed by socket, so a user
+    may hold several sockets (tabs, devices) and all lookups are O(1) or
+    O(result size) instead of a scan over the room.
+    """
+
+    def __init__(self):
+        self._by_socket: Dict[Any, Connection] = {}
+        self._by_user: Dict[int, Dict[Any, Connection]] = {}
+        self._by_room: Dict[int, Dict[Any, Connection]] = {}
+        self._by_room_user: Dict[Tuple[int, int], Dict[Any, Connection]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_socket)
+
+    def __iter__(self) -> Iterator[Connection]:
+        return iter(list(self._by_socket.values()))
+
+    def add(self, websocket: Any, user_id: int) -> Connection:
+        self.remove(websocket)
+        conn = Connection(websocket, user_id)
+        self._by_socket[websocket] = conn
+        self._by_user.setdefault(user_id, {})[websocket] = conn
+        return conn
+
+    def get(self, websocket: Any) -> Optional[Connection]:
+        return self._by_socket.get(websocket)
+
+    def remove(self, websocket: Any) -> Optional[Connection]:
+        conn = self._by_socket.pop(websocket, None)
+        if conn is None:
+            return None
+        self.set_room(conn, None)
+        _discard(self._by_user, conn.user_id, websocket)
+        return conn
+
+    def set_room(self, conn: Connection, room_id: Optional[int]):
+        if conn.room_id == room_id:
+            return
+        ws = conn.websocket
+        if conn.room_id is not None:
+            _discard(self._by_room, conn.room_id, ws)
+            _discard(self._by_room_user, (conn.room_id, conn.user_id), ws)
+        conn.room_id = room_id
+        if room_id is not None:
+            self._by_room.setdefault(room_id, {})[ws] = conn
+            self._by_room_user.setdefault((room_id, conn.user_id), {})[ws] = conn
+
+    def in_room(self, room_id: int) -> List[Connection]:
+        """Snapshot of a room's connections, safe to iterate while sending"""
+        return list(self._by_room.get(room_id, {}).values())
+
+    def room_size(self, room_id: int) -> int:
+        return len(self._by_room.get(room_id, ()))
+
+    def room_ids(self) -> List[int]:
+        return list(self._by_room)
+
+    def for_user(self, user_id: int) -> List[Connection]:
+        return list(self._by_user.get(user_id, {}).values())
+
+    def for_user_in_room(self, room_id: int, user_id: int) -> List[Connection]:
+        return list(self._by_room_user.get((room_id, user_id), {}).values())
+
+    def latest_for_user_in_room(self, room_id: int, user_id: int) -> Optional[Connection]:
+        conns = self._by_room_user.get((room_id, user_id))
+        if not conns:
+            return None
+        return conns[next(reversed(conns))]
+
+    def for_users_in_room(self, room_id: int, user_ids: Iterable[int]) -> List[Connection]:
+        index = self._by_room_user
+        result: List[Connection] = []
+        for user_id in user_ids:
+            conns = index.get((room_id, user_id))
+            if conns:
+                result.extend(conns.values())
+        return result
+
+
+def _discard(index: Dict[Any, Dict[Any, Connection]], key: Any, websocket: Any):
+    bucket = index.get(key)
+    if bucket is not None:
+        bucket.pop(websocket, None)
+        if not bucket:
+            del index[key]
@@ -0,0 +1,166 @@
+import os
+import math
+import time
+import asyncio
+import contextvars
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# move_intent 외삽/충돌 검사 주기 (Hz)
+INTENT_TICK_HZ = float(os.getenv("INTENT_TICK_HZ", "10"))
+# 서버 위치가 클라이언트 외삽과 이만큼(월드 단위) 벌어지면 보정 intent를 보낸다
+INTENT_DRIFT = float(os.getenv("INTENT_DRIFT", "16"))
+# 움직이는 동안 presence에 위치를 기록하는 간격 (초)
+INTENT_PERSIST_INTERVAL = float(os.getenv("INTENT_PERSIST_INTERVAL", "1.0"))
+# 최대 속도 (월드 단위/초) – 넘으면 방향은 유지하고 줄인다
+INTENT_MAX_SPEED = float(os.getenv("INTENT_MAX_SPEED", "400"))
+# 클라이언트 ts를 믿는 최대 지연 (초); 더 오래됐거나 미래면 서버 수신 시각을 쓴다
+INTENT_MAX_LAG = float(os.getenv("INTENT_MAX_LAG", "0.5"))
+
+Point = Tuple[int, int]
+# (room_id, from, to) -> 충돌을 반영한 실제 도착 위치
+Resolve = Callable[[int, Point, Point], Point]
+
+
+def cap_speed(vx: float, vy: float, max_speed: float = INTENT_MAX_SPEED) -> Tuple[float, float]:
+    speed = math.hypot(vx, vy)
+    if not math.isfinite(speed):
+        # nan/inf는 외삽할 수 없다 – 멈춘 것으로 본다
+        return 0.0, 0.0
+    if speed > max_speed > 0:
+        return vx * max_speed / speed, vy * max_speed / speed
+    return vx, vy
+
+
+class Motion:
+    """A straight-line movement intent: at (x, y) at ``started`` (time.time()), moving at (vx, vy) per second.
+
+    ``actual`` is where the server has the avatar after collisions; it only
+    differs from the extrapolation when something got in the way.
+    """
+    __slots__ = ("x", "y", "vx", "vy", "started", "actual", "persisted_at", "websocket")
+
+    def __init__(self, x: int, y: int, vx: float, vy: float, started: float, websocket: Any = None):
+        self.x, self.y = x, y
+        self.vx, self.vy = vx, vy
+        self.started = started
+        self.actual: Point = (x, y)
+        self.persisted_at = started
+        self.websocket = websocket
+
+    @property
+    def moving(self) -> bool:
+        return bool(self.vx or self.vy)
+
+    def position_at(self, now: float) -> Point:
+        elapsed = max(0.0, now - self.started)
+        return (round(self.x + self.vx * elapsed), round(self.y + self.vy * elapsed))
+
+    def rebase(self, now: float, vx: float, vy: float):
+        """Restart the extrapolation from the actual position"""
+        self.x, self.y = self.actual
+        self.vx, self.vy = vx, vy
+        self.started = now
+
+    def payload(self, room_id: int, user_id: int, correction: bool = False) -> Dict[str, Any]:
+        return {
+            "user_id": user_id,
+            "room_id": room_id,
+            "x": self.x,
+            "y": self.y,
+            "vx": self.vx,
+            "vy": self.vy,
+            "started_at": int(self.started * 1000),
+            "correction": correction,
+        }
+
+
+class MotionTracker:
+    """Dead reckoning for users moving by intent.
+
+    Each tick extrapolates every motion of a room, runs the step through
+    ``resolve`` (collisions) and calls ``on_step`` when the position should
+    be persisted (every ``persist_interval``) or when the actual position has
+    drifted more than ``drift`` from what clients extrapolate; in that case
+    the motion is rebased with the blocked axis stopped (``corrected``). A
+    room's loop starts with its first motion and ends with its last.
+    """
+
+    def __init__(
+        self,
+        on_step: Callable[[int, int, Motion, bool], Awaitable[None]],
+        resolve: Resolve,
+        hz: float = INTENT_TICK_HZ,
+        drift: float = INTENT_DRIFT,
+        persist_interval: float = INTENT_PERSIST_INTERVAL,
+    ):
+        self._on_step = on_step
+        self._resolve = resolve
+        self.interval = 1.0 / max(hz, 0.1)
+        self.drift = drift
+        self.persist_interval = persist_interval
+        self._motions: Dict[int, Dict[int, Motion]] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    def get(self, room_id: int, user_id: int) -> Optional[Motion]:
+        motions = self._motions.get(room_id)
+        return motions.get(user_id) if motions is not None else None
+
+    def set(self, room_id: int, user_id: int, motion: Motion):
+        self._motions.setdefault(room_id, {})[user_id] = motion
+        if room_id not in self._tasks:
+            # 방 루프는 시작시킨 요청보다 오래 산다 – 빈 컨텍스트에서 돌린다
+            self._tasks[room_id] = asyncio.create_task(self._run(room_id), context=contextvars.Context())
+
+    def drop(self, room_id: int, user_id: int) -> Optional[Motion]:
+        motions = self._motions.get(room_id)
+        if not motions:
+            return None
+        motion = motions.pop(user_id, None)
+        if not motions:
+            del self._motions[room_id]
+        return motion
+
+    def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        self._motions.clear()
+
+    async def step(self, room_id: int, now: Optional[float] = None):
+        """Advance every motion of a room to ``now``"""
+        now = time.time() if now is None else now
+        for user_id, motion in list(self._motions.get(room_id, {}).items()):
+            # 한 사용자의 실패로 방의 루프가 멈추지 않도록 한다
+            try:
+                expected = motion.position_at(now)
+                motion.actual = self._resolve(room_id, motion.actual, expected)
+                corrected = math.hypot(expected[0] - motion.actual[0], expected[1] - motion.actual[1]) > self.drift
+                if corrected:
+                    # 막힌 축의 속도만 멈추고 실제 위치에서 다시 시작한다
+                    vx = motion.vx if motion.actual[0] == expected[0] else 0.0
+                    vy = motion.vy if motion.actual[1] == expected[1] else 0.0
+                    motion.rebase(now, vx, vy)
+                elif now - motion.persisted_at < self.persist_interval:
+                    continue
+                motion.persisted_at = now
+                if not motion.moving and self.get(room_id, user_id) is motion:
+                    self.drop(room_id, user_id)
+                await self._on_step(room_id, user_id, motion, corrected)
+            except Exception:
+                logger.exception("Motion step failed for user %s in room %s", user_id, room_id)
+
+    async def _run(self, room_id: int):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        try:
+            while self._motions.get(room_id):
+                next_tick = max(next_tick + self.interval, loop.time())
+                await asyncio.sleep(next_tick - loop.time())
+                await self.step(room_id)
+        finally:
+            if self._tasks.get(room_id) is asyncio.current_task():
+                del self._tasks[room_id]
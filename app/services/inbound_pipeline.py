@@ -0,0 +1,110 @@
+import asyncio
+import contextvars
+import logging
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Dispatch = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class EventClass(IntEnum):
+    """How a client event is scheduled in pipelined mode"""
+    ORDERED = 0    # chat, tools, objects, snapshots: FIFO, never dropped
+    POSITION = 1   # moves: only the latest pending one is processed
+    SIGNAL = 2     # RTC signaling: forwarded straight from the reader
+    BARRIER = 3    # join/leave: waits for in-flight work, then runs inline
+
+
+class InboundPipeline:
+    """Per-connection inbound scheduler for pipelined mode.
+
+    The reader keeps pulling frames while slow handlers (DB commits) run in
+    per-class workers. Ordered events keep their order among themselves and
+    apply backpressure to the reader when ``maxsize`` are pending; a position
+    that arrives while another is pending replaces it. Barrier events change
+    room membership, so everything submitted before them finishes first.
+    """
+
+    def __init__(
+        self,
+        dispatch: Dispatch,
+        maxsize: int = 64,
+        on_superseded: Optional[Dispatch] = None,
+    ):
+        self._dispatch = dispatch
+        self._on_superseded = on_superseded
+        self._ordered: asyncio.Queue = asyncio.Queue(maxsize)
+        self._position: Optional[Dict[str, Any]] = None
+        self._position_ready = asyncio.Event()
+        self._position_idle = asyncio.Event()
+        self._position_idle.set()
+        self._tasks: List[asyncio.Task] = []
+        self.superseded = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._ordered_worker(), context=contextvars.Context()),
+                asyncio.create_task(self._position_worker(), context=contextvars.Context()),
+            ]
+
+    async def submit(self, message: Dict[str, Any], event_class: EventClass):
+        if event_class == EventClass.SIGNAL:
+            await self._run(message)
+        elif event_class == EventClass.POSITION:
+            previous, self._position = self._position, message
+            self._position_idle.clear()
+            self._position_ready.set()
+            if previous is not None:
+                self.superseded += 1
+                if self._on_superseded is not None:
+                    await self._on_superseded(previous)
+        elif event_class == EventClass.BARRIER:
+            await self.drain()
+            await self._run(message)
+        else:
+            await self._ordered.put(message)
+
+    async def drain(self):
+        """Wait until every submitted ordered event and pending move is handled"""
+        await self._ordered.join()
+        await self._position_idle.wait()
+
+    async def close(self):
+        """Finish queued ordered events (they must not be lost), drop a pending move"""
+        self._position = None
+        try:
+            await self._ordered.join()
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+
+    async def _run(self, message: Dict[str, Any]):
+        try:
+            await self._dispatch(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Inbound event %r failed", message.get("event"))
+
+    async def _ordered_worker(self):
+        while True:
+            message = await self._ordered.get()
+            try:
+                await self._run(message)
+            finally:
+                self._ordered.task_done()
+
+    async def _position_worker(self):
+        while True:
+            await self._position_ready.wait()
+            self._position_ready.clear()
+            message, self._position = self._position, None
+            if message is not None:
+                await self._run(message)
+            if self._position is None:
+                self._position_idle.set()
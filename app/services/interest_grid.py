@@ -0,0 +1,88 @@
+from typing import Dict, Optional, Set, Tuple
+
+Cell = Tuple[int, int]
+
+
+class InterestGrid:
+    """Uniform-grid spatial hash of user positions in one room.
+
+    Cells are ``radius`` wide, so everyone within ``radius`` of a point lies in
+    the 3x3 block of cells around it and a lookup touches only nearby users
+    instead of the whole room. Interest is symmetric: A sees B iff B sees A.
+    """
+
+    def __init__(self, radius: int):
+        self.radius = radius
+        self.cell_size = max(1, radius)
+        self._radius_sq = radius * radius
+        self._cells: Dict[Cell, Set[int]] = {}
+        self._positions: Dict[int, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._positions
+
+    def _cell(self, x: int, y: int) -> Cell:
+        return (x // self.cell_size, y // self.cell_size)
+
+    def position(self, user_id: int) -> Optional[Tuple[int, int]]:
+        return self._positions.get(user_id)
+
+    def update(self, user_id: int, x: int, y: int):
+        old = self._positions.get(user_id)
+        cell = self._cell(x, y)
+        if old is not None:
+            old_cell = self._cell(*old)
+            if old_cell != cell:
+                self._discard(old_cell, user_id)
+                self._cells.setdefault(cell, set()).add(user_id)
+        else:
+            self._cells.setdefault(cell, set()).add(user_id)
+        self._positions[user_id] = (x, y)
+
+    def remove(self, user_id: int):
+        old = self._positions.pop(user_id, None)
+        if old is not None:
+            self._discard(self._cell(*old), user_id)
+
+    def _discard(self, cell: Cell, user_id: int):
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(user_id)
+            if not members:
+                del self._cells[cell]
+
+    def within(self, x: int, y: int, exclude: Optional[int] = None) -> Set[int]:
+        """Users whose position is within ``radius`` of (x, y)"""
+        cx, cy = self._cell(x, y)
+        result: Set[int] = set()
+        positions = self._positions
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                members = self._cells.get((gx, gy))
+                if not members:
+                    continue
+                for uid in members:
+                    if uid == exclude:
+                        continue
+                    ux, uy = positions[uid]
+                    dx, dy = ux - x, uy - y
+                    if dx * dx + dy * dy <= self._radius_sq:
+                        result.add(uid)
+        return result
+
+    def watchers(self, user_id: int) -> Set[int]:
+        """Users whose interest radius covers ``user_id``"""
+        pos = self._positions.get(user_id)
+        if pos is None:
+            return set()
+        return self.within(pos[0], pos[1], exclude=user_id)
+
+    def move(self, user_id: int, x: int, y: int) -> Tuple[Set[int], Set[int], Set[int]]:
+        """Move a user and return (entered, stayed, left) watcher sets"""
+        before = self.watchers(user_id)
+        self.update(user_id, x, y)
+        after = self.within(x, y, exclude=user_id)
+        return after - before, after & before, before - after
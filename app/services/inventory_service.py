@@ -1,11 +1,13 @@
 from typing import List, Optional, Dict, Any
 from app.database import get_session
 from app.models import InventoryItem, ObjectType, Object
+from app.services.occupancy import PlacementBlocked, occupancy
+from app.services.room_snapshot import RoomSnapshotRepository
 
 
 class InventoryService:
     def __init__(self):
-        pass
+        self.snapshots = RoomSnapshotRepository()
 
     async def list_items(self, user_id: int) -> List[InventoryItem]:
         with get_session() as db:
@@ -48,6 +50,8 @@ class InventoryService:
             ).first()
             if not item:
                 raise ValueError("Inventory item not found")
+            if not occupancy.get(room_id, self.snapshots.objects).can_place(item.type, x, y, rotation):
+                raise PlacementBlocked("Position is blocked")
 
             metadata = None
             if item.meta_json:
@@ -2,6 +2,13 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.models import Object, ObjectType
 from app.database import get_session
+from app.services.occupancy import occupancy
+from app.services.room_state_cache import room_states
+
+
+def _row(obj: Object):
+    return (obj.id, obj.type, obj.x, obj.y, obj.rotation, obj.meta_json)
+
 
 class ObjectService:
     def __init__(self):
@@ -32,6 +39,8 @@ class ObjectService:
             db.add(db_object)
             db.commit()
             db.refresh(db_object)
+            room_states.object_saved(db_object.room_id, _row(db_object))
+            occupancy.object_saved(db_object.room_id, _row(db_object))
             return db_object
 
     async def get_objects(self, skip: int = 0, limit: int = 100, type: Optional[ObjectType] = None):
@@ -46,6 +55,7 @@ class ObjectService:
         with get_session() as db:
             db_object = db.query(Object).filter(Object.id == object_id).first()
             if db_object:
+                previous_room_id = db_object.room_id
                 for key, value in kwargs.items():
                     if key == "metadata":
                         db_object.set_metadata(value)
@@ -53,6 +63,11 @@ class ObjectService:
                         setattr(db_object, key, value)
                 db.commit()
                 db.refresh(db_object)
+                if db_object.room_id != previous_room_id:
+                    room_states.object_removed(previous_room_id, object_id)
+                    occupancy.object_removed(previous_room_id, object_id)
+                room_states.object_saved(db_object.room_id, _row(db_object))
+                occupancy.object_saved(db_object.room_id, _row(db_object))
             return db_object
 
     async def delete_object(self, object_id: int) -> bool:
@@ -62,5 +77,7 @@ class ObjectService:
             if db_object:
                 db.delete(db_object)
                 db.commit()
+                room_states.object_removed(db_object.room_id, object_id)
+                occupancy.object_removed(db_object.room_id, object_id)
                 return True
             return False
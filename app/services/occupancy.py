@@ -0,0 +1,239 @@
+import os
+import math
+import itertools
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.models import ObjectType
+from app.services.room_snapshot import ObjectRow
+
+# Configuration
+# 방 크기 (월드 단위). 이 밖으로는 이동/배치할 수 없다
+ROOM_WIDTH = int(os.getenv("ROOM_WIDTH", "4096"))
+ROOM_HEIGHT = int(os.getenv("ROOM_HEIGHT", "4096"))
+# 점유 격자 한 칸의 크기 (월드 단위)
+OCCUPANCY_CELL = int(os.getenv("OCCUPANCY_CELL", "32"))
+# 메모리에 유지할 방 격자 수 (가장 최근에 쓰인 방 기준)
+OCCUPANCY_ROOMS = int(os.getenv("OCCUPANCY_ROOMS", "512"))
+
+# 방을 다시 읽어 와도 version이 줄지 않도록 프로세스 전체에서 증가
+_versions = itertools.count(1)
+
+Cell = Tuple[int, int]  # (col, row)
+Span = Tuple[int, int, int, int]  # (row0, row1, col0, col1), 끝은 제외
+
+# 오브젝트 타입별 차지하는 칸 수 (가로, 세로); (x, y)가 왼쪽 위 칸. 0이면 지나갈 수 있다
+FOOTPRINTS: Dict[ObjectType, Tuple[int, int]] = {
+    ObjectType.CHAIR: (1, 1),
+    ObjectType.TABLE: (2, 2),
+    ObjectType.DESK: (2, 1),
+    ObjectType.PLANT: (1, 1),
+    ObjectType.BALLOON: (0, 0),
+    ObjectType.POT: (1, 1),
+    ObjectType.BRICK: (1, 1),
+    ObjectType.WALL: (4, 1),
+    ObjectType.TOOL: (0, 0),
+}
+
+
+class PlacementBlocked(ValueError):
+    """The footprint leaves the room or overlaps another object"""
+
+
+def footprint(object_type: ObjectType, rotation: Optional[float] = 0.0) -> Tuple[int, int]:
+    width, height = FOOTPRINTS.get(ObjectType(object_type), (1, 1))
+    # 90/270도로 놓이면 가로/세로가 바뀐다
+    if rotation and round(rotation / 90) % 2:
+        return height, width
+    return width, height
+
+
+class OccupancyGrid:
+    """Which cells of one room are blocked by objects.
+
+    ``counts`` holds how many object footprints cover each cell, so objects
+    that were allowed to overlap before this grid existed still free their
+    cells correctly. Every change bumps ``version`` (path caches key on it).
+    """
+    __slots__ = ("room_id", "width", "height", "cell", "counts", "version", "_spans", "_blocked")
+
+    def __init__(self, room_id: int, objects: Iterable[ObjectRow] = (),
+                 width: int = ROOM_WIDTH, height: int = ROOM_HEIGHT, cell: int = OCCUPANCY_CELL):
+        self.room_id = room_id
+        self.width = width
+        self.height = height
+        self.cell = max(1, cell)
+        self.counts = np.zeros((-(-height // self.cell), -(-width // self.cell)), dtype=np.uint16)
+        self.version = 0
+        self._spans: Dict[int, Span] = {}
+        self._blocked: Optional[List[List[bool]]] = None
+        for object_id, object_type, x, y, rotation, _ in objects:
+            self._mark(object_id, self.span(object_type, x, y, rotation))
+        self.version = next(_versions)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.counts.shape
+
+    def cell_of(self, x: int, y: int) -> Cell:
+        return (x // self.cell, y // self.cell)
+
+    def span(self, object_type: ObjectType, x: int, y: int, rotation: Optional[float] = 0.0) -> Optional[Span]:
+        width, height = footprint(object_type, rotation)
+        if not width or not height:
+            return None
+        col, row = self.cell_of(x, y)
+        return (row, row + height, col, col + width)
+
+    def _in_bounds(self, span: Span) -> bool:
+        rows, cols = self.counts.shape
+        return span[0] >= 0 and span[2] >= 0 and span[1] <= rows and span[3] <= cols
+
+    def _clip(self, span: Span) -> Span:
+        rows, cols = self.counts.shape
+        return (max(span[0], 0), min(span[1], rows), max(span[2], 0), min(span[3], cols))
+
+    def _mark(self, object_id: int, span: Optional[Span]):
+        if span is None:
+            return
+        row0, row1, col0, col1 = self._clip(span)
+        if row0 < row1 and col0 < col1:
+            self.counts[row0:row1, col0:col1] += 1
+            self._spans[object_id] = (row0, row1, col0, col1)
+
+    def place(self, object_id: int, object_type: ObjectType, x: int, y: int, rotation: Optional[float] = 0.0):
+        """Add an object, or move it if it is already on the grid"""
+        self._unmark(object_id)
+        self._mark(object_id, self.span(object_type, x, y, rotation))
+        self._changed()
+
+    def _changed(self):
+        self.version = next(_versions)
+        self._blocked = None
+
+    def _unmark(self, object_id: int):
+        span = self._spans.pop(object_id, None)
+        if span is not None:
+            row0, row1, col0, col1 = span
+            self.counts[row0:row1, col0:col1] -= 1
+
+    def remove(self, object_id: int):
+        if object_id in self._spans:
+            self._unmark(object_id)
+            self._changed()
+
+    def can_place(self, object_type: ObjectType, x: int, y: int, rotation: Optional[float] = 0.0,
+                  ignore: Optional[int] = None) -> bool:
+        """Whether the footprint lies inside the room on free cells (``ignore``: the object being moved)"""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        span = self.span(object_type, x, y, rotation)
+        if span is None:
+            return True
+        if not self._in_bounds(span):
+            return False
+        row0, row1, col0, col1 = span
+        own = self._spans.get(ignore) if ignore is not None else None
+        if own is not None:
+            # 자기 자신이 차지한 칸은 잠시 빼고 본다
+            self.counts[own[0]:own[1], own[2]:own[3]] -= 1
+        try:
+            return not self.counts[row0:row1, col0:col1].any()
+        finally:
+            if own is not None:
+                self.counts[own[0]:own[1], own[2]:own[3]] += 1
+
+    def blocked(self) -> List[List[bool]]:
+        """Rows of blocked flags as plain lists (cached until the grid changes), for cell-by-cell searches"""
+        if self._blocked is None:
+            self._blocked = (self.counts > 0).tolist()
+        return self._blocked
+
+    def walkable(self, x: int, y: int) -> bool:
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        col, row = self.cell_of(x, y)
+        return not self.counts[row, col]
+
+    def clamp_move(self, x0: int, y0: int, x1: int, y1: int) -> Tuple[int, int]:
+        """Where a move from (x0, y0) to (x1, y1) ends: inside the room and never on a blocked cell.
+
+        A blocked target slides along the free axis (x or y alone), otherwise
+        the avatar stays where it was.
+        """
+        x1 = min(max(x1, 0), self.width - 1)
+        y1 = min(max(y1, 0), self.height - 1)
+        if self.walkable(x1, y1):
+            return x1, y1
+        if self.walkable(x1, y0):
+            return x1, y0
+        if self.walkable(x0, y1):
+            return x0, y1
+        return x0, y0
+
+    def sweep(self, x0: int, y0: int, x1: int, y1: int) -> Tuple[int, int]:
+        """clamp_move in steps of at most one cell, so a long step cannot jump over a thin wall"""
+        steps = max(1, math.ceil(max(abs(x1 - x0), abs(y1 - y0)) / self.cell))
+        x, y = x0, y0
+        for step in range(1, steps + 1):
+            x, y = self.clamp_move(x, y, x0 + (x1 - x0) * step // steps, y0 + (y1 - y0) * step // steps)
+        return x, y
+
+
+class OccupancyGrids:
+    """LRU of per-room occupancy grids, loaded from the room's objects on first use
+    and kept up to date by ObjectService.
+
+    When other workers can change the same rooms, ``on_change`` tells them
+    about every object change and only the rooms in ``tracked`` (the ones
+    whose changes this worker hears about) are cached; any other room gets a
+    fresh grid on every call.
+    """
+
+    def __init__(self, max_rooms: int = OCCUPANCY_ROOMS):
+        self.max_rooms = max_rooms
+        self._rooms: "OrderedDict[int, OccupancyGrid]" = OrderedDict()
+        # 캐시해도 되는 방 (None이면 모든 방)
+        self.tracked: Optional[Set[int]] = None
+        # room_id -> None, 오브젝트가 바뀔 때마다 호출 (다른 워커에 알린다)
+        self.on_change: Optional[Callable[[int], None]] = None
+
+    def get(self, room_id: int, load: Callable[[int], Iterable[ObjectRow]]) -> OccupancyGrid:
+        if self.tracked is not None and room_id not in self.tracked:
+            self._rooms.pop(room_id, None)
+            return OccupancyGrid(room_id, load(room_id))
+        grid = self._rooms.get(room_id)
+        if grid is not None:
+            self._rooms.move_to_end(room_id)
+            return grid
+        grid = self._rooms[room_id] = OccupancyGrid(room_id, load(room_id))
+        while len(self._rooms) > self.max_rooms:
+            self._rooms.popitem(last=False)
+        return grid
+
+    def peek(self, room_id: int) -> Optional[OccupancyGrid]:
+        return self._rooms.get(room_id)
+
+    def object_saved(self, room_id: int, row: ObjectRow):
+        grid = self._rooms.get(room_id)
+        if grid is not None:
+            object_id, object_type, x, y, rotation, _ = row
+            grid.place(object_id, object_type, x, y, rotation)
+        if self.on_change is not None:
+            self.on_change(room_id)
+
+    def object_removed(self, room_id: int, object_id: int):
+        grid = self._rooms.get(room_id)
+        if grid is not None:
+            grid.remove(object_id)
+        if self.on_change is not None:
+            self.on_change(room_id)
+
+    def drop(self, room_id: int):
+        self._rooms.pop(room_id, None)
+
+
+# 프로세스 전체에서 공유 (ObjectService가 갱신하고 배치/이동 검사에 사용)
+occupancy = OccupancyGrids()
@@ -0,0 +1,155 @@
+import asyncio
+import contextvars
+import itertools
+from collections import deque, OrderedDict
+from enum import Enum, IntEnum
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Union
+
+Frame = Union[str, bytes]
+
+
+class Lane(IntEnum):
+    """Outbound priority lanes. Lower value is drained first."""
+    CONTROL = 0    # errors, RTC signaling
+    EVENTS = 1     # chat, tool usage, joins/leaves, snapshots
+    POSITIONS = 2  # position updates
+
+
+class OverflowPolicy(str, Enum):
+    """What to do when a connection's queue is full"""
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+
+class OutboundQueue:
+    """Bounded per-connection send queue drained by a single writer task.
+
+    Handlers only enqueue, so a client with a full TCP buffer stalls its own
+    writer instead of the handler that produced the event. Position frames
+    are the only frames that may be dropped or coalesced; if the queue is
+    full of frames that must be delivered the queue reports an overflow and
+    the owner is expected to disconnect the client.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Frame], Awaitable[bool]],
+        maxsize: int = 256,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        on_failure: Optional[Callable[[], None]] = None,
+    ):
+        self._send = send
+        self._on_failure = on_failure
+        self.maxsize = maxsize
+        self.policy = policy
+        self._control: Deque[Frame] = deque()
+        self._events: Deque[Frame] = deque()
+        # key -> frame; coalesced positions keep their original slot
+        self._positions: "OrderedDict[Hashable, Frame]" = OrderedDict()
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.overflows = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._control) + len(self._events) + len(self._positions)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._writer(), context=contextvars.Context())
+
+    def close(self):
+        self.closed = True
+        self._control.clear()
+        self._events.clear()
+        self._positions.clear()
+        self._drained.set()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
+
+    def put(self, frame: Frame, lane: Lane = Lane.EVENTS, key: Optional[Hashable] = None) -> bool:
+        """Enqueue a frame. Returns False when the client must be disconnected."""
+        if self.closed:
+            return False
+
+        if lane == Lane.POSITIONS and key is not None and self.policy == OverflowPolicy.COALESCE:
+            if key in self._positions:
+                self._positions[key] = frame
+                self.coalesced += 1
+                return True
+
+        if self.depth >= self.maxsize:
+            self.overflows += 1
+            if self.policy == OverflowPolicy.DISCONNECT:
+                return False
+            if self._positions:
+                self._positions.popitem(last=False)
+                self.dropped += 1
+            elif lane == Lane.POSITIONS:
+                self.dropped += 1
+                return True
+            else:
+                # 버릴 수 있는 위치 프레임이 없다 – 클라이언트가 따라오지 못하는 상태
+                return False
+
+        if lane == Lane.CONTROL:
+            self._control.append(frame)
+        elif lane == Lane.EVENTS:
+            self._events.append(frame)
+        else:
+            if key is None or self.policy != OverflowPolicy.COALESCE:
+                key = ("seq", next(self._seq))
+            self._positions[key] = frame
+        self._wakeup.set()
+        return True
+
+    async def wait_below(self, depth: int):
+        """Wait until at most ``depth`` frames are queued (bulk senders pace themselves with this)"""
+        while not self.closed and self.depth > depth:
+            self._drained.clear()
+            await self._drained.wait()
+
+    def _pop(self) -> Optional[Frame]:
+        if self._control:
+            return self._control.popleft()
+        if self._events:
+            return self._events.popleft()
+        if self._positions:
+            return self._positions.popitem(last=False)[1]
+        return None
+
+    async def _writer(self):
+        while not self.closed:
+            frame = self._pop()
+            if frame is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if not await self._send(frame):
+                self.closed = True
+                self._drained.set()
+                if self._on_failure is not None:
+                    self._on_failure()
+                return
+            self.sent += 1
+            self._drained.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "control": len(self._control),
+            "events": len(self._events),
+            "positions": len(self._positions),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "overflows": self.overflows,
+        }
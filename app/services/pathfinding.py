@@ -0,0 +1,183 @@
+import os
+import heapq
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services.occupancy import Cell, OccupancyGrid
+
+# Configuration
+# 캐시할 경로 수 (격자 version, 출발 칸, 도착 칸 기준 LRU)
+PATH_CACHE_SIZE = int(os.getenv("PATH_CACHE_SIZE", "4096"))
+# A* 한 번에 펼칠 최대 칸 수 – 넘으면 길이 없는 것으로 본다
+PATH_MAX_NODES = int(os.getenv("PATH_MAX_NODES", "20000"))
+# move_to 이동 속도 (월드 단위/초); 클라이언트는 이 속도로 경로를 보간한다
+MOVE_SPEED = float(os.getenv("MOVE_SPEED", "160"))
+
+Point = Tuple[int, int]
+
+_STEPS = [(1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+          (1, 1, math.sqrt(2)), (1, -1, math.sqrt(2)), (-1, 1, math.sqrt(2)), (-1, -1, math.sqrt(2))]
+
+
+def _octile(a: Cell, b: Cell) -> float:
+    dx, dy = abs(a[0] - b[0]), abs(a[1] - b[1])
+    return max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)
+
+
+def find_path(grid: OccupancyGrid, start: Cell, goal: Cell, max_nodes: int = PATH_MAX_NODES) -> Optional[List[Cell]]:
+    """A* over free cells (8 directions, no cutting past blocked corners).
+
+    Returns the corners of the path after cutting every detour that has a
+    clear straight line (start and goal included), or None if the goal is
+    blocked or unreachable within ``max_nodes``.
+    """
+    blocked = grid.blocked()
+    rows, cols = len(blocked), len(blocked[0]) if blocked else 0
+
+    def free(col: int, row: int) -> bool:
+        return 0 <= col < cols and 0 <= row < rows and not blocked[row][col]
+
+    if not free(*goal):
+        return None
+    if start == goal:
+        return [start]
+    came_from: Dict[Cell, Cell] = {}
+    cost: Dict[Cell, float] = {start: 0.0}
+    frontier = [(_octile(start, goal), 0.0, start)]
+    expanded = 0
+    while frontier:
+        _, spent, cell = heapq.heappop(frontier)
+        if cell == goal:
+            return _corners(_trace(came_from, start, goal), free)
+        if spent > cost.get(cell, math.inf):
+            continue
+        expanded += 1
+        if expanded > max_nodes:
+            return None
+        col, row = cell
+        for dx, dy, step in _STEPS:
+            nxt = (col + dx, row + dy)
+            if not free(*nxt):
+                continue
+            if dx and dy and not (free(col + dx, row) and free(col, row + dy)):
+                continue
+            total = spent + step
+            if total < cost.get(nxt, math.inf):
+                cost[nxt] = total
+                came_from[nxt] = cell
+                heapq.heappush(frontier, (total + _octile(nxt, goal), total, nxt))
+    return None
+
+
+def _trace(came_from: Dict[Cell, Cell], start: Cell, goal: Cell) -> List[Cell]:
+    cells = [goal]
+    while cells[-1] != start:
+        cells.append(came_from[cells[-1]])
+    cells.reverse()
+    return cells
+
+
+def _clear(a: Cell, b: Cell, free: Callable[[int, int], bool]) -> bool:
+    """Whether the straight line a-b crosses only free cells (diagonal steps need both sides free)"""
+    col, row = a
+    dx, dy = abs(b[0] - col), abs(b[1] - row)
+    sx, sy = (1 if b[0] > col else -1), (1 if b[1] > row else -1)
+    err = dx - dy
+    while (col, row) != b:
+        doubled = 2 * err
+        step_x, step_y = doubled > -dy, doubled < dx
+        if step_x and step_y and not (free(col + sx, row) and free(col, row + sy)):
+            return False
+        if step_x:
+            err -= dy
+            col += sx
+        if step_y:
+            err += dx
+            row += sy
+        if not free(col, row):
+            return False
+    return True
+
+
+def _corners(cells: List[Cell], free: Callable[[int, int], bool]) -> List[Cell]:
+    corners = [cells[0]]
+    anchor = 0
+    while anchor < len(cells) - 1:
+        # 직선으로 이어지는 동안 다음 칸으로 건너뛴다
+        reach = anchor + 1
+        while reach + 1 < len(cells) and _clear(cells[anchor], cells[reach + 1], free):
+            reach += 1
+        corners.append(cells[reach])
+        anchor = reach
+    return corners
+
+
+class PathCache:
+    """LRU of A* results keyed by (grid version, start cell, goal cell).
+
+    Grid versions are unique across rooms and change with every object
+    placed, moved or removed, so a cached path is never stale and needs no
+    invalidation; unreachable goals are cached too.
+    """
+
+    def __init__(self, max_paths: int = PATH_CACHE_SIZE):
+        self.max_paths = max_paths
+        self._paths: "OrderedDict[Tuple[int, Cell, Cell], Optional[Tuple[Cell, ...]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def route(self, grid: OccupancyGrid, start: Point, goal: Point) -> Optional[List[Point]]:
+        """World-space waypoints from ``start`` to ``goal`` (cell centers in between), or None"""
+        start_cell, goal_cell = grid.cell_of(*start), grid.cell_of(*goal)
+        key = (grid.version, start_cell, goal_cell)
+        if key in self._paths:
+            self._paths.move_to_end(key)
+            self.hits += 1
+            cells = self._paths[key]
+        else:
+            self.misses += 1
+            found = find_path(grid, start_cell, goal_cell)
+            cells = self._paths[key] = tuple(found) if found is not None else None
+            while len(self._paths) > self.max_paths:
+                self._paths.popitem(last=False)
+        if cells is None:
+            return None
+        half = grid.cell // 2
+        middle = [(col * grid.cell + half, row * grid.cell + half) for col, row in cells[1:-1]]
+        return [start] + middle + [goal]
+
+
+class Walk:
+    """A path being followed at ``speed`` since ``started`` (time.time())"""
+    __slots__ = ("path", "speed", "started", "_ends")
+
+    def __init__(self, path: List[Point], speed: float = MOVE_SPEED, started: Optional[float] = None):
+        self.path = path
+        self.speed = speed
+        self.started = time.time() if started is None else started
+        # 각 구간이 끝나는 누적 거리
+        self._ends: List[float] = []
+        travelled = 0.0
+        for (x0, y0), (x1, y1) in zip(path, path[1:]):
+            travelled += math.hypot(x1 - x0, y1 - y0)
+            self._ends.append(travelled)
+
+    @property
+    def duration(self) -> float:
+        return (self._ends[-1] if self._ends else 0.0) / self.speed
+
+    def position_at(self, now: Optional[float] = None) -> Point:
+        distance = max(0.0, (time.time() if now is None else now) - self.started) * self.speed
+        begun = 0.0
+        for (x0, y0), (x1, y1), end in zip(self.path, self.path[1:], self._ends):
+            if distance < end:
+                ratio = (distance - begun) / (end - begun) if end > begun else 1.0
+                return (round(x0 + (x1 - x0) * ratio), round(y0 + (y1 - y0) * ratio))
+            begun = end
+        return self.path[-1]
+
+
+# 프로세스 전체에서 공유
+paths = PathCache()
@@ -0,0 +1,147 @@
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 압축 위치 스트림 이벤트 이름 (바이트 절약을 위해 짧게 유지)
+EVENT_SESSIONS = "position_sessions"
+EVENT_KEYFRAME = "pk"
+EVENT_DELTA = "pd"
+
+DELTA_LIMIT = 127  # 한 축의 델타가 int8 범위를 넘으면 키프레임으로 재동기화
+
+
+class _RoomStream:
+    __slots__ = ("sids", "users", "free", "next_sid", "positions", "baseline", "epoch", "keyframe_at", "dirty")
+
+    def __init__(self):
+        self.sids: Dict[int, int] = {}       # user_id -> sid
+        self.users: Dict[int, int] = {}      # sid -> user_id
+        self.free: List[int] = []
+        self.next_sid = 1
+        self.positions: Dict[int, Tuple[int, int]] = {}  # sid -> quantized (x, y)
+        self.baseline: Dict[int, Tuple[int, int]] = {}
+        self.epoch = 0
+        self.keyframe_at = 0.0
+        self.dirty = True
+
+
+class PositionStream:
+    """Compact position stream shared by every opted-in connection in a room.
+
+    Users get a short numeric session id (sid) per room. Positions are
+    quantized to ``quantum`` pixels and sent as deltas against the room's last
+    keyframe, as a flat list ``[epoch, sid, dx, dy, sid, dx, dy, ...]``;
+    keyframes are ``[epoch, quantum, sid, qx, qy, ...]``.
+    Keyframes go out on the reliable lane, so the baseline every client holds
+    is always the latest one; a delta whose epoch does not match the client's
+    keyframe is stale and ignored. A new keyframe is cut on join/leave, every
+    ``keyframe_interval`` seconds, or when a delta leaves the int8 range.
+    """
+
+    def __init__(self, quantum: int = 4, keyframe_interval: float = 5.0):
+        self.quantum = max(1, quantum)
+        self.keyframe_interval = keyframe_interval
+        self._rooms: Dict[int, _RoomStream] = {}
+
+    def _quantize(self, x: int, y: int) -> Tuple[int, int]:
+        q = self.quantum
+        return (int(round(x / q)), int(round(y / q)))
+
+    def join(self, room_id: int, user_id: int, x: int, y: int) -> int:
+        room = self._rooms.setdefault(room_id, _RoomStream())
+        sid = room.sids.get(user_id)
+        if sid is None:
+            if room.free:
+                sid = room.free.pop()
+            else:
+                sid = room.next_sid
+                room.next_sid += 1
+            room.sids[user_id] = sid
+            room.users[sid] = user_id
+        room.positions[sid] = self._quantize(x, y)
+        room.dirty = True
+        return sid
+
+    def leave(self, room_id: int, user_id: int):
+        room = self._rooms.get(room_id)
+        if room is None:
+            return
+        sid = room.sids.pop(user_id, None)
+        if sid is not None:
+            room.users.pop(sid, None)
+            room.positions.pop(sid, None)
+            room.baseline.pop(sid, None)
+            room.free.append(sid)
+            room.dirty = True
+        if not room.sids:
+            del self._rooms[room_id]
+
+    def sid(self, room_id: int, user_id: int) -> Optional[int]:
+        room = self._rooms.get(room_id)
+        return room.sids.get(user_id) if room is not None else None
+
+    def update(self, room_id: int, user_id: int, x: int, y: int) -> bool:
+        """Record a move; returns True when a keyframe should be sent"""
+        room = self._rooms.get(room_id)
+        if room is None or user_id not in room.sids:
+            return False
+        sid = room.sids[user_id]
+        qx, qy = self._quantize(x, y)
+        room.positions[sid] = (qx, qy)
+        base = room.baseline.get(sid)
+        if base is None or abs(qx - base[0]) > DELTA_LIMIT or abs(qy - base[1]) > DELTA_LIMIT:
+            room.dirty = True
+        return self.keyframe_due(room_id)
+
+    def keyframe_due(self, room_id: int) -> bool:
+        room = self._rooms.get(room_id)
+        if room is None:
+            return False
+        return room.dirty or time.monotonic() - room.keyframe_at >= self.keyframe_interval
+
+    def take_keyframe(self, room_id: int) -> Dict[str, object]:
+        """Re-baseline the room and return the keyframe frame payload"""
+        room = self._rooms.setdefault(room_id, _RoomStream())
+        room.epoch = (room.epoch + 1) % 256
+        room.baseline = dict(room.positions)
+        room.keyframe_at = time.monotonic()
+        room.dirty = False
+        return self.current_keyframe(room_id)
+
+    def current_keyframe(self, room_id: int) -> Dict[str, object]:
+        """Last keyframe, e.g. for a connection that just joined"""
+        room = self._rooms.get(room_id) or _RoomStream()
+        flat: List[int] = [room.epoch, self.quantum]
+        for sid, (qx, qy) in room.baseline.items():
+            flat.extend((sid, qx, qy))
+        return {"event": EVENT_KEYFRAME, "data": flat}
+
+    def delta(self, room_id: int, user_ids: Iterable[int]) -> Optional[Dict[str, object]]:
+        room = self._rooms.get(room_id)
+        if room is None:
+            return None
+        flat: List[int] = [room.epoch]
+        for user_id in user_ids:
+            sid = room.sids.get(user_id)
+            if sid is None:
+                continue
+            base = room.baseline.get(sid)
+            if base is None:
+                continue
+            qx, qy = room.positions[sid]
+            flat.extend((sid, qx - base[0], qy - base[1]))
+        if len(flat) == 1:
+            return None
+        return {"event": EVENT_DELTA, "data": flat}
+
+    def sessions(self, room_id: int, profiles: Dict[int, Tuple[str, Optional[str]]], user_ids: Optional[Iterable[int]] = None) -> Dict[str, object]:
+        """sid -> user metadata, sent once per user instead of on every move"""
+        room = self._rooms.get(room_id) or _RoomStream()
+        ids = room.sids.keys() if user_ids is None else user_ids
+        entries = []
+        for user_id in ids:
+            sid = room.sids.get(user_id)
+            if sid is None:
+                continue
+            username, avatar_url = profiles.get(user_id, ("", None))
+            entries.append({"sid": sid, "user_id": user_id, "username": username, "avatar_url": avatar_url})
+        return {"event": EVENT_SESSIONS, "data": {"room_id": room_id, "sessions": entries}}
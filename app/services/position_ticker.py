@@ -0,0 +1,89 @@
+import json
+import asyncio
+import contextvars
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (user_id, username, avatar_url, x, y)
+PositionEntry = Tuple[int, str, Optional[str], int, int]
+
+
+class PositionTicker:
+    """Per-room tick loop that coalesces position updates.
+
+    Moves are stored latest-wins per user and handed to ``flush`` once per
+    tick; the owner turns each batch into ``positions_batch`` frames (see
+    ``encode``). A room's loop starts on the first move and stops after
+    ``idle_ticks`` empty ticks.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[int, Dict[int, PositionEntry]], Awaitable[None]],
+        hz: float = 20.0,
+        idle_ticks: int = 50,
+    ):
+        self._flush = flush
+        self.interval = 1.0 / hz
+        self.idle_ticks = idle_ticks
+        self._pending: Dict[int, Dict[int, PositionEntry]] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    def submit(self, room_id: int, user_id: int, username: str, avatar_url: Optional[str], x: int, y: int):
+        self._pending.setdefault(room_id, {})[user_id] = (user_id, username, avatar_url, x, y)
+        if room_id not in self._tasks:
+            # 방 루프는 시작시킨 요청보다 오래 산다 – 빈 컨텍스트에서 돌린다
+            self._tasks[room_id] = asyncio.create_task(self._run(room_id), context=contextvars.Context())
+
+    def discard(self, room_id: int, user_id: int):
+        """Forget a pending move, e.g. when the user leaves before the next tick"""
+        pending = self._pending.get(room_id)
+        if pending:
+            pending.pop(user_id, None)
+
+    def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        self._pending.clear()
+
+    @staticmethod
+    def encode(room_id: int, entries: Iterable[PositionEntry]) -> str:
+        return json.dumps({
+            "event": "positions_batch",
+            "data": {
+                "room_id": room_id,
+                "positions": [
+                    {"user_id": uid, "username": name, "avatar_url": avatar, "x": x, "y": y}
+                    for uid, name, avatar, x, y in entries
+                ],
+            },
+            "timestamp": datetime.utcnow().isoformat(),
+        }, separators=(",", ":"))
+
+    async def _run(self, room_id: int):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        idle = 0
+        try:
+            while True:
+                next_tick = max(next_tick + self.interval, loop.time())
+                await asyncio.sleep(next_tick - loop.time())
+                batch = self._pending.pop(room_id, None)
+                if not batch:
+                    idle += 1
+                    if idle >= self.idle_ticks:
+                        break
+                    continue
+                idle = 0
+                try:
+                    await self._flush(room_id, batch)
+                except Exception:
+                    # 한 번의 전송 실패로 방의 틱 루프가 멈추지 않도록 한다
+                    logger.exception("Position flush failed for room %s", room_id)
+        finally:
+            if self._tasks.get(room_id) is asyncio.current_task():
+                del self._tasks[room_id]
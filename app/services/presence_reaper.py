@@ -0,0 +1,88 @@
+import time
+import asyncio
+import contextvars
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from app.services.connection_registry import Connection, ConnectionRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceReaper:
+    """Heartbeat and ghost-presence sweep over every local connection.
+
+    Every ``interval`` seconds: connections silent for ``ping_interval`` get a
+    ping (once per interval), connections silent for ``idle_timeout`` are
+    handed to ``evict``. Users who left a room without ``leave_room`` (closed
+    tab, dead socket, eviction) are collected with ``departed`` and handed to
+    ``flush`` once per sweep, grouped by room, so their rows are deleted and
+    announced in bulk.
+    """
+
+    def __init__(
+        self,
+        registry: ConnectionRegistry,
+        ping: Callable[[List[Connection]], Awaitable[None]],
+        evict: Callable[[List[Connection]], Awaitable[None]],
+        flush: Callable[[Dict[int, Set[int]]], Awaitable[None]],
+        interval: float = 2.0,
+        ping_interval: float = 15.0,
+        idle_timeout: float = 45.0,
+    ):
+        self.registry = registry
+        self._ping = ping
+        self._evict = evict
+        self._flush = flush
+        self.interval = interval
+        self.ping_interval = ping_interval
+        self.idle_timeout = idle_timeout
+        self._departed: Dict[int, Set[int]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.pinged = 0
+        self.evicted = 0
+
+    def departed(self, room_id: int, user_id: int):
+        self._departed.setdefault(room_id, set()).add(user_id)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def sweep(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        stale: List[Connection] = []
+        to_ping: List[Connection] = []
+        if self.ping_interval > 0 or self.idle_timeout > 0:
+            for conn in self.registry:
+                silent = now - conn.last_seen
+                if self.idle_timeout > 0 and silent >= self.idle_timeout:
+                    stale.append(conn)
+                elif 0 < self.ping_interval <= silent and now - conn.pinged_at >= self.ping_interval:
+                    conn.pinged_at = now
+                    to_ping.append(conn)
+        if to_ping:
+            self.pinged += len(to_ping)
+            await self._ping(to_ping)
+        if stale:
+            self.evicted += len(stale)
+            await self._evict(stale)
+        if self._departed:
+            departed, self._departed = self._departed, {}
+            await self._flush(departed)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # 한 번의 실패로 하트비트 루프가 멈추지 않도록 한다
+                logger.exception("Presence sweep failed")
@@ -0,0 +1,169 @@
+import os
+import asyncio
+import contextvars
+import logging
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# 메모리의 위치를 room_users에 몰아서 쓰는 주기(초)
+PRESENCE_FLUSH_INTERVAL = float(os.getenv("PRESENCE_FLUSH_INTERVAL", "5"))
+
+
+class Presence:
+    """One user's live position in a room, plus what REST needs to render it"""
+    __slots__ = ("row_id", "room_id", "user_id", "x", "y", "last_seen", "username", "avatar_url", "user_created_at")
+
+    def __init__(self, row_id: int, room_id: int, user_id: int, x: int, y: int, last_seen: Optional[datetime],
+                 username: str, avatar_url: Optional[str], user_created_at: Optional[datetime]):
+        self.row_id = row_id
+        self.room_id = room_id
+        self.user_id = user_id
+        self.x = x
+        self.y = y
+        self.last_seen = last_seen or datetime.now(timezone.utc)
+        self.username = username
+        self.avatar_url = avatar_url
+        self.user_created_at = user_created_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Same shape as schemas.RoomUserWithUser"""
+        return {
+            "id": self.row_id,
+            "room_id": self.room_id,
+            "user_id": self.user_id,
+            "x": self.x,
+            "y": self.y,
+            "last_seen": self.last_seen,
+            "user": {
+                "id": self.user_id,
+                "username": self.username,
+                "avatar_url": self.avatar_url,
+                "created_at": self.user_created_at,
+            },
+        }
+
+    def to_entry(self) -> Dict[str, Any]:
+        """JSON-safe form for a shared backend (see redis_client.RoomUserCache)"""
+        return {
+            "id": self.row_id,
+            "x": self.x,
+            "y": self.y,
+            "last_seen": self.last_seen.isoformat(),
+            "username": self.username,
+            "avatar_url": self.avatar_url,
+            "created_at": self.user_created_at.isoformat() if self.user_created_at else None,
+        }
+
+    @classmethod
+    def from_entry(cls, room_id: int, user_id: int, entry: Dict[str, Any]) -> "Presence":
+        created_at = entry.get("created_at")
+        return cls(
+            entry["id"], room_id, user_id, entry["x"], entry["y"], datetime.fromisoformat(entry["last_seen"]),
+            entry.get("username", ""), entry.get("avatar_url"),
+            datetime.fromisoformat(created_at) if created_at else None,
+        )
+
+
+class PresenceStore:
+    """Authoritative in-process presence; room_users is written behind.
+
+    Moves only touch memory and mark the row dirty. A background flusher
+    hands the dirty rows to ``flush`` every ``interval`` seconds, which
+    writes them with one bulk UPDATE. Rooms that have no entry here (not
+    hosted by this process, or not touched since a restart) are read from
+    the database by the caller.
+    """
+
+    def __init__(self, interval: float = PRESENCE_FLUSH_INTERVAL):
+        self.interval = interval
+        self._rooms: Dict[int, Dict[int, Presence]] = {}
+        self._user_room: Dict[int, int] = {}
+        self._dirty: Dict[int, Presence] = {}  # row_id -> presence
+        self._task: Optional[asyncio.Task] = None
+        self.flushed = 0
+
+    def put(self, presence: Presence):
+        """Register a (re)joined row; a user is in one room at a time"""
+        previous_room = self._user_room.get(presence.user_id)
+        if previous_room is not None:
+            self.remove(previous_room, presence.user_id)
+        self._rooms.setdefault(presence.room_id, {})[presence.user_id] = presence
+        self._user_room[presence.user_id] = presence.room_id
+
+    def get(self, room_id: int, user_id: int) -> Optional[Presence]:
+        room = self._rooms.get(room_id)
+        return room.get(user_id) if room is not None else None
+
+    def move(self, room_id: int, user_id: int, x: int, y: int) -> Optional[Presence]:
+        presence = self.get(room_id, user_id)
+        if presence is None:
+            return None
+        presence.x = x
+        presence.y = y
+        presence.last_seen = datetime.now(timezone.utc)
+        self._dirty[presence.row_id] = presence
+        return presence
+
+    def remove(self, room_id: int, user_id: int) -> Optional[Presence]:
+        room = self._rooms.get(room_id)
+        if room is None:
+            return None
+        presence = room.pop(user_id, None)
+        if not room:
+            del self._rooms[room_id]
+        if presence is not None:
+            # 행이 삭제되므로 밀린 위치 쓰기도 버린다
+            self._dirty.pop(presence.row_id, None)
+            if self._user_room.get(user_id) == room_id:
+                del self._user_room[user_id]
+        return presence
+
+    def has_room(self, room_id: int) -> bool:
+        return room_id in self._rooms
+
+    def room(self, room_id: int) -> List[Presence]:
+        return list(self._rooms.get(room_id, {}).values())
+
+    def rooms(self) -> Dict[int, List[Presence]]:
+        return {room_id: list(room.values()) for room_id, room in self._rooms.items()}
+
+    def take_dirty(self) -> List[Presence]:
+        dirty, self._dirty = self._dirty, {}
+        return list(dirty.values())
+
+    def restore_dirty(self, presences: Iterable[Presence]):
+        """Re-queue rows whose flush failed (unless they were removed meanwhile)"""
+        for presence in presences:
+            if self.get(presence.room_id, presence.user_id) is presence:
+                self._dirty.setdefault(presence.row_id, presence)
+
+    @property
+    def dirty_count(self) -> int:
+        return len(self._dirty)
+
+    def ensure_flusher(self, flush: Callable[[], Awaitable[int]]):
+        if self._task is None or self._task.done():
+            # 프로세스 전체 루프 – 처음 호출한 요청의 컨텍스트(batch의 공유 트랜잭션 등)를 물려받지 않는다
+            self._task = asyncio.get_running_loop().create_task(self._run(flush), context=contextvars.Context())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self, flush: Callable[[], Awaitable[int]]):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.flushed += await flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Presence flush failed")
+
+
+# 프로세스 전체에서 공유 (WebSocket 서비스와 REST 라우터의 RoomService가 같은 저장소를 본다)
+presence_store = PresenceStore()
@@ -0,0 +1,104 @@
+import time
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+Limit = Tuple[float, float]  # (tokens per second, burst)
+
+
+def parse_limit(spec: str) -> Optional[Limit]:
+    """"rate/burst" -> (rate, burst); empty or "0" disables the limit"""
+    spec = (spec or "").strip()
+    if not spec or spec == "0":
+        return None
+    rate, _, burst = spec.partition("/")
+    rate_f = float(rate)
+    return (rate_f, float(burst) if burst else max(1.0, rate_f))
+
+
+def parse_event_limits(spec: str) -> Dict[str, Limit]:
+    """"update_position=20/40,send_message=2/5" -> {event: (rate, burst)}"""
+    limits: Dict[str, Limit] = {}
+    for item in (spec or "").split(","):
+        event, _, value = item.strip().partition("=")
+        limit = parse_limit(value)
+        if event and limit is not None:
+            limits[event.strip()] = limit
+    return limits
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def wait(self, now: float) -> float:
+        """Seconds until one token is available (0 if one is available now)"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1.0
+
+
+class ConnectionLimiter:
+    """Token buckets for one connection: one for all events, one per event type.
+
+    ``check`` spends a token from both buckets or returns the retry-after in
+    seconds without spending anything. Over-limit moves are not rejected:
+    ``defer`` keeps only the latest one and replays it once a token is due.
+    """
+
+    __slots__ = ("total", "events", "hits", "_deferred", "_timer")
+
+    def __init__(self, total: Optional[Limit], per_event: Dict[str, Limit]):
+        self.total = TokenBucket(*total) if total is not None else None
+        self.events: Dict[str, TokenBucket] = {event: TokenBucket(*limit) for event, limit in per_event.items()}
+        self.hits: Dict[str, int] = {}
+        self._deferred: Optional[Tuple[Dict[str, Any], Callable[[Dict[str, Any]], Awaitable[None]]]] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def check(self, event: str, shared: bool = True) -> float:
+        """``shared=False`` leaves the all-events bucket out (only a per-event limit applies)"""
+        now = time.monotonic()
+        bucket = self.events.get(event)
+        total = self.total if shared else None
+        wait = bucket.wait(now) if bucket is not None else 0.0
+        if total is not None:
+            wait = max(wait, total.wait(now))
+        if wait > 0:
+            self.hits[event] = self.hits.get(event, 0) + 1
+            return wait
+        if bucket is not None:
+            bucket.take()
+        if total is not None:
+            total.take()
+        return 0.0
+
+    def defer(self, message: Dict[str, Any], wait: float, replay: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """Hold the latest over-limit message and replay it after ``wait`` seconds"""
+        self._deferred = (message, replay)
+        if self._timer is None:
+            # 요청 처리 중의 컨텍스트(cid, batch 결과)를 물려받지 않도록 빈 컨텍스트에서 실행
+            self._timer = asyncio.get_running_loop().call_later(wait, self._fire, context=contextvars.Context())
+
+    def _fire(self):
+        self._timer = None
+        deferred, self._deferred = self._deferred, None
+        if deferred is not None:
+            message, replay = deferred
+            asyncio.create_task(replay(message))
+
+    def cancel(self):
+        """Drop a held message, e.g. because a newer one was let through"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._deferred = None
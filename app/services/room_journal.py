@@ -0,0 +1,77 @@
+import uuid
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Tuple, Union
+
+from app.services.ws_codec import EventFrame, OutboundFrame
+
+Message = Union[str, OutboundFrame]
+
+
+def with_seq(message: Message, seq: int) -> OutboundFrame:
+    """Copy of an envelope with ``"seq"`` added, without re-encoding JSON text"""
+    if isinstance(message, str):
+        message = OutboundFrame(text=message)
+    if isinstance(message, EventFrame):
+        return message.with_seq(seq)
+    text = message.cached_text
+    if text is not None and text.startswith("{") and len(text) > 2:
+        return OutboundFrame(text='{"seq":%d,%s' % (seq, text[1:]))
+    return OutboundFrame({**message.payload, "seq": seq})
+
+
+class _Journal:
+    __slots__ = ("epoch", "seq", "frames")
+
+    def __init__(self, size: int):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.frames: Deque[Tuple[int, OutboundFrame]] = deque(maxlen=size)
+
+
+class RoomJournal:
+    """Per-room sequence numbers plus a ring buffer of the latest frames.
+
+    A journal is identified by a random epoch, so a resume token issued by
+    another worker or before a restart never matches. Journals are kept for
+    the ``max_rooms`` most recently active rooms, so a user who was alone
+    in a room can still resume after a short disconnect.
+    """
+
+    def __init__(self, size: int = 256, max_rooms: int = 1024):
+        self.size = size
+        self.max_rooms = max_rooms
+        self._rooms: "OrderedDict[int, _Journal]" = OrderedDict()
+
+    def _journal(self, room_id: int) -> _Journal:
+        journal = self._rooms.get(room_id)
+        if journal is None:
+            journal = self._rooms[room_id] = _Journal(self.size)
+            while len(self._rooms) > self.max_rooms:
+                self._rooms.popitem(last=False)
+        else:
+            self._rooms.move_to_end(room_id)
+        return journal
+
+    def append(self, room_id: int, message: Message) -> OutboundFrame:
+        """Assign the room's next seq to a frame and remember it"""
+        journal = self._journal(room_id)
+        journal.seq += 1
+        frame = with_seq(message, journal.seq)
+        journal.frames.append((journal.seq, frame))
+        return frame
+
+    def token(self, room_id: int) -> Tuple[str, int]:
+        """(resume token, last seq) for a client joining the room now"""
+        journal = self._journal(room_id)
+        return f"{room_id}:{journal.epoch}", journal.seq
+
+    def since(self, room_id: int, token: str, last_seq: int) -> Optional[List[OutboundFrame]]:
+        """Frames after ``last_seq``, or None when the gap cannot be replayed"""
+        journal = self._rooms.get(room_id)
+        if journal is None or token != f"{room_id}:{journal.epoch}" or last_seq > journal.seq:
+            return None
+        if last_seq == journal.seq:
+            return []
+        if not journal.frames or journal.frames[0][0] > last_seq + 1:
+            return None
+        return [frame for seq, frame in journal.frames if seq > last_seq]
@@ -1,12 +1,50 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.models import Room, RoomUser
+import os
+from sqlalchemy import case, delete, update
+from sqlalchemy.orm import Session, joinedload
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.models import Room, RoomUser, User
 from app.schemas.room import RoomCreate, RoomUpdate
 from app.database import get_session
+from app.services.occupancy import OccupancyGrid, occupancy
+from app.services.presence_store import Presence, presence_store
+from app.services.room_snapshot import RoomSnapshotRepository
+from app.services.room_state_cache import room_states
+
+# Configuration
+# presence 공유 백엔드: memory (이 프로세스만) | redis (REDIS_URL, 워커 간 공유, 재시작 후에도 유지)
+PRESENCE_BACKEND = os.getenv("PRESENCE_BACKEND", "memory").lower()
+# 백플레인(WS_BACKPLANE)은 있고 방 샤딩(WS_SHARD_*)은 없으면 한 방의 사용자가 여러 워커에 흩어진다
+ROOMS_SHARED = (
+    os.getenv("WS_BACKPLANE", "none").lower() != "none"
+    and not (os.getenv("WS_SHARD_SELF") and os.getenv("WS_SHARD_WORKERS"))
+)
+# 벌크 UPDATE 한 문장에 담을 최대 행 수
+FLUSH_CHUNK = 500
+
+
+def create_presence_cache():
+    """Shared presence backend for PRESENCE_BACKEND, or None for in-process only"""
+    if PRESENCE_BACKEND == "redis":
+        from redis_client import RoomUserCache
+        return RoomUserCache()
+    return None
+
+
+def _presence(room_user: RoomUser, user: Optional[User]) -> Presence:
+    return Presence(
+        room_user.id, room_user.room_id, room_user.user_id, room_user.x, room_user.y, room_user.last_seen,
+        user.username if user is not None else "", user.avatar_url if user is not None else None,
+        user.created_at if user is not None else None,
+    )
+
+
+_presence_cache = create_presence_cache()
+
 
 class RoomService:
     def __init__(self):
-        pass
+        self.presence_cache = _presence_cache
+        self.snapshots = RoomSnapshotRepository()
 
     async def get_room(self, room_id: int) -> Optional[Room]:
         """Get room by ID"""
@@ -37,6 +75,7 @@ class RoomService:
     async def join_room(self, user_id: int, room_id: int, x: int = 0, y: int = 0) -> RoomUser:
         """Join a room"""
         with get_session() as db:
+            previous_rooms = [row.room_id for row in db.query(RoomUser.room_id).filter(RoomUser.user_id == user_id)]
             # Ensure user is in only one room at a time
             db.query(RoomUser).filter(RoomUser.user_id == user_id).delete()
             room_user = RoomUser(
@@ -48,10 +87,26 @@ class RoomService:
             db.add(room_user)
             db.commit()
             db.refresh(room_user)
-            return room_user
+            presence = _presence(room_user, room_user.user)
+        presence_store.put(presence)
+        stale = {previous: [user_id] for previous in previous_rooms if previous != room_id}
+        for previous in stale:
+            room_states.users_left(previous, [user_id])
+        room_states.user_joined(room_id, user_id, presence.x, presence.y, presence.username)
+        if self.presence_cache is not None:
+            if stale:
+                await self.presence_cache.remove_users(stale)
+            await self.presence_cache.set_user_position(room_id, user_id, presence.to_entry())
+            # 움직이지 않는 유저도 TTL 안에 다시 쓰이도록 flusher를 돌린다
+            presence_store.ensure_flusher(self.flush_positions)
+        return room_user
 
     async def leave_room(self, user_id: int, room_id: int) -> bool:
         """Leave a room"""
+        presence_store.remove(room_id, user_id)
+        room_states.users_left(room_id, [user_id])
+        if self.presence_cache is not None:
+            await self.presence_cache.remove_user_from_room(room_id, user_id)
         with get_session() as db:
             room_user = db.query(RoomUser).filter(
                 RoomUser.room_id == room_id,
@@ -63,16 +118,136 @@ class RoomService:
                 return True
             return False
 
-    async def update_user_position(self, user_id: int, room_id: int, x: int, y: int) -> Optional[RoomUser]:
-        """Update user position in room"""
+    async def remove_users(self, room_users: Dict[int, Iterable[int]]) -> Dict[int, List[int]]:
+        """Delete the RoomUser rows this process holds for many users in one statement ({room_id: user_ids}).
+
+        Rows are matched by id, so a user who joined again since (a new row,
+        possibly through another worker) keeps it. Returns the users actually
+        removed ({room_id: user_ids}).
+        """
+        rows: Dict[int, Tuple[int, int]] = {}
+        for room_id, user_ids in room_users.items():
+            for user_id in user_ids:
+                presence = presence_store.remove(room_id, user_id)
+                if presence is not None:
+                    rows[presence.row_id] = (room_id, user_id)
+        if not rows:
+            return {}
         with get_session() as db:
-            room_user = db.query(RoomUser).filter(
-                RoomUser.room_id == room_id,
-                RoomUser.user_id == user_id
-            ).first()
-            if room_user:
-                room_user.x = x
-                room_user.y = y
+            deleted = db.execute(
+                delete(RoomUser).where(RoomUser.id.in_(list(rows))).returning(RoomUser.id)
+            ).scalars().all()
+            db.commit()
+        removed: Dict[int, List[int]] = {}
+        room_rows: Dict[int, Dict[int, int]] = {}
+        for row_id in deleted:
+            room_id, user_id = rows[row_id]
+            removed.setdefault(room_id, []).append(user_id)
+            room_rows.setdefault(room_id, {})[user_id] = row_id
+        for room_id, user_ids in removed.items():
+            room_states.users_left(room_id, user_ids)
+        if self.presence_cache is not None and room_rows:
+            await self.presence_cache.remove_rows(room_rows)
+        return removed
+
+    async def get_room_users(self, room_id: int) -> List[Dict[str, Any]]:
+        """Users in a room with their live positions (RoomUserWithUser shape)"""
+        if self.presence_cache is not None:
+            # 모든 워커의 유저가 한 해시에 있다 (이 워커의 유저는 메모리 쪽이 최신)
+            entries = await self.presence_cache.get_room_users(room_id)
+            users = {user_id: Presence.from_entry(room_id, user_id, entry) for user_id, entry in entries.items()}
+            users.update((presence.user_id, presence) for presence in presence_store.room(room_id))
+            return [presence.to_dict() for presence in users.values()]
+        if ROOMS_SHARED:
+            # 다른 워커의 유저는 DB에만 있다 (마지막 flush 시점의 위치); 이 워커의 유저는 메모리 쪽이 최신
+            users = {}
+            for row in self.snapshots.users(room_id):
+                presence = Presence(*row)
+                users[presence.user_id] = presence
+            users.update((presence.user_id, presence) for presence in presence_store.room(room_id))
+            return [presence.to_dict() for presence in users.values()]
+        if presence_store.has_room(room_id):
+            return [presence.to_dict() for presence in presence_store.room(room_id)]
+        # 이 프로세스가 들고 있지 않은 방은 DB에서 한 번에 읽는다
+        return [Presence(*row).to_dict() for row in self.snapshots.users(room_id)]
+
+    async def load_room_state(self, room_id: int):
+        """(users, object rows) to materialize a RoomState from"""
+        users = [(ru["user_id"], (ru["x"], ru["y"], ru["user"]["username"])) for ru in await self.get_room_users(room_id)]
+        return users, self.snapshots.objects(room_id)
+
+    def occupancy(self, room_id: int) -> OccupancyGrid:
+        """The room's occupancy grid (loaded from its objects on first use)"""
+        return occupancy.get(room_id, self.snapshots.objects)
+
+    def current_position(self, user_id: int, room_id: int) -> Optional[Tuple[int, int]]:
+        presence = presence_store.get(room_id, user_id)
+        return (presence.x, presence.y) if presence is not None else None
+
+    def clamp_position(self, user_id: int, room_id: int, x: int, y: int) -> Tuple[int, int]:
+        """Where the user may actually go: inside the room, never onto a blocked cell"""
+        x0, y0 = self.current_position(user_id, room_id) or (x, y)
+        return self.occupancy(room_id).clamp_move(x0, y0, x, y)
+
+    async def update_user_position(self, user_id: int, room_id: int, x: int, y: int) -> Optional[Dict[str, Any]]:
+        """Update user position in room (memory only; written to room_users by the flusher)"""
+        presence = presence_store.move(room_id, user_id, x, y)
+        if presence is None and self.presence_cache is not None:
+            # 재시작 전에 공유 백엔드에 남겨 둔 항목으로 복구
+            entry = await self.presence_cache.get_user_position(room_id, user_id)
+            if entry is not None:
+                presence_store.put(Presence.from_entry(room_id, user_id, entry))
+                presence = presence_store.move(room_id, user_id, x, y)
+        if presence is None:
+            # 재시작 등으로 메모리에 없는 행 – 한 번 읽어 와서 저장소에 올린다
+            with get_session() as db:
+                room_user = db.query(RoomUser).options(joinedload(RoomUser.user)).filter(
+                    RoomUser.room_id == room_id,
+                    RoomUser.user_id == user_id
+                ).first()
+                if room_user is None:
+                    return None
+                presence_store.put(_presence(room_user, room_user.user))
+            presence = presence_store.move(room_id, user_id, x, y)
+        presence_store.ensure_flusher(self.flush_positions)
+        room_states.user_moved(room_id, user_id, x, y)
+        if self.presence_cache is not None:
+            await self.presence_cache.set_user_position(room_id, user_id, presence.to_entry())
+        return presence.to_dict()
+
+    async def flush_positions(self) -> int:
+        """Write every dirty position with one bulk UPDATE per chunk of rows
+
+        With a shared presence backend, also re-stamp every user this worker
+        holds so live users never reach the backend's TTL.
+        """
+        dirty = presence_store.take_dirty()
+        if dirty:
+            self._write_positions(dirty)
+        if self.presence_cache is not None:
+            # 이 워커가 들고 있는 유저를 모두 다시 써서 TTL을 연장
+            await self.presence_cache.set_users({
+                room_id: {p.user_id: p.to_entry() for p in presences}
+                for room_id, presences in presence_store.rooms().items()
+            })
+        return len(dirty)
+
+    def _write_positions(self, dirty: List[Presence]):
+        try:
+            with get_session() as db:
+                for i in range(0, len(dirty), FLUSH_CHUNK):
+                    chunk = dirty[i:i + FLUSH_CHUNK]
+                    db.execute(
+                        update(RoomUser)
+                        .where(RoomUser.id.in_([p.row_id for p in chunk]))
+                        .values(
+                            x=case({p.row_id: p.x for p in chunk}, value=RoomUser.id),
+                            y=case({p.row_id: p.y for p in chunk}, value=RoomUser.id),
+                            last_seen=case({p.row_id: p.last_seen for p in chunk}, value=RoomUser.id),
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
                 db.commit()
-                db.refresh(room_user)
-            return room_user
+        except Exception:
+            presence_store.restore_dirty(dirty)
+            raise
@@ -0,0 +1,88 @@
+import bisect
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes.
+
+    Adding or removing one of N workers only reassigns roughly 1/N of the
+    keys; every other room keeps its owner.
+    """
+
+    def __init__(self, nodes: Optional[List[str]] = None, replicas: int = 128):
+        self.replicas = replicas
+        self._ring: List[Tuple[int, str]] = []
+        self._hashes: List[int] = []
+        for node in nodes or []:
+            self.add(node)
+
+    def add(self, node: str):
+        for i in range(self.replicas):
+            bisect.insort(self._ring, (_hash(f"{node}#{i}"), node))
+        self._hashes = [h for h, _ in self._ring]
+
+    def remove(self, node: str):
+        self._ring = [(h, n) for h, n in self._ring if n != node]
+        self._hashes = [h for h, _ in self._ring]
+
+    def get(self, key: str) -> Optional[str]:
+        if not self._ring:
+            return None
+        i = bisect.bisect(self._hashes, _hash(key))
+        if i == len(self._hashes):
+            i = 0
+        return self._ring[i][1]
+
+
+class RoomSharding:
+    """Room-affinity sharding: every room_id is owned by exactly one worker.
+
+    Configured with ``WS_SHARD_WORKERS`` ("name=ws://host:port/api/v1/ws,...")
+    and ``WS_SHARD_SELF`` (this worker's name). Joins for a room owned by
+    another worker are answered with a redirect hint to the owner's URL.
+    """
+
+    def __init__(self, self_name: str, workers: Dict[str, str], replicas: int = 128):
+        if self_name not in workers:
+            raise ValueError(f"WS_SHARD_SELF {self_name!r} is not in WS_SHARD_WORKERS")
+        self.self_name = self_name
+        self.workers = dict(workers)
+        self.ring = HashRing(sorted(workers), replicas=replicas)
+
+    @classmethod
+    def from_config(cls, self_name: str, workers_spec: str) -> Optional["RoomSharding"]:
+        if not self_name or not workers_spec:
+            return None
+        workers: Dict[str, str] = {}
+        for item in workers_spec.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            name, _, url = item.partition("=")
+            workers[name.strip()] = url.strip()
+        return cls(self_name, workers)
+
+    def owner(self, room_id: int) -> str:
+        return self.ring.get(f"room:{room_id}")
+
+    def is_local(self, room_id: int) -> bool:
+        return self.owner(room_id) == self.self_name
+
+    def redirect_for(self, room_id: int) -> Dict[str, object]:
+        owner = self.owner(room_id)
+        return {"room_id": room_id, "worker": owner, "url": self.workers.get(owner)}
+
+    def add_worker(self, name: str, url: str):
+        if name not in self.workers:
+            self.workers[name] = url
+            self.ring.add(name)
+
+    def remove_worker(self, name: str):
+        if name in self.workers and name != self.self_name:
+            del self.workers[name]
+            self.ring.remove(name)
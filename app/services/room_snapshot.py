@@ -0,0 +1,49 @@
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+from sqlalchemy import select
+from app.database import get_session
+from app.models import Object, RoomUser, User
+from app.services.ws_codec import loads
+
+# (row_id, room_id, user_id, x, y, last_seen, username, avatar_url, user_created_at) – Presence 생성자 순서
+UserRow = Tuple[int, int, int, int, int, Optional[datetime], str, Optional[str], Optional[datetime]]
+# (id, type, x, y, rotation, meta_json)
+ObjectRow = Tuple[int, Any, int, int, Optional[float], Optional[str]]
+
+_USERS = (
+    select(
+        RoomUser.id, RoomUser.room_id, RoomUser.user_id, RoomUser.x, RoomUser.y, RoomUser.last_seen,
+        User.username, User.avatar_url, User.created_at,
+    )
+    .join(User, User.id == RoomUser.user_id)
+)
+_OBJECTS = select(Object.id, Object.type, Object.x, Object.y, Object.rotation, Object.meta_json)
+
+
+class RoomSnapshotRepository:
+    """Read a room's users and objects with one column-projected query each.
+
+    Rows come back as plain tuples (no ORM identity map or per-row User
+    lookups), so the number of queries does not depend on the room size.
+    """
+
+    def users(self, room_id: int) -> List[UserRow]:
+        with get_session() as db:
+            return db.execute(_USERS.where(RoomUser.room_id == room_id)).tuples().all()
+
+    def objects(self, room_id: int) -> List[ObjectRow]:
+        with get_session() as db:
+            return db.execute(_OBJECTS.where(Object.room_id == room_id)).tuples().all()
+
+
+def object_payload(row: ObjectRow) -> Dict[str, Any]:
+    """room_state entry for one object row"""
+    object_id, object_type, x, y, rotation, meta_json = row
+    return {
+        "id": object_id,
+        "type": object_type.value if hasattr(object_type, "value") else object_type,
+        "x": x,
+        "y": y,
+        "rotation": rotation,
+        "metadata": loads(meta_json) if meta_json else {},
+    }
@@ -0,0 +1,472 @@
+import os
+import zlib
+import asyncio
+import itertools
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.services.room_snapshot import ObjectRow
+from app.services.ws_codec import Codec, JSON_CODEC, OutboundFrame, dumps_bytes, encoded_event_frame
+
+# Configuration
+# 메모리에 유지할 방 상태 수 (가장 최근에 쓰인 방 기준)
+ROOM_STATE_ROOMS = int(os.getenv("ROOM_STATE_ROOMS", "1024"))
+# compress_state=true 클라이언트에게 이 크기(바이트) 이상의 room_state를 zlib 바이너리로 보낸다 (0 = 끔)
+ROOM_STATE_COMPRESS_MIN = int(os.getenv("ROOM_STATE_COMPRESS_MIN", "4096"))
+# viewport 스트리밍에서 room_state_chunk 하나에 담는 최대 항목(유저 + 오브젝트) 수
+ROOM_STATE_CHUNK = int(os.getenv("ROOM_STATE_CHUNK", "200"))
+# lod=true 클라이언트: 이 크기(월드 단위) 셀마다 같은 타입 오브젝트를 묶는다 (0 = 끔)
+ROOM_STATE_LOD_CELL = int(os.getenv("ROOM_STATE_LOD_CELL", "256"))
+# 한 셀에 같은 타입이 이 개수 이상이면 aggregate 하나로 보낸다
+ROOM_STATE_LOD_MIN = int(os.getenv("ROOM_STATE_LOD_MIN", "16"))
+# 보는 사람의 셀에서 이 거리(셀 수) 안은 묶지 않고 그대로 보낸다
+ROOM_STATE_LOD_NEAR = int(os.getenv("ROOM_STATE_LOD_NEAR", "1"))
+
+# 방을 다시 읽어 와도 version이 줄지 않도록 프로세스 전체에서 증가
+_versions = itertools.count(1)
+
+UserEntry = Tuple[int, int, str]  # (x, y, username)
+Cell = Tuple[int, int]
+Rect = Tuple[int, int, int, int]  # (x, y, width, height)
+Loader = Callable[[int], Awaitable[Tuple[Iterable[Tuple[int, UserEntry]], Iterable[ObjectRow]]]]
+
+
+def _type_name(object_type: Any) -> str:
+    return object_type.value if hasattr(object_type, "value") else object_type
+
+
+def encode_user(user_id: int, x: int, y: int, username: str) -> bytes:
+    return dumps_bytes({"user_id": user_id, "x": x, "y": y, "username": username})
+
+
+def encode_object(row: ObjectRow) -> bytes:
+    """room_state entry for an object row; meta_json is spliced in without parsing it"""
+    object_id, object_type, x, y, rotation, meta_json = row
+    head = dumps_bytes({
+        "id": object_id,
+        "type": _type_name(object_type),
+        "x": x,
+        "y": y,
+        "rotation": rotation,
+    })
+    return b"".join((head[:-1], b',"metadata":', meta_json.encode("utf-8") if meta_json else b"{}", b"}"))
+
+
+class _Aggregate:
+    """Same-type objects of one LOD cell; bbox and fragment are kept up to date incrementally"""
+    __slots__ = ("ids", "bbox", "fragment")
+
+    def __init__(self):
+        self.ids: Set[int] = set()
+        self.bbox: Optional[List[int]] = None
+        self.fragment: Optional[bytes] = None
+
+    def add(self, object_id: int, x: int, y: int):
+        self.ids.add(object_id)
+        if self.bbox is not None:
+            x0, y0, x1, y1 = self.bbox
+            self.bbox = [min(x0, x), min(y0, y), max(x1, x), max(y1, y)]
+        elif len(self.ids) == 1:
+            self.bbox = [x, y, x, y]
+        self.fragment = None
+
+    def discard(self, object_id: int, x: int, y: int):
+        self.ids.discard(object_id)
+        # 경계에 있던 오브젝트가 빠질 때만 bbox를 다시 계산한다
+        if self.bbox is not None and (x in (self.bbox[0], self.bbox[2]) or y in (self.bbox[1], self.bbox[3])):
+            self.bbox = None
+        self.fragment = None
+
+    def encode(self, cell: Cell, object_type: str, positions: Dict[int, Tuple[int, int]]) -> bytes:
+        if self.fragment is None:
+            if self.bbox is None:
+                xs = [positions[object_id][0] for object_id in self.ids]
+                ys = [positions[object_id][1] for object_id in self.ids]
+                self.bbox = [min(xs), min(ys), max(xs), max(ys)]
+            self.fragment = dumps_bytes({
+                "type": object_type,
+                "count": len(self.ids),
+                "cx": cell[0],
+                "cy": cell[1],
+                "bbox": self.bbox,
+            })
+        return self.fragment
+
+
+class RoomState:
+    """Materialized room_state of one room, kept as per-entry JSON fragments.
+
+    Mutations re-encode only the entry they touch and bump ``version``; the
+    full frame (and its compressed form) is assembled from the fragments on
+    the first request after a change and then shared by every join.
+    """
+    __slots__ = (
+        "room_id", "version", "users", "objects", "_profiles", "_user_xy", "_object_xy",
+        "_grid_size", "_grid", "_object_type", "_lod_size", "_lod", "_lod_bodies", "_frame", "_compressed",
+    )
+
+    def __init__(self, room_id: int, users: Iterable[Tuple[int, UserEntry]], objects: Iterable[ObjectRow]):
+        self.room_id = room_id
+        self.version = next(_versions)
+        self._profiles: Dict[int, str] = {}
+        self._user_xy: Dict[int, Tuple[int, int]] = {}
+        self._object_xy: Dict[int, Tuple[int, int]] = {}
+        self.users: Dict[int, bytes] = {}
+        for user_id, (x, y, username) in users:
+            self._profiles[user_id] = username
+            self._user_xy[user_id] = (x, y)
+            self.users[user_id] = encode_user(user_id, x, y, username)
+        self.objects: Dict[int, bytes] = {}
+        self._object_type: Dict[int, str] = {}
+        for row in objects:
+            self._object_xy[row[0]] = (row[2], row[3])
+            self._object_type[row[0]] = _type_name(row[1])
+            self.objects[row[0]] = encode_object(row)
+        # 청크 구독용 (cx, cy) -> object ids, 처음 쓰일 때 만든다
+        self._grid_size = 0
+        self._grid: Dict[Tuple[int, int], Set[int]] = {}
+        # LOD용 cell -> type -> _Aggregate, 처음 쓰일 때 만든다
+        self._lod_size = 0
+        self._lod: Dict[Cell, Dict[str, _Aggregate]] = {}
+        # 보는 사람의 셀 -> room_state의 objects/aggregates 부분 (오브젝트가 바뀌면 비운다)
+        self._lod_bodies: Dict[Cell, bytes] = {}
+        self._frame: Optional[OutboundFrame] = None
+        self._compressed: Dict[str, bytes] = {}
+
+    def _changed(self):
+        self.version = next(_versions)
+        self._frame = None
+        self._compressed = {}
+
+    def put_user(self, user_id: int, x: int, y: int, username: str):
+        self._profiles[user_id] = username
+        self._user_xy[user_id] = (x, y)
+        self.users[user_id] = encode_user(user_id, x, y, username)
+        self._changed()
+
+    def move_user(self, user_id: int, x: int, y: int):
+        username = self._profiles.get(user_id)
+        if username is not None:
+            self._user_xy[user_id] = (x, y)
+            self.users[user_id] = encode_user(user_id, x, y, username)
+            self._changed()
+
+    def remove_users(self, user_ids: Iterable[int]):
+        removed = False
+        for user_id in user_ids:
+            self._profiles.pop(user_id, None)
+            self._user_xy.pop(user_id, None)
+            removed = self.users.pop(user_id, None) is not None or removed
+        if removed:
+            self._changed()
+
+    def put_object(self, row: ObjectRow):
+        self._ungrid(row[0])
+        self._object_xy[row[0]] = (row[2], row[3])
+        self._object_type[row[0]] = _type_name(row[1])
+        self.objects[row[0]] = encode_object(row)
+        if self._grid_size:
+            self._grid.setdefault(self._cell(row[2], row[3]), set()).add(row[0])
+        if self._lod_size:
+            self._lod_group(self.lod_cell(row[2], row[3]), self._object_type[row[0]]).add(row[0], row[2], row[3])
+        self._lod_bodies = {}
+        self._changed()
+
+    def remove_object(self, object_id: int):
+        self._ungrid(object_id)
+        self._object_xy.pop(object_id, None)
+        self._object_type.pop(object_id, None)
+        if self.objects.pop(object_id, None) is not None:
+            self._lod_bodies = {}
+            self._changed()
+
+    def object_position(self, object_id: int) -> Optional[Tuple[int, int]]:
+        return self._object_xy.get(object_id)
+
+    def _cell(self, x: int, y: int) -> Tuple[int, int]:
+        return (x // self._grid_size, y // self._grid_size)
+
+    def _ungrid(self, object_id: int):
+        xy = self._object_xy.get(object_id)
+        if self._grid_size and xy is not None:
+            members = self._grid.get(self._cell(*xy))
+            if members is not None:
+                members.discard(object_id)
+                if not members:
+                    del self._grid[self._cell(*xy)]
+        if self._lod_size and xy is not None:
+            cell = self.lod_cell(*xy)
+            groups = self._lod.get(cell)
+            group = groups.get(self._object_type[object_id]) if groups is not None else None
+            if group is not None:
+                group.discard(object_id, *xy)
+                if not group.ids:
+                    del groups[self._object_type[object_id]]
+                    if not groups:
+                        del self._lod[cell]
+
+    def objects_in_chunk(self, chunk: Tuple[int, int], size: int) -> List[bytes]:
+        """Encoded objects whose position lies in ``chunk`` of a ``size`` grid"""
+        if self._grid_size != size:
+            self._grid_size = size
+            self._grid = {}
+            for object_id, (x, y) in self._object_xy.items():
+                self._grid.setdefault(self._cell(x, y), set()).add(object_id)
+        return [self.objects[object_id] for object_id in self._grid.get(chunk, ())]
+
+    def chunk_frame(self, chunk: Tuple[int, int], size: int) -> OutboundFrame:
+        """chunk_load for one object chunk"""
+        body = b"".join((
+            b'{"room_id":', dumps_bytes(self.room_id),
+            b',"version":', dumps_bytes(self.version),
+            b',"cx":', dumps_bytes(chunk[0]), b',"cy":', dumps_bytes(chunk[1]),
+            b',"size":', dumps_bytes(size),
+            b',"objects":[', b",".join(self.objects_in_chunk(chunk, size)), b"]}",
+        ))
+        return encoded_event_frame("chunk_load", body)
+
+    def lod_cell(self, x: int, y: int) -> Cell:
+        return (x // ROOM_STATE_LOD_CELL, y // ROOM_STATE_LOD_CELL)
+
+    def _lod_group(self, cell: Cell, object_type: str) -> _Aggregate:
+        groups = self._lod.get(cell)
+        if groups is None:
+            groups = self._lod[cell] = {}
+        group = groups.get(object_type)
+        if group is None:
+            group = groups[object_type] = _Aggregate()
+        return group
+
+    def _lod_index(self) -> Dict[Cell, Dict[str, _Aggregate]]:
+        if self._lod_size != ROOM_STATE_LOD_CELL:
+            self._lod_size = ROOM_STATE_LOD_CELL
+            self._lod = {}
+            for object_id, (x, y) in self._object_xy.items():
+                self._lod_group(self.lod_cell(x, y), self._object_type[object_id]).add(object_id, x, y)
+        return self._lod
+
+    def _lod_cell_parts(self, cell: Cell, near: bool) -> Tuple[List[bytes], List[bytes]]:
+        """(objects, aggregates) of one cell as seen from near or far"""
+        objects: List[bytes] = []
+        aggregates: List[bytes] = []
+        for object_type, group in self._lod_index().get(cell, {}).items():
+            if near or len(group.ids) < ROOM_STATE_LOD_MIN:
+                objects.extend(self.objects[object_id] for object_id in group.ids)
+            else:
+                aggregates.append(group.encode(cell, object_type, self._object_xy))
+        return objects, aggregates
+
+    @staticmethod
+    def _is_near(cell: Cell, viewer: Cell) -> bool:
+        return max(abs(cell[0] - viewer[0]), abs(cell[1] - viewer[1])) <= ROOM_STATE_LOD_NEAR
+
+    def lod_frame(self, viewer: Cell) -> OutboundFrame:
+        """room_state where dense same-type groups away from ``viewer`` are aggregates"""
+        body = self._lod_bodies.get(viewer)
+        if body is None:
+            objects: List[bytes] = []
+            aggregates: List[bytes] = []
+            for cell in self._lod_index():
+                cell_objects, cell_aggregates = self._lod_cell_parts(cell, self._is_near(cell, viewer))
+                objects.extend(cell_objects)
+                aggregates.extend(cell_aggregates)
+            if len(self._lod_bodies) >= 64:
+                self._lod_bodies = {}
+            body = self._lod_bodies[viewer] = b"".join((
+                b'"objects":[', b",".join(objects),
+                b'],"aggregates":[', b",".join(aggregates),
+                b'],"lod_cell":', dumps_bytes(ROOM_STATE_LOD_CELL), b"}",
+            ))
+        return encoded_event_frame("room_state", b"".join((
+            b'{"room_id":', dumps_bytes(self.room_id),
+            b',"version":', dumps_bytes(self.version),
+            b',"users":[', b",".join(self.users.values()), b"],", body,
+        )))
+
+    def lod_update(self, previous: Cell, viewer: Cell) -> Optional[OutboundFrame]:
+        """lod_cells for the cells that expand or collapse when the viewer moves, None if none do"""
+        index = self._lod_index()
+        changed = []
+        for cell, groups in index.items():
+            if self._is_near(cell, previous) == self._is_near(cell, viewer):
+                continue
+            if any(len(group.ids) >= ROOM_STATE_LOD_MIN for group in groups.values()):
+                changed.append(cell)
+        if not changed:
+            return None
+        parts = []
+        for cell in changed:
+            objects, aggregates = self._lod_cell_parts(cell, self._is_near(cell, viewer))
+            parts.append(b"".join((
+                b'{"cx":', dumps_bytes(cell[0]), b',"cy":', dumps_bytes(cell[1]),
+                b',"objects":[', b",".join(objects), b'],"aggregates":[', b",".join(aggregates), b"]}",
+            )))
+        return encoded_event_frame("lod_cells", b"".join((
+            b'{"room_id":', dumps_bytes(self.room_id),
+            b',"version":', dumps_bytes(self.version),
+            b',"lod_cell":', dumps_bytes(ROOM_STATE_LOD_CELL),
+            b',"cells":[', b",".join(parts), b"]}",
+        )))
+
+    def user_position(self, user_id: int) -> Optional[Tuple[int, int]]:
+        return self._user_xy.get(user_id)
+
+    def users_frame(self) -> OutboundFrame:
+        """room_state without objects, for connections that load objects by chunk"""
+        body = b"".join((
+            b'{"room_id":', dumps_bytes(self.room_id),
+            b',"version":', dumps_bytes(self.version),
+            b',"users":[', b",".join(self.users.values()), b'],"objects":[]}',
+        ))
+        return encoded_event_frame("room_state", body)
+
+    def frame(self) -> OutboundFrame:
+        if self._frame is None:
+            body = b"".join((
+                b'{"room_id":', dumps_bytes(self.room_id),
+                b',"version":', dumps_bytes(self.version),
+                b',"users":[', b",".join(self.users.values()),
+                b'],"objects":[', b",".join(self.objects.values()), b"]}",
+            ))
+            self._frame = encoded_event_frame("room_state", body)
+        return self._frame
+
+    def chunks(self, viewport: Rect, size: int = ROOM_STATE_CHUNK) -> Iterator[OutboundFrame]:
+        """room_state_chunk frames, entries inside ``viewport`` first, then room_state_end.
+
+        Entries are copied when iteration starts, so every chunk belongs to
+        the same ``version`` even if the room changes while they are sent.
+        """
+        vx, vy, width, height = viewport
+        size = max(1, size)
+        version = self.version
+        near: List[Tuple[bool, bytes]] = []
+        far: List[Tuple[bool, bytes]] = []
+        for user_id, fragment in list(self.users.items()):
+            x, y = self._user_xy[user_id]
+            (near if vx <= x < vx + width and vy <= y < vy + height else far).append((True, fragment))
+        for object_id, fragment in list(self.objects.items()):
+            x, y = self._object_xy[object_id]
+            (near if vx <= x < vx + width and vy <= y < vy + height else far).append((False, fragment))
+        index = 0
+        for in_view, entries in ((True, near), (False, far)):
+            for start in range(0, len(entries), size):
+                part = entries[start:start + size]
+                body = b"".join((
+                    b'{"room_id":', dumps_bytes(self.room_id),
+                    b',"version":', dumps_bytes(version),
+                    b',"index":', dumps_bytes(index),
+                    b',"in_view":', b"true" if in_view else b"false",
+                    b',"users":[', b",".join(fragment for is_user, fragment in part if is_user),
+                    b'],"objects":[', b",".join(fragment for is_user, fragment in part if not is_user), b"]}",
+                ))
+                yield encoded_event_frame("room_state_chunk", body)
+                index += 1
+        yield encoded_event_frame("room_state_end", dumps_bytes({
+            "room_id": self.room_id,
+            "version": version,
+            "chunks": index,
+            "in_view": len(near),
+            "total": len(near) + len(far),
+        }))
+
+    def compressed(self, codec: Codec = JSON_CODEC, min_size: int = ROOM_STATE_COMPRESS_MIN) -> Optional[bytes]:
+        """zlib of the encoded frame, or None if it is smaller than ``min_size``"""
+        if min_size <= 0:
+            return None
+        blob = self._compressed.get(codec.name)
+        if blob is None:
+            encoded = self.frame().encode(codec)
+            if isinstance(encoded, str):
+                encoded = encoded.encode("utf-8")
+            blob = self._compressed[codec.name] = zlib.compress(encoded, 6) if len(encoded) >= min_size else b""
+        return blob or None
+
+
+class RoomStateCache:
+    """LRU of materialized room states, updated in place by the services.
+
+    Only rooms someone asked for are materialized; updates for other rooms
+    are ignored, and a room is loaded once even if many joins miss at once.
+    A load that overlaps an update is served but not kept, so the cache
+    never holds a state older than the database.
+    """
+
+    def __init__(self, max_rooms: int = ROOM_STATE_ROOMS):
+        self.max_rooms = max_rooms
+        self._rooms: "OrderedDict[int, RoomState]" = OrderedDict()
+        self._loading: Dict[int, asyncio.Future] = {}
+        self._raced: Set[int] = set()
+        self.hits = 0
+        self.loads = 0
+
+    async def get(self, room_id: int, load: Loader) -> RoomState:
+        state = self._rooms.get(room_id)
+        if state is not None:
+            self._rooms.move_to_end(room_id)
+            self.hits += 1
+            return state
+        pending = self._loading.get(room_id)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+        future = self._loading[room_id] = asyncio.get_running_loop().create_future()
+        self.loads += 1
+        try:
+            users, objects = await load(room_id)
+            state = RoomState(room_id, users, objects)
+            if room_id not in self._raced:
+                self._rooms[room_id] = state
+                while len(self._rooms) > self.max_rooms:
+                    self._rooms.popitem(last=False)
+            future.set_result(state)
+            return state
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # 기다리는 쪽이 없어도 경고가 남지 않도록
+            raise
+        finally:
+            del self._loading[room_id]
+            self._raced.discard(room_id)
+
+    def peek(self, room_id: int) -> Optional[RoomState]:
+        """The materialized state if there is one, without loading it"""
+        return self._rooms.get(room_id)
+
+    def _target(self, room_id: int) -> Optional[RoomState]:
+        if room_id in self._loading:
+            self._raced.add(room_id)
+        return self._rooms.get(room_id)
+
+    def user_joined(self, room_id: int, user_id: int, x: int, y: int, username: str):
+        state = self._target(room_id)
+        if state is not None:
+            state.put_user(user_id, x, y, username)
+
+    def user_moved(self, room_id: int, user_id: int, x: int, y: int):
+        state = self._target(room_id)
+        if state is not None:
+            state.move_user(user_id, x, y)
+
+    def users_left(self, room_id: int, user_ids: Iterable[int]):
+        state = self._target(room_id)
+        if state is not None:
+            state.remove_users(user_ids)
+
+    def object_saved(self, room_id: int, row: ObjectRow):
+        state = self._target(room_id)
+        if state is not None:
+            state.put_object(row)
+
+    def object_removed(self, room_id: int, object_id: int):
+        state = self._target(room_id)
+        if state is not None:
+            state.remove_object(object_id)
+
+    def drop(self, room_id: int):
+        self._target(room_id)
+        self._rooms.pop(room_id, None)
+
+
+# 프로세스 전체에서 공유 (RoomService / ObjectService가 갱신하고 WebSocket 입장 시 사용)
+room_states = RoomStateCache()
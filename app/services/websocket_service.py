@@ -1,106 +1,523 @@
-import json
+import os
 import asyncio
-from typing import Dict, Set, Optional, Any
+import time
+import logging
+import functools
+from contextvars import Context, ContextVar
+from typing import Dict, Set, Optional, Any, Iterable, List, Tuple, Union, Callable, Awaitable, Type
 from fastapi import WebSocket, WebSocketDisconnect, HTTPException, status
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from sqlalchemy.orm import Session
-from app.database import get_session
+from app.database import get_session, shared_transaction
 from app.models import User, Room, RoomUser, ChatLog, ToolsLog
 from app.schemas.websocket import (
-    WebSocketMessage, WebSocketEvent, JoinRoomMessage, 
-    LeaveRoomMessage, UpdatePositionMessage, SendMessageData,
+    WebSocketEvent, JoinRoomMessage, 
+    LeaveRoomMessage, UpdatePositionMessage, MoveToData, MoveIntentData, SendMessageData,
     UseToolData, UserPositionData, ChatMessageData, ToolUsageData, ErrorData,
-    RtcJoinData, RtcLeaveData, RtcOfferData, RtcAnswerData, RtcIceCandidateData
+    BatchData, GetRoomStateData, Viewport, SetViewportData, RtcJoinData, RtcLeaveData, RtcOfferData, RtcAnswerData, RtcIceCandidateData
 )
+from app.schemas.inventory import InventoryPlaceRequest
 from app.auth import verify_token
 from app.services.user_service import UserService
-from app.services.room_service import RoomService
+from app.services.room_service import ROOMS_SHARED, RoomService
+from app.services.pathfinding import Walk, paths
+from app.services.dead_reckoning import INTENT_MAX_LAG, Motion, MotionTracker, cap_speed
 from app.services.chat_service import ChatService
 from app.services.tools_service import ToolsService
 from app.services.inventory_service import InventoryService
+from app.services.outbound_queue import OutboundQueue, Lane, OverflowPolicy
+from app.services.position_ticker import PositionTicker
+from app.services.interest_grid import InterestGrid
+from app.services.connection_registry import ConnectionRegistry, Connection
+from app.services.backplane import Backplane, create_backplane
+from app.services.room_sharding import RoomSharding
+from app.services.position_codec import PositionStream
+from app.services.ws_codec import Codec, JSON_CODEC, OutboundFrame, negotiate, event_frame
+from app.services.inbound_pipeline import InboundPipeline, EventClass
+from app.services.presence_reaper import PresenceReaper
+from app.services.room_journal import RoomJournal
+from app.services.occupancy import occupancy
+from app.services.room_state_cache import ROOM_STATE_LOD_CELL, RoomState, room_states
+from app.services.chunk_subscriptions import Change as ChunkChange, ChunkSubscriptions
+from app.services.object_service import ObjectService
+from app.services.rate_limit import ConnectionLimiter, parse_limit, parse_event_limits
+from app.database import DATABASE_URL
+
+# Configuration
+# 소켓 하나당 전송 대기 한도(초). 초과하면 느린 클라이언트로 보고 연결을 정리한다.
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5.0"))
+# 연결별 송신 큐 (0이면 큐 없이 소켓에 직접 전송)
+WS_QUEUE_MAXSIZE = int(os.getenv("WS_QUEUE_MAXSIZE", "256"))
+WS_OVERFLOW_POLICY = OverflowPolicy(os.getenv("WS_OVERFLOW_POLICY", OverflowPolicy.DROP_OLDEST.value))
+# 위치 업데이트 틱 주기(Hz). 0이면 이동마다 즉시 position_updated 전송
+WS_TICK_HZ = float(os.getenv("WS_TICK_HZ", "0"))
+# 관심 영역(AOI) 반경. 0보다 크면 위치/시야 이벤트를 반경 안의 사용자에게만 전송
+WS_AOI_RADIUS = int(os.getenv("WS_AOI_RADIUS", "0"))
+# 압축 위치 스트림: 좌표 양자화 단위(px)와 키프레임 주기(초)
+WS_POSITION_QUANTUM = int(os.getenv("WS_POSITION_QUANTUM", "4"))
+WS_KEYFRAME_INTERVAL = float(os.getenv("WS_KEYFRAME_INTERVAL", "5.0"))
+# 워커 간 브로드캐스트 백플레인: none | memory | redis | postgres
+WS_BACKPLANE = os.getenv("WS_BACKPLANE", "none")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+# 방 단위 샤딩: 각 room_id를 일관 해싱으로 한 워커에 고정 (둘 다 비어 있으면 비활성)
+WS_SHARD_SELF = os.getenv("WS_SHARD_SELF", "")
+WS_SHARD_WORKERS = os.getenv("WS_SHARD_WORKERS", "")
+# 파이프라인 수신 모드: 프레임을 계속 읽고 이벤트 종류별 워커에서 처리 (false면 한 번에 하나씩)
+WS_PIPELINE = os.getenv("WS_PIPELINE", "false").lower() in ("1", "true", "yes")
+# 파이프라인 모드에서 처리 대기 중인 순서 보장 이벤트 한도 (초과 시 수신을 잠시 멈춘다)
+WS_PIPELINE_DEPTH = int(os.getenv("WS_PIPELINE_DEPTH", "64"))
+# batch 이벤트 하나에 담을 수 있는 최대 이벤트 수
+WS_BATCH_MAX = int(os.getenv("WS_BATCH_MAX", "32"))
+# 연결별 토큰 버킷 "초당 토큰/버스트" (전체 이벤트 합계, 빈 값이면 제한 없음)
+WS_RATE_LIMIT = parse_limit(os.getenv("WS_RATE_LIMIT", "60/120"))
+# 이벤트 종류별 토큰 버킷. 초과한 이동은 최신 것만 남겨 나중에 반영, 나머지는 throttle 에러
+WS_EVENT_RATE_LIMITS = parse_event_limits(
+    os.getenv("WS_EVENT_RATE_LIMITS", "update_position=30/30,send_message=2/5,use_tool=5/10,place_object=2/5")
+)
+# 방별 재전송 버퍼 크기(프레임 수)와 버퍼를 유지할 최근 방 수. 0이면 seq/재개 비활성
+WS_REPLAY_BUFFER = int(os.getenv("WS_REPLAY_BUFFER", "256"))
+WS_REPLAY_ROOMS = int(os.getenv("WS_REPLAY_ROOMS", "1024"))
+# 하트비트: 이 시간(초) 동안 수신이 없으면 ping, WS_IDLE_TIMEOUT 동안 없으면 연결 정리 (0이면 끔)
+WS_PING_INTERVAL = float(os.getenv("WS_PING_INTERVAL", "15"))
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", "45"))
+# 유령 접속 정리 주기(초): 끊긴 사용자의 room_users 행 일괄 삭제 + 방별 users_left 한 번
+WS_REAP_INTERVAL = float(os.getenv("WS_REAP_INTERVAL", "2"))
+# 오브젝트 청크 한 변의 크기(px)와 시야 주변으로 더 구독할 청크 수. 0이면 청크 구독 비활성
+WS_CHUNK_SIZE = int(os.getenv("WS_CHUNK_SIZE", "0"))
+WS_CHUNK_MARGIN = int(os.getenv("WS_CHUNK_MARGIN", "1"))
+# 느린 소비자 강제 종료 시 close code
+WS_CLOSE_SLOW_CONSUMER = 4008
+# 응답 없는 연결 강제 종료 시 close code
+WS_CLOSE_IDLE = 4009
+
+Frame = Union[str, bytes]
+Message = Union[str, bytes, OutboundFrame]
+
+logger = logging.getLogger(__name__)
+
+# 처리 중인 요청의 클라이언트 상관 ID (에러/ack에 그대로 돌려준다)
+_request_cid: ContextVar[Optional[Union[str, int]]] = ContextVar("request_cid", default=None)
+# batch 처리 중이면 이벤트별 결과 목록 (에러/ack를 개별 프레임 대신 여기에 모은다)
+_batch_results: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("batch_results", default=None)
+
+
+class _Outbox:
+    """Room/user fan-out held back until a batch's transaction has committed"""
+    __slots__ = ("sends", "rooms", "open")
 
-class ConnectionManager:
     def __init__(self):
-        # room_id -> set of WebSocket connections
-        self.active_connections: Dict[int, Set[WebSocket]] = {}
-        # WebSocket -> user_id mapping
-        self.connection_users: Dict[WebSocket, int] = {}
-        # WebSocket -> room_id mapping
-        self.connection_rooms: Dict[WebSocket, int] = {}
+        self.sends: List[Callable[[], Awaitable[None]]] = []
+        self.rooms: Set[int] = set()
+        # 배치가 끝나면 닫는다 (배치 중에 만들어진 틱 루프 태스크도 이 컨텍스트를 물려받는다)
+        self.open = True
+
+
+# batch 처리 중이면 다른 사용자에게 가는 프레임을 COMMIT 뒤로 미룬다
+_outbox: ContextVar[Optional[_Outbox]] = ContextVar("outbox", default=None)
+
+def _select(conns: List[Connection], compact: Optional[bool], exclude: Optional[WebSocket] = None) -> List[Connection]:
+    if compact is None:
+        return [c for c in conns if c.websocket is not exclude] if exclude is not None else conns
+    return [c for c in conns if bool(c.compact) is compact and c.websocket is not exclude]
+
+def _wire_text(message: Message) -> Frame:
+    # 백플레인에는 JSON 텍스트로 싣는다 (수신 워커가 연결별 코덱으로 다시 인코딩)
+    return message.text if isinstance(message, OutboundFrame) else message
+
+class ConnectionManager:
+    def __init__(self, backplane: Optional[Backplane] = None):
+        # socket/user/room/(room, user) 인덱스를 가진 연결 레코드 저장소
+        self.registry = ConnectionRegistry()
+        # 다른 워커의 같은 방 멤버에게 프레임을 전달 (None이면 프로세스 로컬)
+        self.backplane = backplane
+        self._backplane_start: Optional[asyncio.Task] = None
+        # 방 이벤트 seq + 재접속 재전송 버퍼 (EVENTS lane 방 전체 브로드캐스트만)
+        self.journal = RoomJournal(WS_REPLAY_BUFFER, WS_REPLAY_ROOMS) if WS_REPLAY_BUFFER > 0 else None
+        # (room_id, user_id): 사용자의 마지막 소켓이 leave_room 없이 방에서 빠졌을 때 호출
+        self.on_departed: Optional[Callable[[int, int], None]] = None
+        # 오브젝트 청크 구독 (WS_CHUNK_SIZE > 0일 때만)
+        self.chunks = ChunkSubscriptions(WS_CHUNK_SIZE, WS_CHUNK_MARGIN) if WS_CHUNK_SIZE > 0 else None
+
+    def _hold(self, room_id: int, send: Callable[..., Awaitable[None]], *args) -> bool:
+        """Queue a send on the open batch outbox instead of sending it now"""
+        outbox = _outbox.get()
+        if outbox is None or not outbox.open:
+            return False
+        outbox.sends.append(functools.partial(send, *args))
+        outbox.rooms.add(room_id)
+        return True
+
+    def objects_changed(self, room_id: int):
+        """Tell the other workers a room's objects changed (once an open batch has committed)"""
+        if self.backplane is None or self._hold(room_id, self._publish_objects_changed, room_id):
+            return
+        asyncio.create_task(self._publish_objects_changed(room_id), context=Context())
+
+    async def _publish_objects_changed(self, room_id: int):
+        try:
+            await self.backplane.publish_objects_changed(room_id)
+        except Exception:
+            logger.exception("Backplane publish failed for room %s", room_id)
+
+    async def _ensure_backplane(self):
+        if self.backplane is None:
+            return
+        if self._backplane_start is None:
+            self._backplane_start = asyncio.create_task(
+                self.backplane.start(self._on_backplane_message), context=Context()
+            )
+        await self._backplane_start
+
+    async def _on_backplane_message(self, env: Dict[str, Any]):
+        """Deliver a frame published by another worker to local sockets"""
+        room_id = env["r"]
+        if env["k"] == "objects":
+            # 다른 워커가 오브젝트를 바꿨다 – 다음 사용 때 DB에서 다시 읽는다
+            occupancy.drop(room_id)
+            return
+        if env["k"] == "user":
+            conn = self.registry.latest_for_user_in_room(room_id, env["u"])
+            conns = [conn] if conn is not None else []
+        else:
+            at = env.get("p")
+            conns = self._watching(self.registry.in_room(room_id), tuple(at) if at is not None else None)
+        frame = env["f"]
+        if env["k"] == "room" and self._sequenced(env["l"], None) and isinstance(frame, str):
+            # 다른 워커의 방 이벤트도 이 워커의 seq로 번호를 매긴다
+            frame = self.journal.append(room_id, frame)
+        await self._send_to(frame, conns, Lane(env["l"]), env.get("y"))
+
+    def _watching(self, conns: List[Connection], at: Optional[Tuple[int, int]]) -> List[Connection]:
+        if at is None or self.chunks is None or not len(self.chunks):
+            return conns
+        chunk = self.chunks.chunk_of(*at)
+        return [c for c in conns if self.chunks.sees(c.websocket, chunk)]
+
+    def _sequenced(self, lane: Lane, compact: Optional[bool]) -> bool:
+        return self.journal is not None and lane == Lane.EVENTS and compact is None
 
-    async def connect(self, websocket: WebSocket, user_id: int):
-        await websocket.accept()
-        self.connection_users[websocket] = user_id
+    def _room_vacated(self, room_id: Optional[int]):
+        if self.backplane is not None and room_id is not None and not self.registry.room_size(room_id):
+            self.backplane.unsubscribe(room_id)
+            # 구독을 끊은 동안의 변경은 알 수 없다
+            occupancy.drop(room_id)
+
+    async def connect(self, websocket: WebSocket, user_id: int, codec: Codec = JSON_CODEC):
+        await self._ensure_backplane()
+        await websocket.accept(subprotocol=codec.subprotocol)
+        conn = self.registry.add(websocket, user_id)
+        conn.codec = codec
+        if WS_RATE_LIMIT is not None or WS_EVENT_RATE_LIMITS:
+            conn.limiter = ConnectionLimiter(WS_RATE_LIMIT, WS_EVENT_RATE_LIMITS)
+        if WS_QUEUE_MAXSIZE > 0:
+            conn.queue = OutboundQueue(
+                lambda frame: self._send(websocket, frame),
+                maxsize=WS_QUEUE_MAXSIZE,
+                policy=WS_OVERFLOW_POLICY,
+                on_failure=lambda: self.disconnect(websocket),
+            )
+            conn.queue.start()
+        return conn
 
     def disconnect(self, websocket: WebSocket):
-        user_id = self.connection_users.get(websocket)
-        room_id = self.connection_rooms.get(websocket)
-        
-        if room_id and room_id in self.active_connections:
-            self.active_connections[room_id].discard(websocket)
-            if not self.active_connections[room_id]:
-                del self.active_connections[room_id]
-        
-        if websocket in self.connection_users:
-            del self.connection_users[websocket]
-        if websocket in self.connection_rooms:
-            del self.connection_rooms[websocket]
-
-    async def join_room(self, websocket: WebSocket, room_id: int):
-        if room_id not in self.active_connections:
-            self.active_connections[room_id] = set()
-        self.active_connections[room_id].add(websocket)
-        self.connection_rooms[websocket] = room_id
+        room_id = self.room_of(websocket)
+        conn = self.registry.remove(websocket)
+        if conn is None:
+            return
+        if conn.queue is not None:
+            conn.queue.close()
+        if conn.limiter is not None:
+            conn.limiter.cancel()
+        if self.chunks is not None:
+            self.chunks.remove(websocket)
+        if room_id is not None and self.on_departed is not None and not self.registry.for_user_in_room(room_id, conn.user_id):
+            self.on_departed(room_id, conn.user_id)
+        self._room_vacated(room_id)
+
+    async def join_room(self, websocket: WebSocket, room_id: int, compact: bool = False):
+        conn = self.registry.get(websocket)
+        if conn is None:
+            # connect()를 거치지 않은 소켓 (테스트/벤치마크용)
+            conn = self.registry.add(websocket, None)
+        conn.compact = compact
+        conn.lod_cell = None
+        previous_room_id = conn.room_id
+        if self.chunks is not None:
+            # 구독은 입장 후 set_viewport로 다시 만든다
+            self.chunks.remove(websocket)
+        self.registry.set_room(conn, room_id)
+        self._room_vacated(previous_room_id)
+        if self.backplane is not None:
+            self.backplane.subscribe(room_id)
 
     def leave_room(self, websocket: WebSocket):
-        room_id = self.connection_rooms.get(websocket)
-        if room_id and room_id in self.active_connections:
-            self.active_connections[room_id].discard(websocket)
-            if not self.active_connections[room_id]:
-                del self.active_connections[room_id]
-        if websocket in self.connection_rooms:
-            del self.connection_rooms[websocket]
-
-    async def send_personal_message(self, message: str, websocket: WebSocket):
+        conn = self.registry.get(websocket)
+        if conn is not None:
+            previous_room_id = conn.room_id
+            if self.chunks is not None:
+                self.chunks.remove(websocket)
+            conn.lod_cell = None
+            self.registry.set_room(conn, None)
+            self._room_vacated(previous_room_id)
+
+    def room_of(self, websocket: WebSocket) -> Optional[int]:
+        conn = self.registry.get(websocket)
+        return conn.room_id if conn is not None else None
+
+    async def send_personal_message(self, message: Message, websocket: WebSocket, lane: Lane = Lane.EVENTS):
+        conn = self.registry.get(websocket) or Connection(websocket, None)
+        await self._send_to(message, [conn], lane, None)
+
+    async def broadcast_to_room(
+        self,
+        message: Message,
+        room_id: int,
+        exclude_websocket: Optional[WebSocket] = None,
+        lane: Lane = Lane.EVENTS,
+        key: Optional[Any] = None,
+        compact: Optional[bool] = None,
+        at: Optional[Tuple[int, int]] = None,
+    ):
+        """Send to a room. ``compact`` restricts delivery to connections that did
+        (True) or did not (False) opt into the compact position stream. ``at``
+        is where an object event happened: chunk-subscribed connections get it
+        only if they watch that chunk.
+
+        Reliable room events (EVENTS lane, every connection) get the room's
+        next ``seq`` and are kept for replay on resume."""
+        if self._hold(room_id, self.broadcast_to_room, message, room_id, exclude_websocket, lane, key, compact, at):
+            return
+        published = message
+        if self._sequenced(lane, compact) and not isinstance(message, bytes):
+            message = self.journal.append(room_id, message)
+        conns = self._watching(self.registry.in_room(room_id), at)
+        if conns:
+            await self._send_to(
+                message, _select(conns, compact, exclude_websocket), lane, key
+            )
+        if compact:
+            # 압축 스트림 프레임은 워커 로컬 상태 기준이라 백플레인으로 보내지 않는다
+            return
+        if self.backplane is not None:
+            try:
+                await self.backplane.publish_room(room_id, _wire_text(published), lane, key, at=at)
+            except Exception:
+                logger.exception("Backplane publish failed for room %s", room_id)
+
+    async def send_to_user_in_room(self, message: Message, room_id: int, user_id: int, lane: Lane = Lane.EVENTS):
+        """Send to a user's socket in a room, on this worker or via the backplane"""
+        if self._hold(room_id, self.send_to_user_in_room, message, room_id, user_id, lane):
+            return
+        conn = self.registry.latest_for_user_in_room(room_id, user_id)
+        if conn is not None:
+            await self._send_to(message, [conn], lane, None)
+        elif self.backplane is not None:
+            try:
+                await self.backplane.publish_user(room_id, user_id, _wire_text(message), lane)
+            except Exception:
+                logger.exception("Backplane publish failed for room %s", room_id)
+
+    async def send_many(
+        self,
+        message: Message,
+        connections: Iterable[WebSocket],
+        lane: Lane = Lane.EVENTS,
+        key: Optional[Any] = None,
+    ):
+        """Send one frame to many sockets.
+
+        The frame is encoded at most once per wire codec and shared by every
+        recipient using that codec.
+        Queued connections only get the frame enqueued; the rest are sent to
+        concurrently with a per-send timeout, so a slow socket only delays
+        itself. Failed sockets are cleaned up together afterwards.
+        """
+        registry = self.registry
+        conns = [registry.get(ws) or Connection(ws, None) for ws in connections]
+        await self._send_to(message, conns, lane, key)
+
+    async def send_to_users(
+        self,
+        message: Message,
+        room_id: int,
+        user_ids: Iterable[int],
+        lane: Lane = Lane.EVENTS,
+        key: Optional[Any] = None,
+        compact: Optional[bool] = None,
+    ):
+        """Send a frame to every socket of the given users in a room"""
+        if self._hold(room_id, self.send_to_users, message, room_id, list(user_ids), lane, key, compact):
+            return
+        conns = self.registry.for_users_in_room(room_id, user_ids)
+        await self._send_to(message, _select(conns, compact), lane, key)
+
+    async def _send_to(self, message: Message, conns: List[Connection], lane: Lane, key: Optional[Any]):
+        if isinstance(message, str):
+            # JSON 텍스트는 바이너리(msgpack) 수신자가 있을 때만 한 번 변환된다
+            message = OutboundFrame(text=message)
+        direct: List[Tuple[WebSocket, Frame]] = []
+        overflowed: List[WebSocket] = []
+        for conn in conns:
+            if isinstance(message, OutboundFrame):
+                frame = message.encode(conn.codec or JSON_CODEC)
+            else:
+                frame = message
+            if conn.queue is None:
+                direct.append((conn.websocket, frame))
+            elif not conn.queue.put(frame, lane, key):
+                overflowed.append(conn.websocket)
+        for websocket in overflowed:
+            self._drop_slow_consumer(websocket)
+        if not direct:
+            return
+        if len(direct) == 1:
+            websocket, frame = direct[0]
+            if not await self._send(websocket, frame):
+                # 연결이 이미 끊겼거나 전송 실패 – 서버는 계속 유지, 연결만 정리
+                self.disconnect(websocket)
+            return
+        results = await asyncio.gather(*(self._send(ws, frame) for ws, frame in direct))
+        broken = [ws for (ws, _), ok in zip(direct, results) if not ok]
+        for websocket in broken:
+            self.disconnect(websocket)
+
+    def _drop_slow_consumer(self, websocket: WebSocket):
+        self.evict(websocket, WS_CLOSE_SLOW_CONSUMER, "Slow consumer")
+
+    def evict(self, websocket: WebSocket, code: int, reason: str):
+        """Drop a connection now and close its socket in the background"""
+        self.disconnect(websocket)
+        asyncio.create_task(self._close_quietly(websocket, code, reason))
+
+    async def _close_quietly(self, websocket: WebSocket, code: int, reason: str):
         try:
-            await websocket.send_text(message)
+            await asyncio.wait_for(websocket.close(code=code, reason=reason), WS_SEND_TIMEOUT)
         except Exception:
-            # 연결이 이미 끊겼거나 전송 실패 – 서버는 계속 유지, 연결만 정리
-            self.disconnect(websocket)
+            pass
 
-    async def broadcast_to_room(self, message: str, room_id: int, exclude_websocket: Optional[WebSocket] = None):
-        if room_id in self.active_connections:
-            # 순회 중 set 수정 방지: 스냅샷 리스트로 순회 후 일괄 정리
-            broken: list[WebSocket] = []
-            for connection in list(self.active_connections[room_id]):
-                if connection == exclude_websocket:
-                    continue
-                try:
-                    await connection.send_text(message)
-                except Exception:
-                    broken.append(connection)
-            for connection in broken:
-                self.disconnect(connection)
+    def queue_stats(self) -> List[Dict[str, Any]]:
+        """Per-connection outbound queue depth and drop counters.
+
+        Anonymous on purpose: any logged-in user can read these, so no user or
+        room ids (who is online where) are exposed.
+        """
+        return [
+            {
+                **conn.queue.stats(),
+                "rate_limited": sum(conn.limiter.hits.values()) if conn.limiter is not None else 0,
+            }
+            for conn in self.registry
+            if conn.queue is not None
+        ]
+
+    async def _send(self, websocket: WebSocket, message: Frame) -> bool:
+        try:
+            if isinstance(message, bytes):
+                await asyncio.wait_for(websocket.send_bytes(message), WS_SEND_TIMEOUT)
+            else:
+                await asyncio.wait_for(websocket.send_text(message), WS_SEND_TIMEOUT)
+            return True
+        except Exception:
+            return False
 
     def get_connection_by_user_in_room(self, room_id: int, target_user_id: int) -> Optional[WebSocket]:
-        if room_id not in self.active_connections:
-            return None
-        for connection in self.active_connections[room_id]:
-            user_id = self.connection_users.get(connection)
-            if user_id == target_user_id:
-                return connection
-        return None
+        """Most recently joined socket of a user in a room"""
+        conn = self.registry.latest_for_user_in_room(room_id, target_user_id)
+        return conn.websocket if conn is not None else None
+
+def _cid(message: dict) -> Optional[Union[str, int]]:
+    cid = message.get("cid")
+    return cid if isinstance(cid, (str, int)) and not isinstance(cid, bool) else None
+
+
+class _Route:
+    """Dispatch table entry: bound handler plus its pre-built payload validator"""
+    __slots__ = ("handler", "adapter", "error", "event_class")
+
+    def __init__(self, handler: Callable[..., Awaitable[None]], adapter: Optional[TypeAdapter], error: str, event_class: EventClass):
+        self.handler = handler
+        self.adapter = adapter
+        self.error = error
+        self.event_class = event_class
+
+
+# event -> (handler method, payload model, error text, pipeline class). TypeAdapter는 import 시 한 번만 만든다.
+_ROUTES: Tuple[Tuple[str, str, Optional[Type[BaseModel]], str, EventClass], ...] = (
+    (WebSocketEvent.JOIN_ROOM.value, "_handle_join_room", JoinRoomMessage, "Failed to join room", EventClass.BARRIER),
+    (WebSocketEvent.LEAVE_ROOM.value, "_handle_leave_room", LeaveRoomMessage, "Failed to leave room", EventClass.BARRIER),
+    (WebSocketEvent.UPDATE_POSITION.value, "_handle_update_position", UpdatePositionMessage, "Failed to update position", EventClass.POSITION),
+    (WebSocketEvent.MOVE_TO.value, "_handle_move_to", MoveToData, "Failed to move", EventClass.POSITION),
+    (WebSocketEvent.MOVE_INTENT.value, "_handle_move_intent", MoveIntentData, "Failed to move", EventClass.POSITION),
+    (WebSocketEvent.SEND_MESSAGE.value, "_handle_send_message", SendMessageData, "Failed to send message", EventClass.ORDERED),
+    (WebSocketEvent.USE_TOOL.value, "_handle_use_tool", UseToolData, "Failed to use tool", EventClass.ORDERED),
+    ("place_object", "_handle_place_object", InventoryPlaceRequest, "Failed to place object", EventClass.ORDERED),
+    ("get_inventory", "_handle_get_inventory", None, "Failed to get inventory", EventClass.ORDERED),
+    ("get_room_state", "_handle_get_room_state", GetRoomStateData, "Failed to get room state", EventClass.ORDERED),
+    (WebSocketEvent.SET_VIEWPORT.value, "_handle_set_viewport", SetViewportData, "Invalid viewport", EventClass.ORDERED),
+    (WebSocketEvent.BATCH.value, "_handle_batch", BatchData, "Invalid batch", EventClass.BARRIER),
+    (WebSocketEvent.PONG.value, "_handle_pong", None, "Invalid pong", EventClass.SIGNAL),
+    (WebSocketEvent.RTC_JOIN.value, "_handle_rtc_join", RtcJoinData, "Failed to rtc join", EventClass.SIGNAL),
+    (WebSocketEvent.RTC_LEAVE.value, "_handle_rtc_leave", RtcLeaveData, "Failed to rtc leave", EventClass.SIGNAL),
+    (WebSocketEvent.RTC_OFFER.value, "_handle_rtc_offer", RtcOfferData, "Failed to forward rtc offer", EventClass.SIGNAL),
+    (WebSocketEvent.RTC_ANSWER.value, "_handle_rtc_answer", RtcAnswerData, "Failed to forward rtc answer", EventClass.SIGNAL),
+    (WebSocketEvent.RTC_ICE_CANDIDATE.value, "_handle_rtc_ice_candidate", RtcIceCandidateData, "Failed to forward rtc ice candidate", EventClass.SIGNAL),
+)
+_ADAPTERS: Dict[type, TypeAdapter] = {route[2]: TypeAdapter(route[2]) for route in _ROUTES if route[2] is not None}
+
 
 class WebSocketService:
     def __init__(self):
-        self.manager = ConnectionManager()
+        if WS_AOI_RADIUS > 0 and ROOMS_SHARED:
+            # 관심 영역 격자는 이 워커의 사용자만 알고 send_to_users는 백플레인을 타지 않는다
+            raise ValueError("WS_AOI_RADIUS needs room sharding (WS_SHARD_SELF/WS_SHARD_WORKERS) when WS_BACKPLANE is set")
+        self.manager = ConnectionManager(create_backplane(WS_BACKPLANE, REDIS_URL, DATABASE_URL))
+        if ROOMS_SHARED:
+            # 다른 워커도 같은 방의 오브젝트를 바꾼다 – 변경 알림을 받는(구독 중인) 방의 격자만 캐시
+            occupancy.tracked = self.manager.backplane.rooms
+            occupancy.on_change = self.manager.objects_changed
+        self.sharding = RoomSharding.from_config(WS_SHARD_SELF, WS_SHARD_WORKERS)
         self.user_service = UserService()
         self.room_service = RoomService()
         self.chat_service = ChatService()
         self.tools_service = ToolsService()
         self.inventory_service = InventoryService()
+        self.object_service = ObjectService()
+        self.position_ticker = PositionTicker(self._flush_positions, hz=WS_TICK_HZ) if WS_TICK_HZ > 0 else None
+        # room_id -> spatial hash of user positions (AOI 모드에서만 사용)
+        self.interest_grids: Dict[int, InterestGrid] = {}
+        # user_id -> (username, avatar_url), 시야 진입 이벤트 구성용
+        self.user_profiles: Dict[int, Tuple[str, Optional[str]]] = {}
+        # 압축 위치 스트림 (join_room에서 compact_positions=true로 선택한 연결용)
+        # (room_id, user_id) -> move_to로 걷고 있는 경로
+        self.walks: Dict[Tuple[int, int], Walk] = {}
+        # move_intent로 움직이는 사용자의 서버 측 외삽 (추측 항법)
+        self.motions = MotionTracker(
+            self._on_motion_step,
+            lambda room_id, start, end: self.room_service.occupancy(room_id).sweep(*start, *end),
+        )
+        self.position_stream = PositionStream(quantum=WS_POSITION_QUANTUM, keyframe_interval=WS_KEYFRAME_INTERVAL)
+        # 하트비트 + 유령 접속 정리 (첫 연결 때 시작)
+        self.reaper = PresenceReaper(
+            self.manager.registry,
+            ping=self._ping_connections,
+            evict=self._evict_connections,
+            flush=self._flush_departed,
+            interval=WS_REAP_INTERVAL,
+            ping_interval=WS_PING_INTERVAL,
+            idle_timeout=WS_IDLE_TIMEOUT,
+        )
+        self.manager.on_departed = self.reaper.departed
+        # event -> 속도 제한에 걸린 횟수 (/ws/stats)
+        self.rate_limited: Dict[str, int] = {}
+        self.routes: Dict[str, _Route] = {
+            event: _Route(getattr(self, handler), _ADAPTERS.get(model), error, event_class)
+            for event, handler, model, error, event_class in _ROUTES
+        }
 
     async def handle_websocket(self, websocket: WebSocket, token: str):
         """Handle WebSocket connection and messages"""
+        user = None
+        pipeline: Optional[InboundPipeline] = None
         try:
             # Validate token and get user
             user = await self._authenticate_user(token)
@@ -108,30 +525,55 @@ class WebSocketService:
                 await websocket.close(code=4001, reason="Invalid token")
                 return
 
-            await self.manager.connect(websocket, user.id)
+            # Sec-WebSocket-Protocol 협상: cafe.msgpack이면 바이너리 MessagePack, 아니면 JSON
+            codec = negotiate(websocket.scope.get("subprotocols"))
+            conn = await self.manager.connect(websocket, user.id, codec=codec)
+            self.reaper.start()
+            if WS_PIPELINE:
+                pipeline = InboundPipeline(
+                    lambda message: self._process_message(websocket, user, message),
+                    maxsize=WS_PIPELINE_DEPTH,
+                    on_superseded=lambda message: self._send_ack(websocket, message, superseded=True),
+                )
+                pipeline.start()
             
             while True:
                 try:
                     # Receive message
-                    data = await websocket.receive_text()
-                    message = json.loads(data)
+                    receive = websocket.receive_bytes() if codec.binary else websocket.receive_text()
+                    if WS_IDLE_TIMEOUT > 0:
+                        # 응답 없는 소켓에서 수신 대기가 영원히 걸려 있지 않도록 한다
+                        data = await asyncio.wait_for(receive, WS_IDLE_TIMEOUT)
+                    else:
+                        data = await receive
+                    if self.manager.registry.get(websocket) is not conn:
+                        # 정리기나 전송 실패로 이미 제거된 연결
+                        break
+                    conn.last_seen = time.monotonic()
+                    message = codec.decode(data)
                     
                     # Process message
-                    await self._process_message(websocket, user, message)
+                    if pipeline is not None:
+                        await pipeline.submit(message, self._event_class(message))
+                    else:
+                        await self._process_message(websocket, user, message)
                     
-                except WebSocketDisconnect:
+                except (WebSocketDisconnect, asyncio.TimeoutError):
                     break
                 except Exception as e:
-                    error_message = WebSocketMessage(
-                        event=WebSocketEvent.ERROR,
-                        data=ErrorData(error="Invalid message format", details=str(e)).dict()
-                    )
-                    await self.manager.send_personal_message(error_message.json(), websocket)
+                    await self._send_error(websocket, "Invalid message format", str(e))
                     
         except WebSocketDisconnect:
             pass
         finally:
+            room_id = self.manager.room_of(websocket)
+            if pipeline is not None:
+                # 이미 받은 채팅/도구 이벤트는 연결이 끊겨도 끝까지 처리한다
+                await pipeline.close()
             self.manager.disconnect(websocket)
+            # 같은 방에 다른 소켓(탭)이 남아 있으면 위치 정보는 유지
+            if room_id is not None and user is not None and not self.manager.registry.for_user_in_room(room_id, user.id):
+                self._forget_position(room_id, user.id)
 
     async def _authenticate_user(self, token: str) -> Optional[User]:
         """Authenticate user from token"""
@@ -150,61 +592,214 @@ class WebSocketService:
 
     async def _process_message(self, websocket: WebSocket, user: User, message: dict):
         """Process incoming WebSocket message"""
-        event_val = message.get("event")
-        data = message.get("data", {})
+        token = _request_cid.set(_cid(message))
+        try:
+            await self._dispatch(websocket, user, message)
+            await self._send_ack(websocket, message)
+        finally:
+            _request_cid.reset(token)
+
+    async def _dispatch(self, websocket: WebSocket, user: User, message: dict):
+        event = message.get("event")
+        route = self.routes.get(event) if isinstance(event, str) else None
+        if route is None:
+            await self._send_error(websocket, "Unknown event type")
+            return
+        # batch 자체는 세지 않는다 – 안의 이벤트가 각각 토큰을 쓴다
+        if event != WebSocketEvent.BATCH.value and not await self._within_rate_limit(websocket, user, message, route):
+            return
+
+        payload = None
+        if route.adapter is not None:
+            try:
+                payload = route.adapter.validate_python(message.get("data", {}))
+            except ValidationError as e:
+                await self._send_error(websocket, route.error, str(e))
+                return
+        await route.handler(websocket, user, payload)
+
+    async def _within_rate_limit(self, websocket: WebSocket, user: User, message: dict, route: _Route) -> bool:
+        conn = self.manager.registry.get(websocket)
+        if conn is None or conn.limiter is None:
+            return True
+        event = message["event"]
+        # RTC 시그널링과 pong은 전체 버킷에 막히면 통화 연결/하트비트가 끊긴다 – 이벤트별 한도만 적용
+        wait = conn.limiter.check(event, shared=route.event_class != EventClass.SIGNAL)
+        if route.event_class == EventClass.POSITION:
+            if wait <= 0:
+                # 새 이동이 통과했으니 보류 중이던 예전 이동은 버린다
+                conn.limiter.cancel()
+                return True
+            conn.limiter.defer(message, wait, lambda deferred: self._dispatch(websocket, user, deferred))
+        elif wait <= 0:
+            return True
+        else:
+            await self._send_error(websocket, "Rate limited", f"Too many {event} events", retry_after=round(wait, 3))
+        self.rate_limited[event] = self.rate_limited.get(event, 0) + 1
+        return False
 
-        # 문자열 이벤트를 Enum으로 안전 변환 (불일치 시 None)
+    def _event_class(self, message: dict) -> EventClass:
+        event = message.get("event")
+        route = self.routes.get(event) if isinstance(event, str) else None
+        return route.event_class if route is not None else EventClass.ORDERED
+
+    async def _send_ack(self, websocket: WebSocket, message: dict, superseded: bool = False):
+        """Tell the client a request with a correlation id has been handled"""
+        cid = _cid(message)
+        # batch_result가 batch 자체와 그 안의 이벤트에 대한 응답을 대신한다
+        if cid is None or _batch_results.get() is not None or message.get("event") == WebSocketEvent.BATCH.value:
+            return
+        data = {"cid": cid, "event": message.get("event")}
+        if superseded:
+            # 최신 위치로 대체되어 처리되지 않은 이동
+            data["superseded"] = True
+        # 응답과 같은 lane으로 보내 ack가 응답보다 먼저 도착하지 않게 한다
+        await self.manager.send_personal_message(event_frame(WebSocketEvent.ACK, data), websocket)
+
+    async def _send_error(self, websocket: WebSocket, error: str, details: Optional[str] = None, retry_after: Optional[float] = None):
+        results = _batch_results.get()
+        if results:
+            results[-1].update(ok=False, error=error, details=details)
+            if retry_after is not None:
+                results[-1]["retry_after"] = retry_after
+            return
+        error_data = ErrorData(error=error, details=details, cid=_request_cid.get(), retry_after=retry_after)
+        await self.manager.send_personal_message(
+            event_frame(WebSocketEvent.ERROR, error_data),
+            websocket, lane=Lane.CONTROL
+        )
+
+    async def _handle_pong(self, websocket: WebSocket, user: User, data: None = None):
+        """Heartbeat reply; receiving it already refreshed last_seen"""
+
+    async def _ping_connections(self, conns: List[Connection]):
+        await self.manager.send_many(
+            event_frame(WebSocketEvent.PING, {}), [conn.websocket for conn in conns], lane=Lane.CONTROL
+        )
+
+    async def _evict_connections(self, conns: List[Connection]):
+        for conn in conns:
+            logger.info("Evicting idle WebSocket (user %s, room %s)", conn.user_id, conn.room_id)
+            self.manager.evict(conn.websocket, WS_CLOSE_IDLE, "Idle timeout")
+
+    async def _flush_departed(self, departed: Dict[int, Set[int]]):
+        """Delete departed users' rows in one statement and announce them once per room"""
+        gone: Dict[int, Set[int]] = {}
+        for room_id, user_ids in departed.items():
+            # 그 사이 다른 소켓으로 다시 들어온 사용자는 제외
+            left = {user_id for user_id in user_ids if not self.manager.registry.for_user_in_room(room_id, user_id)}
+            if left:
+                gone[room_id] = left
+        if not gone:
+            return
+        for room_id, user_ids in gone.items():
+            for user_id in user_ids:
+                self._forget_position(room_id, user_id)
         try:
-            event = WebSocketEvent(event_val) if isinstance(event_val, str) else event_val
+            # 그 사이 다른 워커로 다시 들어온 사용자(새 행)는 지워지지 않고 알리지도 않는다
+            removed = await self.room_service.remove_users(gone)
         except Exception:
-            event = None
-
-        if event == WebSocketEvent.JOIN_ROOM:
-            await self._handle_join_room(websocket, user, data)
-        elif event == WebSocketEvent.LEAVE_ROOM:
-            await self._handle_leave_room(websocket, user, data)
-        elif event == WebSocketEvent.UPDATE_POSITION:
-            await self._handle_update_position(websocket, user, data)
-        elif event == WebSocketEvent.SEND_MESSAGE:
-            await self._handle_send_message(websocket, user, data)
-        elif event == WebSocketEvent.USE_TOOL:
-            await self._handle_use_tool(websocket, user, data)
-        elif event == "place_object":
-            await self._handle_place_object(websocket, user, data)
-        elif event == "get_inventory":
-            await self._handle_get_inventory(websocket, user)
-        elif event == "get_room_state":
-            await self._handle_get_room_state(websocket, user, data)
-        elif event == WebSocketEvent.RTC_JOIN:
-            await self._handle_rtc_join(websocket, user, data)
-        elif event == WebSocketEvent.RTC_LEAVE:
-            await self._handle_rtc_leave(websocket, user, data)
-        elif event == WebSocketEvent.RTC_OFFER:
-            await self._handle_rtc_offer(websocket, user, data)
-        elif event == WebSocketEvent.RTC_ANSWER:
-            await self._handle_rtc_answer(websocket, user, data)
-        elif event == WebSocketEvent.RTC_ICE_CANDIDATE:
-            await self._handle_rtc_ice_candidate(websocket, user, data)
-        else:
-            error_message = WebSocketMessage(
-                event=WebSocketEvent.ERROR,
-                data=ErrorData(error="Unknown event type").dict()
+            logger.exception("Failed to remove departed room users")
+            removed = gone
+        for room_id, user_ids in removed.items():
+            await self.manager.broadcast_to_room(
+                event_frame(WebSocketEvent.USERS_LEFT, {"room_id": room_id, "user_ids": sorted(user_ids)}), room_id
             )
-            await self.manager.send_personal_message(error_message.json(), websocket)
 
-    async def _handle_join_room(self, websocket: WebSocket, user: User, data: dict):
+    async def _handle_batch(self, websocket: WebSocket, user: User, batch: BatchData):
+        """Run several events in order on one DB transaction and reply once.
+
+        Frames for other users are sent only after the COMMIT. If the COMMIT
+        fails they are discarded and the materialized state and occupancy grid
+        of every room the batch touched are dropped, so both reload from the
+        database; presence (positions) is written behind and not part of the
+        transaction.
+        """
+        if len(batch.events) > WS_BATCH_MAX:
+            await self._send_error(websocket, "Invalid batch", f"At most {WS_BATCH_MAX} events per batch")
+            return
+        results: List[Dict[str, Any]] = []
+        failure: Optional[Exception] = None
+        outbox = _Outbox()
+        outbox_token = _outbox.set(outbox)
+        token = _batch_results.set(results)
+        try:
+            # 각 이벤트의 commit은 SAVEPOINT 해제가 되고, 실제 COMMIT은 배치 끝에서 한 번
+            with shared_transaction():
+                for index, message in enumerate(batch.events):
+                    entry: Dict[str, Any] = {"index": index, "event": message.get("event")}
+                    cid = _cid(message)
+                    if cid is not None:
+                        entry["cid"] = cid
+                    results.append(entry)
+                    if message.get("event") == WebSocketEvent.BATCH.value:
+                        await self._send_error(websocket, "Invalid batch", "Batches cannot be nested")
+                    else:
+                        await self._dispatch(websocket, user, message)
+                    entry.setdefault("ok", True)
+        except Exception as e:
+            failure = e
+        finally:
+            _batch_results.reset(token)
+            _outbox.reset(outbox_token)
+            outbox.open = False
+        if failure is not None:
+            room_id = self.manager.room_of(websocket)
+            for touched in outbox.rooms | ({room_id} if room_id is not None else set()):
+                # 롤백된 변경이 들어갔을 수 있다 – 다음 사용 때 DB에서 다시 읽는다
+                room_states.drop(touched)
+                occupancy.drop(touched)
+            await self._send_error(websocket, "Failed to commit batch", str(failure))
+            return
+        for send in outbox.sends:
+            await send()
+        await self.manager.send_personal_message(
+            event_frame(WebSocketEvent.BATCH_RESULT, {"cid": _request_cid.get(), "results": results}), websocket
+        )
+
+    async def _handle_join_room(self, websocket: WebSocket, user: User, join_data: JoinRoomMessage):
         """Handle join room event"""
         try:
-            join_data = JoinRoomMessage(**data)
+            if self.sharding is not None and not self.sharding.is_local(join_data.room_id):
+                # 다른 워커 소유의 방 – 소유 워커로 재접속하도록 안내
+                redirect_message = event_frame(WebSocketEvent.ROOM_REDIRECT, self.sharding.redirect_for(join_data.room_id))
+                await self.manager.send_personal_message(redirect_message, websocket, lane=Lane.CONTROL)
+                return
             
             # Join room in database
             room_user = await self.room_service.join_room(user.id, join_data.room_id, join_data.x, join_data.y)
             
             # Join WebSocket room
-            await self.manager.join_room(websocket, join_data.room_id)
+            previous_room_id = self.manager.room_of(websocket)
+            if previous_room_id is not None and previous_room_id != join_data.room_id:
+                self._forget_position(previous_room_id, user.id)
+            await self.manager.join_room(websocket, join_data.room_id, compact=join_data.compact_positions)
+            self.user_profiles[user.id] = (user.username, user.avatar_url)
+            self.position_stream.join(join_data.room_id, user.id, join_data.x, join_data.y)
+            if WS_AOI_RADIUS > 0:
+                self._interest_grid(join_data.room_id).update(user.id, join_data.x, join_data.y)
             
-            # Send initial state to self
-            await self._send_initial_state(websocket, user, join_data.room_id)
+            chunk_change = None
+            if self.manager.chunks is not None and join_data.object_chunks and join_data.viewport is not None:
+                viewport = join_data.viewport
+                chunk_change = self.manager.chunks.set_viewport(
+                    websocket, join_data.room_id, (viewport.x, viewport.y, viewport.width, viewport.height)
+                )
+
+            # Send initial state to self (재접속이고 놓친 이벤트가 버퍼 안이면 그것만 재전송)
+            await self._send_room_state_or_replay(websocket, user, join_data)
+            if chunk_change is not None:
+                await self._apply_chunk_change(websocket, chunk_change)
+
+            # 압축 위치 스트림: 메타데이터는 입장 시 한 번만, 이후 키프레임 + 델타
+            if join_data.compact_positions:
+                sessions = self.position_stream.sessions(join_data.room_id, self.user_profiles)
+                await self.manager.send_personal_message(OutboundFrame(sessions), websocket)
+            sessions = self.position_stream.sessions(join_data.room_id, self.user_profiles, [user.id])
+            await self.manager.broadcast_to_room(
+                OutboundFrame(sessions), join_data.room_id, exclude_websocket=websocket, compact=True
+            )
+            await self._send_position_keyframe(join_data.room_id)
 
             # Broadcast user joined to room
             user_data = UserPositionData(
@@ -215,34 +810,24 @@ class WebSocketService:
                 y=join_data.y
             )
             
-            broadcast_message = WebSocketMessage(
-                event=WebSocketEvent.USER_JOINED,
-                data=user_data.dict()
-            )
-            
             await self.manager.broadcast_to_room(
-                broadcast_message.json(), 
+                event_frame(WebSocketEvent.USER_JOINED, user_data),
                 join_data.room_id, 
                 exclude_websocket=websocket
             )
             
         except Exception as e:
-            error_message = WebSocketMessage(
-                event=WebSocketEvent.ERROR,
-                data=ErrorData(error="Failed to join room", details=str(e)).dict()
-            )
-            await self.manager.send_personal_message(error_message.json(), websocket)
+            await self._send_error(websocket, "Failed to join room", str(e))
 
-    async def _handle_leave_room(self, websocket: WebSocket, user: User, data: dict):
+    async def _handle_leave_room(self, websocket: WebSocket, user: User, leave_data: LeaveRoomMessage):
         """Handle leave room event"""
         try:
-            leave_data = LeaveRoomMessage(**data)
-            
             # Leave room in database
             await self.room_service.leave_room(user.id, leave_data.room_id)
             
             # Leave WebSocket room
             self.manager.leave_room(websocket)
+            self._forget_position(leave_data.room_id, user.id)
             
             # Broadcast user left to room
             user_data = UserPositionData(
@@ -253,64 +838,275 @@ class WebSocketService:
                 y=0
             )
             
-            broadcast_message = WebSocketMessage(
-                event=WebSocketEvent.USER_LEFT,
-                data=user_data.dict()
-            )
-            
             await self.manager.broadcast_to_room(
-                broadcast_message.json(), 
+                event_frame(WebSocketEvent.USER_LEFT, user_data),
                 leave_data.room_id, 
                 exclude_websocket=websocket
             )
             
         except Exception as e:
-            error_message = WebSocketMessage(
-                event=WebSocketEvent.ERROR,
-                data=ErrorData(error="Failed to leave room", details=str(e)).dict()
-            )
-            await self.manager.send_personal_message(error_message.json(), websocket)
+            await self._send_error(websocket, "Failed to leave room", str(e))
 
-    async def _handle_update_position(self, websocket: WebSocket, user: User, data: dict):
+    async def _handle_update_position(self, websocket: WebSocket, user: User, position_data: UpdatePositionMessage):
         """Handle update position event"""
         try:
-            position_data = UpdatePositionMessage(**data)
-            
-            # Update position in database
-            await self.room_service.update_user_position(user.id, position_data.room_id, position_data.x, position_data.y)
-            
-            # Broadcast position update to room
-            user_data = UserPositionData(
-                user_id=user.id,
-                username=user.username,
-                avatar_url=user.avatar_url,
-                x=position_data.x,
-                y=position_data.y
-            )
-            
-            broadcast_message = WebSocketMessage(
-                event=WebSocketEvent.POSITION_UPDATED,
-                data=user_data.dict()
+            # 직접 보낸 위치가 걷던 경로/이동 intent를 대신한다
+            self.walks.pop((position_data.room_id, user.id), None)
+            self.motions.drop(position_data.room_id, user.id)
+            x, y = self.room_service.clamp_position(user.id, position_data.room_id, position_data.x, position_data.y)
+            if (x, y) != (position_data.x, position_data.y):
+                # 벽/오브젝트나 방 밖으로는 갈 수 없다 – 보낸 사람에게 실제 위치를 알려 준다
+                await self.manager.send_personal_message(
+                    event_frame(WebSocketEvent.POSITION_CORRECTED, {"room_id": position_data.room_id, "x": x, "y": y}),
+                    websocket,
+                )
+            await self._apply_position(websocket, position_data.room_id, user.id, x, y)
+        except Exception as e:
+            await self._send_error(websocket, "Failed to update position", str(e))
+
+    async def _apply_position(self, websocket: WebSocket, room_id: int, user_id: int, x: int, y: int, announce: bool = True):
+        """Record a user's new position everywhere this worker tracks it and tell the room.
+
+        Presence, the compact stream, the mover's chunks/LOD and the interest
+        grid are always updated. ``announce=False`` is for moves the room has
+        already been told about (``user_path``, ``user_intent``): only view
+        enter/leave events are sent then.
+        """
+        await self.room_service.update_user_position(user_id, room_id, x, y)
+        self.position_stream.update(room_id, user_id, x, y)
+        await self._follow_avatar(websocket, room_id, x, y)
+
+        if WS_AOI_RADIUS > 0:
+            await self._broadcast_position_in_view(websocket, room_id, user_id, x, y, announce)
+            return
+        if not announce:
+            return
+
+        username, avatar_url = self.user_profiles.get(user_id, ("", None))
+        if self.position_ticker is not None:
+            # 틱 모드: 최신 위치만 보관하고 다음 틱에 positions_batch로 일괄 전송
+            self.position_ticker.submit(room_id, user_id, username, avatar_url, x, y)
+            return
+
+        # Broadcast position update to room
+        user_data = UserPositionData(user_id=user_id, username=username, avatar_url=avatar_url, x=x, y=y)
+        await self.manager.broadcast_to_room(
+            event_frame(WebSocketEvent.POSITION_UPDATED, user_data),
+            room_id,
+            exclude_websocket=websocket,
+            lane=Lane.POSITIONS,
+            key=user_id,
+            compact=False
+        )
+        await self._send_compact_positions(room_id, [user_id], exclude_websocket=websocket)
+
+    async def _follow_avatar(self, websocket: WebSocket, room_id: int, x: int, y: int):
+        """Move the connection's chunk subscription and LOD cell along with its avatar"""
+        if self.manager.chunks is not None:
+            chunk_change = self.manager.chunks.follow(websocket, x, y)
+            if chunk_change is not None:
+                await self._apply_chunk_change(websocket, chunk_change)
+        conn = self.manager.registry.get(websocket)
+        if conn is not None and conn.lod_cell is not None:
+            await self._update_lod(websocket, conn, room_id, x, y)
+
+    async def _handle_move_to(self, websocket: WebSocket, user: User, data: MoveToData):
+        """Handle move_to: find a path on the room's walkable grid and broadcast it once"""
+        room_id = data.room_id
+        if self.manager.room_of(websocket) != room_id:
+            await self._send_error(websocket, "Not in room", str(room_id))
+            return
+        try:
+            grid = self.room_service.occupancy(room_id)
+            self.motions.drop(room_id, user.id)
+            walking = self.walks.get((room_id, user.id))
+            start = walking.position_at() if walking is not None else self.room_service.current_position(user.id, room_id)
+            if start is None:
+                await self._send_error(websocket, "Not in room", str(room_id))
+                return
+            goal = (min(max(data.x, 0), grid.width - 1), min(max(data.y, 0), grid.height - 1))
+            path = paths.route(grid, start, goal)
+            if path is None:
+                await self._send_error(websocket, "No path", f"{goal[0]},{goal[1]}")
+                return
+            walk = self.walks[(room_id, user.id)] = Walk(path)
+            await self.manager.broadcast_to_room(
+                event_frame(WebSocketEvent.USER_PATH, {
+                    "user_id": user.id,
+                    "room_id": room_id,
+                    "path": [list(point) for point in path],
+                    "speed": walk.speed,
+                    "started_at": int(walk.started * 1000),
+                }),
+                room_id,
             )
-            
+            # 도착 위치를 한 번만 기록한다 – 중간 위치는 클라이언트가 보간
+            await self._apply_position(websocket, room_id, user.id, *goal, announce=False)
+        except Exception as e:
+            await self._send_error(websocket, "Failed to move", str(e))
+
+    async def _handle_move_intent(self, websocket: WebSocket, user: User, data: MoveIntentData):
+        """Handle move_intent: broadcast the intent once and extrapolate it on the server"""
+        room_id = data.room_id
+        if self.manager.room_of(websocket) != room_id:
+            await self._send_error(websocket, "Not in room", str(room_id))
+            return
+        try:
+            self.walks.pop((room_id, user.id), None)
+            now = time.time()
+            vx, vy = cap_speed(data.vx, data.vy)
+            x, y = self.room_service.clamp_position(user.id, room_id, data.x, data.y)
+            motion = Motion(x, y, vx, vy, now, websocket)
+            if data.ts is not None and 0 <= now - data.ts / 1000 <= INTENT_MAX_LAG:
+                # 클라이언트가 출발한 뒤 지난 만큼 이동한 위치에서 서버 시각으로 다시 시작
+                motion.started = data.ts / 1000
+                motion.actual = self.room_service.occupancy(room_id).sweep(x, y, *motion.position_at(now))
+                motion.rebase(now, vx, vy)
+            if motion.moving:
+                self.motions.set(room_id, user.id, motion)
+            else:
+                self.motions.drop(room_id, user.id)
+            await self._on_motion_step(room_id, user.id, motion, False)
             await self.manager.broadcast_to_room(
-                broadcast_message.json(), 
-                position_data.room_id, 
-                exclude_websocket=websocket
+                event_frame(WebSocketEvent.USER_INTENT, motion.payload(room_id, user.id)), room_id
             )
-            
         except Exception as e:
-            error_message = WebSocketMessage(
-                event=WebSocketEvent.ERROR,
-                data=ErrorData(error="Failed to update position", details=str(e)).dict()
+            await self._send_error(websocket, "Failed to move", str(e))
+
+    async def _on_motion_step(self, room_id: int, user_id: int, motion: Motion, corrected: bool):
+        """Persist a dead-reckoned position; broadcast the rebased intent when it was corrected"""
+        if corrected:
+            await self.manager.broadcast_to_room(
+                event_frame(WebSocketEvent.USER_INTENT, motion.payload(room_id, user_id, correction=True)), room_id
+            )
+        # 방은 user_intent로 외삽하고 있으므로 위치 자체는 알리지 않는다
+        await self._apply_position(motion.websocket, room_id, user_id, *motion.actual, announce=False)
+
+    async def _broadcast_position_in_view(
+        self, websocket: WebSocket, room_id: int, user_id: int, x: int, y: int, announce: bool = True
+    ):
+        """Send a move only to users whose interest radius covers the mover"""
+        entered, stayed, left = self._interest_grid(room_id).move(user_id, x, y)
+        username, avatar_url = self.user_profiles.get(user_id, ("", None))
+        user_data = UserPositionData(user_id=user_id, username=username, avatar_url=avatar_url, x=x, y=y)
+
+        # 시야 이벤트는 위치 프레임과 순서가 섞이지 않도록 같은 lane으로 보낸다 (병합 키 없음)
+        if entered:
+            message = event_frame(WebSocketEvent.USER_ENTERED_VIEW, user_data)
+            await self.manager.send_to_users(message, room_id, entered, lane=Lane.POSITIONS)
+        if left:
+            message = event_frame(WebSocketEvent.USER_LEFT_VIEW, {"user_id": user_id})
+            await self.manager.send_to_users(message, room_id, left, lane=Lane.POSITIONS)
+
+        # 움직인 사용자 쪽에서도 시야에 들어오고 나간 사용자를 알려준다
+        grid = self._interest_grid(room_id)
+        for other_id in entered:
+            other_x, other_y = grid.position(other_id)
+            other_name, other_avatar = self.user_profiles.get(other_id, ("", None))
+            message = event_frame(
+                WebSocketEvent.USER_ENTERED_VIEW,
+                UserPositionData(user_id=other_id, username=other_name, avatar_url=other_avatar, x=other_x, y=other_y)
+            )
+            await self.manager.send_personal_message(message, websocket, lane=Lane.POSITIONS)
+        for other_id in left:
+            message = event_frame(WebSocketEvent.USER_LEFT_VIEW, {"user_id": other_id})
+            await self.manager.send_personal_message(message, websocket, lane=Lane.POSITIONS)
+
+        if not announce:
+            return
+        if self.position_ticker is not None:
+            self.position_ticker.submit(room_id, user_id, username, avatar_url, x, y)
+            return
+        if stayed:
+            message = event_frame(WebSocketEvent.POSITION_UPDATED, user_data)
+            await self.manager.send_to_users(
+                message, room_id, stayed, lane=Lane.POSITIONS, key=user_id, compact=False
+            )
+            await self._send_compact_positions(room_id, [user_id], watchers=stayed)
+
+    async def _send_compact_positions(
+        self,
+        room_id: int,
+        movers: List[int],
+        watchers: Optional[Set[int]] = None,
+        exclude_websocket: Optional[WebSocket] = None,
+    ):
+        """Send a positions delta (or a keyframe when due) to compact-stream connections"""
+        if self.position_stream.keyframe_due(room_id):
+            await self._send_position_keyframe(room_id)
+            return
+        payload = self.position_stream.delta(room_id, movers)
+        if payload is None:
+            return
+        # 단일 이동은 사용자별 키로 병합 가능 (같은 키프레임 기준이므로 최신 델타만 있으면 된다)
+        key = ("pd", movers[0]) if len(movers) == 1 else None
+        if watchers is None:
+            await self.manager.broadcast_to_room(
+                OutboundFrame(payload), room_id, exclude_websocket=exclude_websocket,
+                lane=Lane.POSITIONS, key=key, compact=True
+            )
+        else:
+            await self.manager.send_to_users(
+                OutboundFrame(payload), room_id, watchers, lane=Lane.POSITIONS, key=key, compact=True
+            )
+
+    async def _send_position_keyframe(self, room_id: int):
+        # 키프레임은 버려지지 않는 lane으로 보내 모든 클라이언트의 기준점을 맞춘다
+        payload = self.position_stream.take_keyframe(room_id)
+        await self.manager.broadcast_to_room(OutboundFrame(payload), room_id, lane=Lane.EVENTS, compact=True)
+
+    async def _flush_positions(self, room_id: int, batch: Dict[int, Any]):
+        if WS_AOI_RADIUS <= 0:
+            await self.manager.broadcast_to_room(
+                PositionTicker.encode(room_id, batch.values()), room_id, lane=Lane.POSITIONS, compact=False
             )
-            await self.manager.send_personal_message(error_message.json(), websocket)
+            await self._send_compact_positions(room_id, list(batch))
+            return
+        # AOI 모드: 수신자별로 보이는 이동만 모으고, 같은 조합끼리는 한 번만 인코딩
+        keyframe_sent = False
+        if self.position_stream.keyframe_due(room_id):
+            await self._send_position_keyframe(room_id)
+            keyframe_sent = True
+        grid = self._interest_grid(room_id)
+        visible: Dict[int, List[int]] = {}
+        for mover_id in batch:
+            for watcher_id in grid.watchers(mover_id):
+                visible.setdefault(watcher_id, []).append(mover_id)
+        groups: Dict[Tuple[int, ...], Set[int]] = {}
+        for watcher_id, movers in visible.items():
+            groups.setdefault(tuple(movers), set()).add(watcher_id)
+        for movers, watchers in groups.items():
+            frame = PositionTicker.encode(room_id, (batch[m] for m in movers))
+            await self.manager.send_to_users(frame, room_id, watchers, lane=Lane.POSITIONS, compact=False)
+            if not keyframe_sent:
+                await self._send_compact_positions(room_id, list(movers), watchers=watchers)
+
+    def _interest_grid(self, room_id: int) -> InterestGrid:
+        grid = self.interest_grids.get(room_id)
+        if grid is None:
+            grid = self.interest_grids[room_id] = InterestGrid(WS_AOI_RADIUS)
+        return grid
 
-    async def _handle_send_message(self, websocket: WebSocket, user: User, data: dict):
+    def _forget_position(self, room_id: int, user_id: int):
+        """Drop a user's in-memory position state for a room (leave/disconnect)"""
+        self.walks.pop((room_id, user_id), None)
+        self.motions.drop(room_id, user_id)
+        if self.position_ticker is not None:
+            self.position_ticker.discard(room_id, user_id)
+        self.position_stream.leave(room_id, user_id)
+        if not any(conn.room_id is not None for conn in self.manager.registry.for_user(user_id)):
+            # 다른 방에 남은 소켓이 있으면 그 방의 위치 이벤트에 아직 필요하다
+            self.user_profiles.pop(user_id, None)
+        grid = self.interest_grids.get(room_id)
+        if grid is None:
+            return
+        grid.remove(user_id)
+        if not len(grid):
+            del self.interest_grids[room_id]
+
+    async def _handle_send_message(self, websocket: WebSocket, user: User, message_data: SendMessageData):
         """Handle send message event"""
         try:
-            message_data = SendMessageData(**data)
-            
             # Save message to database
             chat_log = await self.chat_service.send_message(user.id, message_data.room_id, message_data.message)
             
@@ -323,28 +1119,17 @@ class WebSocketService:
                 timestamp=chat_log.created_at
             )
             
-            broadcast_message = WebSocketMessage(
-                event=WebSocketEvent.MESSAGE_RECEIVED,
-                data=chat_data.dict()
-            )
-            
             await self.manager.broadcast_to_room(
-                broadcast_message.json(), 
+                event_frame(WebSocketEvent.MESSAGE_RECEIVED, chat_data),
                 message_data.room_id
             )
             
         except Exception as e:
-            error_message = WebSocketMessage(
-                event=WebSocketEvent.ERROR,
-                data=ErrorData(error="Failed to send message", details=str(e)).dict()
-            )
-            await self.manager.send_personal_message(error_message.json(), websocket)
+            await self._send_error(websocket, "Failed to send message", str(e))
 
-    async def _handle_use_tool(self, websocket: WebSocket, user: User, data: dict):
+    async def _handle_use_tool(self, websocket: WebSocket, user: User, tool_data: UseToolData):
         """Handle use tool event"""
         try:
-            tool_data = UseToolData(**data)
-            
             # Log tool usage in database
             tools_log = await self.tools_service.use_tool(user.id, tool_data.room_id, tool_data.target_object_id, tool_data.action)
             
@@ -357,28 +1142,18 @@ class WebSocketService:
                 timestamp=tools_log.created_at
             )
             
-            broadcast_message = WebSocketMessage(
-                event=WebSocketEvent.TOOL_USED,
-                data=tool_usage_data.dict()
-            )
-            
             await self.manager.broadcast_to_room(
-                broadcast_message.json(), 
-                tool_data.room_id
+                event_frame(WebSocketEvent.TOOL_USED, tool_usage_data),
+                tool_data.room_id,
+                at=await self._object_position(tool_data.room_id, tool_data.target_object_id)
             )
             
         except Exception as e:
-            error_message = WebSocketMessage(
-                event=WebSocketEvent.ERROR,
-                data=ErrorData(error="Failed to use tool", details=str(e)).dict()
-            )
-            await self.manager.send_personal_message(error_message.json(), websocket)
+            await self._send_error(websocket, "Failed to use tool", str(e))
 
-    async def _handle_place_object(self, websocket: WebSocket, user: User, data: dict):
+    async def _handle_place_object(self, websocket: WebSocket, user: User, payload: InventoryPlaceRequest):
         """Handle placing an inventory item into the room by drag & drop"""
         try:
-            from app.schemas.inventory import InventoryPlaceRequest
-            payload = InventoryPlaceRequest(**data)
             created = await self.inventory_service.place_item_from_inventory(
                 user_id=user.id,
                 inventory_item_id=payload.inventory_item_id,
@@ -389,9 +1164,9 @@ class WebSocketService:
             )
 
             # Broadcast new object placed
-            message = WebSocketMessage(
-                event="object_placed",
-                data={
+            message = event_frame(
+                "object_placed",
+                {
                     "id": created.id,
                     "room_id": created.room_id,
                     "type": created.type.value if hasattr(created.type, 'value') else created.type,
@@ -403,15 +1178,11 @@ class WebSocketService:
                     "owner_username": user.username,
                 }
             )
-            await self.manager.broadcast_to_room(message.json(), payload.room_id)
+            await self.manager.broadcast_to_room(message, payload.room_id, at=(created.x, created.y))
         except Exception as e:
-            error_message = WebSocketMessage(
-                event=WebSocketEvent.ERROR,
-                data=ErrorData(error="Failed to place object", details=str(e)).dict()
-            )
-            await self.manager.send_personal_message(error_message.json(), websocket)
+            await self._send_error(websocket, "Failed to place object", str(e))
 
-    async def _handle_get_inventory(self, websocket: WebSocket, user: User):
+    async def _handle_get_inventory(self, websocket: WebSocket, user: User, data: None = None):
         try:
             items = await self.inventory_service.list_items(user.id)
             # Serialize minimal fields
@@ -423,145 +1194,195 @@ class WebSocketService:
                 }
                 for it in items
             ]
-            msg = WebSocketMessage(event="inventory", data={"items": payload})
-            await self.manager.send_personal_message(msg.json(), websocket)
+            msg = event_frame("inventory", {"items": payload})
+            await self.manager.send_personal_message(msg, websocket)
         except Exception as e:
-            error_message = WebSocketMessage(
-                event=WebSocketEvent.ERROR,
-                data=ErrorData(error="Failed to get inventory", details=str(e)).dict()
-            )
-            await self.manager.send_personal_message(error_message.json(), websocket)
+            await self._send_error(websocket, "Failed to get inventory", str(e))
+
+    async def _room_state(self, room_id: int) -> RoomState:
+        if self.room_service.presence_cache is None and not ROOMS_SHARED:
+            # 이 프로세스가 방의 모든 변경을 보므로 미리 직렬화된 상태를 그대로 쓴다
+            return await room_states.get(room_id, self.room_service.load_room_state)
+        # 다른 워커의 입장/이동은 여기서 보이지 않으므로 요청마다 새로 만든다
+        return RoomState(room_id, *await self.room_service.load_room_state(room_id))
 
-    async def _handle_get_room_state(self, websocket: WebSocket, user: User, data: dict):
+    async def _handle_get_room_state(self, websocket: WebSocket, user: User, data: GetRoomStateData):
         try:
-            room_id = int(data.get("room_id"))
-            with get_session() as db:
-                # Pull current users
-                users = db.query(RoomUser).filter(RoomUser.room_id == room_id).all()
-                users_payload = [
-                {
-                    "user_id": ru.user_id,
-                    "x": ru.x,
-                    "y": ru.y,
-                    "username": db.query(User).filter(User.id == ru.user_id).first().username if db else None,
-                }
-                for ru in users
-            ]
-                # Pull objects
-                from app.models import Object
-                objects = db.query(Object).filter(Object.room_id == room_id).all()
-                objects_payload = [
-                {
-                    "id": o.id,
-                    "type": o.type.value if hasattr(o.type, 'value') else o.type,
-                    "x": o.x,
-                    "y": o.y,
-                    "rotation": o.rotation,
-                    "metadata": o.get_metadata(),
-                }
-                for o in objects
-            ]
-                msg = WebSocketMessage(event="room_state", data={"room_id": room_id, "users": users_payload, "objects": objects_payload})
-                await self.manager.send_personal_message(msg.json(), websocket)
+            state = await self._room_state(data.room_id)
+            if self.manager.chunks is not None and self.manager.chunks.chunks(websocket) is not None:
+                # 오브젝트는 chunk_load로 따로 받는다
+                await self.manager.send_personal_message(state.users_frame(), websocket)
+                return
+            if data.viewport is not None:
+                await self._stream_room_state(websocket, state, data.viewport)
+                return
+            conn = self.manager.registry.get(websocket)
+            if data.lod and ROOM_STATE_LOD_CELL > 0 and conn is not None:
+                conn.lod_cell = state.lod_cell(*(state.user_position(user.id) or (0, 0)))
+                await self.manager.send_personal_message(state.lod_frame(conn.lod_cell), websocket)
+                return
+            codec = conn.codec if conn is not None and conn.codec is not None else JSON_CODEC
+            blob = state.compressed(codec) if data.compress_state and not codec.binary else None
+            await self.manager.send_personal_message(blob or state.frame(), websocket)
         except Exception as e:
-            error_message = WebSocketMessage(
-                event=WebSocketEvent.ERROR,
-                data=ErrorData(error="Failed to get room state", details=str(e)).dict()
-            )
-            await self.manager.send_personal_message(error_message.json(), websocket)
+            await self._send_error(websocket, "Failed to get room state", str(e))
+
+    async def _stream_room_state(self, websocket: WebSocket, state: RoomState, viewport: Viewport):
+        """Send room_state_chunk frames (viewport first) and room_state_end, yielding between chunks"""
+        await self._send_paced(websocket, state.chunks((viewport.x, viewport.y, viewport.width, viewport.height)))
+
+    async def _send_paced(self, websocket: WebSocket, frames: Iterable[OutboundFrame]):
+        conn = self.manager.registry.get(websocket)
+        for frame in frames:
+            await self.manager.send_personal_message(frame, websocket)
+            if conn is not None and conn.queue is not None:
+                # 큐가 반쯤 찰 때까지만 쌓는다 – 느린 클라이언트를 overflow로 끊지 않도록
+                await conn.queue.wait_below(conn.queue.maxsize // 2)
+            # 큰 방에서도 다른 연결의 처리가 밀리지 않도록 프레임 사이에 양보
+            await asyncio.sleep(0)
+            if self.manager.registry.get(websocket) is not conn:
+                return
+
+    async def _handle_set_viewport(self, websocket: WebSocket, user: User, data: SetViewportData):
+        chunks = self.manager.chunks
+        if chunks is None:
+            await self._send_error(websocket, "Chunk subscriptions are disabled")
+            return
+        if self.manager.room_of(websocket) != data.room_id:
+            await self._send_error(websocket, "Not in room", str(data.room_id))
+            return
+        await self._apply_chunk_change(
+            websocket, chunks.set_viewport(websocket, data.room_id, (data.x, data.y, data.width, data.height))
+        )
+
+    async def _apply_chunk_change(self, websocket: WebSocket, change: ChunkChange):
+        """chunk_unload for chunks that left the viewport, chunk_load (nearest first) for new ones"""
+        room_id, loaded, unloaded = change
+        if unloaded:
+            payload = {"room_id": room_id, "chunks": sorted([cx, cy] for cx, cy in unloaded)}
+            await self.manager.send_personal_message(event_frame(WebSocketEvent.CHUNK_UNLOAD, payload), websocket)
+        if not loaded:
+            return
+        state = await self._room_state(room_id)
+        size = self.manager.chunks.size
+        watched = self.manager.chunks.chunks(websocket) or loaded
+        # 시야 중심에 가까운 청크부터
+        cx = sum(c[0] for c in watched) / len(watched)
+        cy = sum(c[1] for c in watched) / len(watched)
+        order = sorted(loaded, key=lambda c: (c[0] - cx) ** 2 + (c[1] - cy) ** 2)
+        await self._send_paced(websocket, (state.chunk_frame(chunk, size) for chunk in order))
+
+    async def _update_lod(self, websocket: WebSocket, conn: Connection, room_id: int, x: int, y: int):
+        """Expand the aggregates the viewer came close to and collapse the ones it left"""
+        # 공유 방이면 상태를 매번 새로 만들므로 칸이 바뀔 때만 읽는다
+        cell = (x // ROOM_STATE_LOD_CELL, y // ROOM_STATE_LOD_CELL)
+        if cell == conn.lod_cell:
+            return
+        state = room_states.peek(room_id) or await self._room_state(room_id)
+        frame = state.lod_update(conn.lod_cell, cell)
+        conn.lod_cell = cell
+        if frame is not None:
+            await self.manager.send_personal_message(frame, websocket)
 
-    async def _send_initial_state(self, websocket: WebSocket, user: User, room_id: int):
+    async def _object_position(self, room_id: int, object_id: int) -> Optional[Tuple[int, int]]:
+        """Where an object is, for chunk-filtered delivery (None when chunks are off)"""
+        if self.manager.chunks is None:
+            return None
+        state = room_states.peek(room_id)
+        position = state.object_position(object_id) if state is not None else None
+        if position is None:
+            obj = await self.object_service.get_object(object_id)
+            position = (obj.x, obj.y) if obj is not None and obj.room_id == room_id else None
+        return position
+
+    async def _send_room_state_or_replay(self, websocket: WebSocket, user: User, join_data: JoinRoomMessage):
+        journal = self.manager.journal
+        if journal is None:
+            await self._send_initial_state(websocket, user, join_data)
+            return
+        missed = None
+        if join_data.resume_token is not None and join_data.last_seq is not None:
+            missed = journal.since(join_data.room_id, join_data.resume_token, join_data.last_seq)
+        token, seq = journal.token(join_data.room_id)
+        session = {"room_id": join_data.room_id, "resume_token": token, "seq": seq, "resumed": missed is not None}
+        await self.manager.send_personal_message(event_frame(WebSocketEvent.SESSION, session), websocket)
+        if missed is None:
+            await self._send_initial_state(websocket, user, join_data)
+            return
+        for frame in missed:
+            await self.manager.send_personal_message(frame, websocket)
+        # 위치 lane은 journal에 남지 않으므로 지금 위치를 한 번에 보낸다
+        # (압축 스트림 연결은 입장 처리 끝의 pk 키프레임으로 맞춰진다)
+        if not join_data.compact_positions:
+            await self._send_positions_snapshot(websocket, join_data.room_id, join_data.x, join_data.y)
+
+    async def _send_positions_snapshot(self, websocket: WebSocket, room_id: int, x: int, y: int):
+        """positions_batch with the current position of everyone in the room (in view, with AOI)"""
+        users = await self.room_service.get_room_users(room_id)
+        if WS_AOI_RADIUS > 0:
+            visible = self._interest_grid(room_id).within(x, y)
+            users = [ru for ru in users if ru["user_id"] in visible]
+        entries = [(ru["user_id"], ru["user"]["username"], ru["user"]["avatar_url"], ru["x"], ru["y"]) for ru in users]
+        await self.manager.send_personal_message(PositionTicker.encode(room_id, entries), websocket)
+
+    async def _send_initial_state(self, websocket: WebSocket, user: User, join_data: JoinRoomMessage):
         await self._handle_get_inventory(websocket, user)
-        await self._handle_get_room_state(websocket, user, {"room_id": room_id})
+        await self._handle_get_room_state(websocket, user, GetRoomStateData(
+            room_id=join_data.room_id, compress_state=join_data.compress_state, viewport=join_data.viewport,
+            lod=join_data.lod,
+        ))
 
-    async def _handle_rtc_join(self, websocket: WebSocket, user: User, data: dict):
+    async def _handle_rtc_join(self, websocket: WebSocket, user: User, join_data: RtcJoinData):
         try:
-            join_data = RtcJoinData(**data)
             info = {
                 "user_id": user.id,
                 "username": user.username,
                 "avatar_url": user.avatar_url,
             }
-            message = WebSocketMessage(
-                event=WebSocketEvent.RTC_JOIN,
-                data=info
-            )
-            await self.manager.broadcast_to_room(message.json(), join_data.room_id, exclude_websocket=websocket)
+            message = event_frame(WebSocketEvent.RTC_JOIN, info)
+            await self.manager.broadcast_to_room(message, join_data.room_id, exclude_websocket=websocket)
         except Exception as e:
-            error_message = WebSocketMessage(
-                event=WebSocketEvent.ERROR,
-                data=ErrorData(error="Failed to rtc join", details=str(e)).dict()
-            )
-            await self.manager.send_personal_message(error_message.json(), websocket)
+            await self._send_error(websocket, "Failed to rtc join", str(e))
 
-    async def _handle_rtc_leave(self, websocket: WebSocket, user: User, data: dict):
+    async def _handle_rtc_leave(self, websocket: WebSocket, user: User, leave_data: RtcLeaveData):
         try:
-            leave_data = RtcLeaveData(**data)
             info = {
                 "user_id": user.id,
             }
-            message = WebSocketMessage(
-                event=WebSocketEvent.RTC_LEAVE,
-                data=info
-            )
-            await self.manager.broadcast_to_room(message.json(), leave_data.room_id, exclude_websocket=websocket)
+            message = event_frame(WebSocketEvent.RTC_LEAVE, info)
+            await self.manager.broadcast_to_room(message, leave_data.room_id, exclude_websocket=websocket)
         except Exception as e:
-            error_message = WebSocketMessage(
-                event=WebSocketEvent.ERROR,
-                data=ErrorData(error="Failed to rtc leave", details=str(e)).dict()
-            )
-            await self.manager.send_personal_message(error_message.json(), websocket)
+            await self._send_error(websocket, "Failed to rtc leave", str(e))
 
-    async def _handle_rtc_offer(self, websocket: WebSocket, user: User, data: dict):
+    async def _handle_rtc_offer(self, websocket: WebSocket, user: User, offer: RtcOfferData):
         try:
-            offer = RtcOfferData(**data)
-            target_ws = self.manager.get_connection_by_user_in_room(offer.room_id, offer.to_user_id)
             payload = {
                 "from_user_id": user.id,
                 "sdp": offer.sdp,
             }
-            message = WebSocketMessage(event=WebSocketEvent.RTC_OFFER, data=payload)
-            if target_ws:
-                await self.manager.send_personal_message(message.json(), target_ws)
+            message = event_frame(WebSocketEvent.RTC_OFFER, payload)
+            await self.manager.send_to_user_in_room(message, offer.room_id, offer.to_user_id, lane=Lane.CONTROL)
         except Exception as e:
-            error_message = WebSocketMessage(
-                event=WebSocketEvent.ERROR,
-                data=ErrorData(error="Failed to forward rtc offer", details=str(e)).dict()
-            )
-            await self.manager.send_personal_message(error_message.json(), websocket)
+            await self._send_error(websocket, "Failed to forward rtc offer", str(e))
 
-    async def _handle_rtc_answer(self, websocket: WebSocket, user: User, data: dict):
+    async def _handle_rtc_answer(self, websocket: WebSocket, user: User, answer: RtcAnswerData):
         try:
-            answer = RtcAnswerData(**data)
-            target_ws = self.manager.get_connection_by_user_in_room(answer.room_id, answer.to_user_id)
             payload = {
                 "from_user_id": user.id,
                 "sdp": answer.sdp,
             }
-            message = WebSocketMessage(event=WebSocketEvent.RTC_ANSWER, data=payload)
-            if target_ws:
-                await self.manager.send_personal_message(message.json(), target_ws)
+            message = event_frame(WebSocketEvent.RTC_ANSWER, payload)
+            await self.manager.send_to_user_in_room(message, answer.room_id, answer.to_user_id, lane=Lane.CONTROL)
         except Exception as e:
-            error_message = WebSocketMessage(
-                event=WebSocketEvent.ERROR,
-                data=ErrorData(error="Failed to forward rtc answer", details=str(e)).dict()
-            )
-            await self.manager.send_personal_message(error_message.json(), websocket)
+            await self._send_error(websocket, "Failed to forward rtc answer", str(e))
 
-    async def _handle_rtc_ice_candidate(self, websocket: WebSocket, user: User, data: dict):
+    async def _handle_rtc_ice_candidate(self, websocket: WebSocket, user: User, ice: RtcIceCandidateData):
         try:
-            ice = RtcIceCandidateData(**data)
-            target_ws = self.manager.get_connection_by_user_in_room(ice.room_id, ice.to_user_id)
             payload = {
                 "from_user_id": user.id,
                 "candidate": ice.candidate,
             }
-            message = WebSocketMessage(event=WebSocketEvent.RTC_ICE_CANDIDATE, data=payload)
-            if target_ws:
-                await self.manager.send_personal_message(message.json(), target_ws)
+            message = event_frame(WebSocketEvent.RTC_ICE_CANDIDATE, payload)
+            await self.manager.send_to_user_in_room(message, ice.room_id, ice.to_user_id, lane=Lane.CONTROL)
         except Exception as e:
-            error_message = WebSocketMessage(
-                event=WebSocketEvent.ERROR,
-                data=ErrorData(error="Failed to forward rtc ice candidate", details=str(e)).dict()
-            )
-            await self.manager.send_personal_message(error_message.json(), websocket)
\ No newline at end of file
+            await self._send_error(websocket, "Failed to forward rtc ice candidate", str(e))
\ No newline at end of file
@@ -0,0 +1,188 @@
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Optional, Union
+
+import pydantic_core
+from pydantic import BaseModel
+
+try:
+    import msgpack
+except ImportError:  # msgpack는 선택 의존성 – 없으면 JSON만 협상
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # orjson이 없으면 pydantic-core의 JSON 직렬화기로 대체
+    orjson = None
+
+Frame = Union[str, bytes]
+
+SUBPROTOCOL_MSGPACK = "cafe.msgpack"
+
+
+if orjson is not None:
+    dumps_bytes = orjson.dumps
+    loads = orjson.loads
+else:
+    dumps_bytes = pydantic_core.to_json
+    loads = json.loads
+
+
+class Codec:
+    """Wire format of one WebSocket connection"""
+    name = "json"
+    subprotocol: Optional[str] = None
+    binary = False
+
+    def encode(self, payload: Dict[str, Any]) -> Frame:
+        return dumps_bytes(payload).decode("utf-8")
+
+    def decode(self, data: Frame) -> Dict[str, Any]:
+        return loads(data)
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+    subprotocol = SUBPROTOCOL_MSGPACK
+    binary = True
+
+    def encode(self, payload: Dict[str, Any]) -> Frame:
+        # datetime/모델 등 msgpack이 모르는 값은 JSON과 같은 모양으로 바꿔 싣는다
+        return msgpack.packb(payload, use_bin_type=True, default=pydantic_core.to_jsonable_python)
+
+    def decode(self, data: Frame) -> Dict[str, Any]:
+        return msgpack.unpackb(data, raw=False)
+
+
+JSON_CODEC = Codec()
+MSGPACK_CODEC = MsgpackCodec()
+
+
+def negotiate(requested: Any) -> Codec:
+    """Pick a codec from the client's Sec-WebSocket-Protocol list"""
+    if msgpack is not None and requested and SUBPROTOCOL_MSGPACK in requested:
+        return MSGPACK_CODEC
+    return JSON_CODEC
+
+
+class OutboundFrame:
+    """One outbound message, encoded at most once per codec.
+
+    Built either from a JSON-safe payload dict or from already-encoded JSON
+    text; the JSON text is parsed only if a binary client needs it.
+    """
+    __slots__ = ("_payload", "_encoded")
+
+    def __init__(self, payload: Optional[Dict[str, Any]] = None, text: Optional[str] = None):
+        self._payload = payload
+        self._encoded: Dict[str, Frame] = {}
+        if text is not None:
+            self._encoded[JSON_CODEC.name] = text
+
+    @property
+    def payload(self) -> Dict[str, Any]:
+        if self._payload is None:
+            self._payload = loads(self._encoded[JSON_CODEC.name])
+        return self._payload
+
+    @property
+    def text(self) -> str:
+        return self.encode(JSON_CODEC)
+
+    @property
+    def cached_text(self) -> Optional[str]:
+        """JSON text if it was already produced, without encoding it"""
+        return self._encoded.get(JSON_CODEC.name)
+
+    def encode(self, codec: Codec) -> Frame:
+        frame = self._encoded.get(codec.name)
+        if frame is None:
+            frame = self._encoded[codec.name] = codec.encode(self.payload)
+        return frame
+
+
+class EventFrame(OutboundFrame):
+    """An ``{"event", "data", "timestamp"}`` envelope kept unencoded until a codec needs it.
+
+    JSON text is written in a single pass; binary codecs pack ``data``
+    directly instead of parsing the JSON text back.
+    """
+    __slots__ = ("event", "data", "stamp", "seq")
+
+    def __init__(self, event: str, data: Any, stamp: str, seq: Optional[int] = None):
+        super().__init__()
+        self.event = event
+        self.data = data
+        self.stamp = stamp
+        self.seq = seq
+
+    @property
+    def payload(self) -> Dict[str, Any]:
+        if self._payload is None:
+            data = self.data
+            if isinstance(data, BaseModel):
+                data = data.__pydantic_serializer__.to_python(data, mode="json")
+            payload = {"seq": self.seq} if self.seq is not None else {}
+            payload.update(event=self.event, data=data, timestamp=self.stamp)
+            self._payload = payload
+        return self._payload
+
+    def encode(self, codec: Codec) -> Frame:
+        frame = self._encoded.get(codec.name)
+        if frame is None:
+            if codec.name == JSON_CODEC.name:
+                frame = self._text()
+            else:
+                frame = codec.encode(self.payload)
+            self._encoded[codec.name] = frame
+        return frame
+
+    def _text(self) -> str:
+        data = self.data
+        if isinstance(data, BaseModel):
+            body = data.__pydantic_serializer__.to_json(data)
+        else:
+            body = dumps_bytes(data)
+        head = _envelope_head(self.event)
+        if self.seq is not None:
+            head = b'{"seq":%d,%s' % (self.seq, head[1:])
+        return b"".join((head, body, b',"timestamp":"', self.stamp.encode("ascii"), b'"}')).decode("utf-8")
+
+    def with_seq(self, seq: int) -> "EventFrame":
+        frame = EventFrame(self.event, self.data, self.stamp, seq)
+        text = self.cached_text
+        if text is not None and self.seq is None:
+            frame._encoded[JSON_CODEC.name] = '{"seq":%d,%s' % (seq, text[1:])
+        return frame
+
+
+_envelope_heads: Dict[str, bytes] = {}
+
+
+def _envelope_head(event: str) -> bytes:
+    head = _envelope_heads.get(event)
+    if head is None:
+        head = _envelope_heads[event] = b'{"event":' + dumps_bytes(event) + b',"data":'
+    return head
+
+
+def event_frame(event: Union[str, Enum], data: Any) -> OutboundFrame:
+    """``{"event", "data", "timestamp"}`` envelope, serialized per codec on first send.
+
+    Same wire shape as ``WebSocketMessage(...).json()``, but pydantic models
+    are written by their compiled serializer and dicts/lists by orjson, with
+    no intermediate ``.dict()`` copy or envelope model.
+    """
+    if isinstance(event, Enum):
+        event = event.value
+    return EventFrame(event, data, datetime.utcnow().isoformat())
+
+
+def encoded_event_frame(event: Union[str, Enum], body: bytes) -> OutboundFrame:
+    """Envelope around a ``data`` value that is already JSON-encoded"""
+    if isinstance(event, Enum):
+        event = event.value
+    stamp = datetime.utcnow().isoformat().encode("ascii")
+    text = b"".join((_envelope_head(event), body, b',"timestamp":"', stamp, b'"}'))
+    return OutboundFrame(text=text.decode("utf-8"))
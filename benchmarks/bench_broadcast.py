@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Broadcast fan-out benchmark: p99 delivery latency vs. room size.
+
+Compares the previous sequential loop (await each send_text in turn) with
+ConnectionManager.broadcast_to_room, both with direct concurrent sends and
+with per-connection outbound queues. Sockets are simulated; each send sleeps
+for a small random delay and one socket per room is deliberately slow.
+
+    python benchmarks/bench_broadcast.py
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.websocket_service import ConnectionManager
+
+ROOM_SIZES = [10, 50, 100, 200]
+BROADCASTS = 20
+SLOW_DELAY = 0.050
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.latencies = []
+        self.started_at = 0.0
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, message: str):
+        await asyncio.sleep(self.delay * random.uniform(0.5, 1.5))
+        self.latencies.append(time.perf_counter() - self.started_at)
+
+    async def send_bytes(self, message: bytes):
+        await self.send_text(message)
+
+
+async def sequential_broadcast(sockets, message):
+    for ws in sockets:
+        try:
+            await ws.send_text(message)
+        except Exception:
+            pass
+
+
+def make_room(size):
+    sockets = [FakeWebSocket(0.0005) for _ in range(size - 1)]
+    sockets.append(FakeWebSocket(SLOW_DELAY))
+    return sockets
+
+
+async def run(size, mode):
+    sockets = make_room(size)
+    manager = ConnectionManager()
+    for ws in sockets:
+        if mode == "queued":
+            await manager.connect(ws, id(ws))
+        await manager.join_room(ws, 1)
+    message = '{"event":"position_updated","data":{"user_id":1,"x":10,"y":20}}'
+    for i in range(BROADCASTS):
+        start = time.perf_counter()
+        for ws in sockets:
+            ws.started_at = start
+        if mode == "sequential":
+            await sequential_broadcast(sockets, message)
+        else:
+            await manager.broadcast_to_room(message, 1)
+        # 큐 모드는 모든 소켓이 받을 때까지 대기
+        while any(len(ws.latencies) <= i for ws in sockets):
+            await asyncio.sleep(0.0005)
+    for ws in sockets:
+        manager.disconnect(ws)
+    latencies = sorted(l for ws in sockets for l in ws.latencies)
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    return p50, p99
+
+
+async def main():
+    print(f"{'room':>6} {'mode':>11} {'p50 ms':>10} {'p99 ms':>10}")
+    for size in ROOM_SIZES:
+        for mode in ("sequential", "concurrent", "queued"):
+            p50, p99 = await run(size, mode)
+            print(f"{size:>6} {mode:>11} {p50 * 1000:>10.2f} {p99 * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Wire codec benchmark: JSON text vs. cafe.msgpack per event type.
+
+Reports encode/decode time per frame and bytes on the wire, then the send
+path as the server runs it: event_frame(event, data) encoded for one codec,
+and for msgpack the old route through JSON text (encode, parse, pack).
+msgpack frames are smaller, but packing them still costs more CPU than orjson.
+
+    python benchmarks/bench_codec.py
+"""
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.ws_codec import JSON_CODEC, MSGPACK_CODEC, event_frame, loads
+
+NOW = datetime.utcnow().isoformat()
+
+
+def user(i):
+    return {"user_id": i, "username": f"user_{i:04d}", "avatar_url": f"https://cdn.example.com/avatars/{i}.png",
+            "x": 100 + i * 7 % 900, "y": 200 + i * 13 % 700}
+
+
+def obj(i):
+    return {"id": i, "type": ("chair", "table", "plant", "balloon")[i % 4], "x": i * 17 % 2000,
+            "y": i * 29 % 2000, "rotation": float(i % 4) * 90.0, "metadata": {"color": "brown"}}
+
+
+EVENTS = {
+    "position_updated": {"event": "position_updated", "data": user(7), "timestamp": NOW},
+    "pd (compact position)": {"event": "pd", "data": [12, 7, 3, -1]},
+    "message_received": {"event": "message_received", "data": {**user(3), "message": "안녕하세요! coffee?", "timestamp": NOW}, "timestamp": NOW},
+    "positions_batch(50)": {"event": "positions_batch", "data": {"room_id": 1, "positions": [user(i) for i in range(50)]}, "timestamp": NOW},
+    "room_state(100u/1000o)": {"event": "room_state", "data": {"room_id": 1, "users": [user(i) for i in range(100)],
+                                                                "objects": [obj(i) for i in range(1000)]}, "timestamp": NOW},
+}
+
+
+def bench(fn, payload):
+    n = max(10, int(2000 / max(1, len(str(payload)) // 200)))
+    return min(timeit.repeat(lambda: fn(payload), number=n, repeat=3)) / n
+
+
+def main():
+    print(f"{'event':<24} {'codec':<8} {'bytes':>8} {'encode us':>10} {'decode us':>10}")
+    for name, payload in EVENTS.items():
+        for codec in (JSON_CODEC, MSGPACK_CODEC):
+            frame = codec.encode(payload)
+            size = len(frame.encode("utf-8")) if isinstance(frame, str) else len(frame)
+            enc = bench(codec.encode, payload)
+            dec = bench(codec.decode, frame)
+            print(f"{name:<24} {codec.name:<8} {size:>8} {enc * 1e6:>10.1f} {dec * 1e6:>10.1f}")
+
+    print()
+    print(f"{'send path (us)':<24} {'json':>10} {'msgpack':>10} {'via json':>10}")
+    for name, payload in EVENTS.items():
+        event, data = payload["event"], payload["data"]
+        json_us = bench(lambda d: event_frame(event, d).encode(JSON_CODEC), data)
+        msgpack_us = bench(lambda d: event_frame(event, d).encode(MSGPACK_CODEC), data)
+        via_json = bench(lambda d: MSGPACK_CODEC.encode(loads(event_frame(event, d).encode(JSON_CODEC))), data)
+        print(f"{name:<24} {json_us * 1e6:>10.1f} {msgpack_us * 1e6:>10.1f} {via_json * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
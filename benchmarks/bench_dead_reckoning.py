@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Movement traffic benchmark: streaming update_position vs. move_intent with
+server dead reckoning.
+
+USERS avatars walk in straight lines through a room with ROOM_OBJECTS
+obstacles for SECONDS of simulated time, picking a new heading every
+TURN_EVERY seconds on average. Streaming clients send update_position at
+SEND_RATE Hz and every frame is fanned out to the rest of the room; intent
+clients send one move_intent per heading and the server only adds a
+correction when an obstacle makes its position drift from the clients'
+extrapolation. Also counts presence writes (every frame vs. every
+INTENT_PERSIST_INTERVAL) and times one tick.
+
+    python benchmarks/bench_dead_reckoning.py
+"""
+import os
+import sys
+import time
+import math
+import random
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import ObjectType
+from app.services.dead_reckoning import INTENT_TICK_HZ, Motion, MotionTracker
+from app.services.occupancy import ROOM_HEIGHT, ROOM_WIDTH, OccupancyGrid
+
+USERS = 100
+ROOM_OBJECTS = 1000
+SECONDS = 30
+TURN_EVERY = 3.0
+SEND_RATE = 20
+SPEED = 160
+
+
+def heading(rnd):
+    angle = rnd.uniform(0, 2 * math.pi)
+    return SPEED * math.cos(angle), SPEED * math.sin(angle)
+
+
+async def main():
+    rnd = random.Random(11)
+    grid = OccupancyGrid(1, [(i, ObjectType.BRICK, rnd.randrange(ROOM_WIDTH), rnd.randrange(ROOM_HEIGHT), 0.0, None)
+                             for i in range(ROOM_OBJECTS)])
+    counts = {"persisted": 0, "corrections": 0}
+
+    async def on_step(room_id, user_id, motion, corrected):
+        counts["persisted"] += 1
+        counts["corrections"] += corrected
+
+    tracker = MotionTracker(on_step, lambda room_id, start, end: grid.sweep(*start, *end))
+
+    def start(user_id, x, y):
+        last[user_id] = (x, y)
+        tracker.set(1, user_id, Motion(x, y, *heading(rnd), now))
+
+    last = {}
+    tick = 1.0 / INTENT_TICK_HZ
+    now = 0.0
+    intents = 0
+    for user_id in range(USERS):
+        while True:
+            x, y = rnd.randrange(ROOM_WIDTH), rnd.randrange(ROOM_HEIGHT)
+            if grid.walkable(x, y):
+                break
+        start(user_id, x, y)
+        intents += 1
+    # 이벤트 루프에 양보하지 않으므로 방의 실시간 틱 루프는 돌지 않는다 – 시뮬레이션 시각으로 step()을 직접 호출
+
+    tick_time = 0.0
+    ticks = int(SECONDS / tick)
+    for _ in range(ticks):
+        now += tick
+        for user_id in range(USERS):
+            if rnd.random() < tick / TURN_EVERY:
+                motion = tracker.get(1, user_id)
+                start(user_id, *(motion.actual if motion is not None else last[user_id]))
+                intents += 1
+        started = time.perf_counter()
+        await tracker.step(1, now)
+        tick_time += time.perf_counter() - started
+        for user_id in range(USERS):
+            motion = tracker.get(1, user_id)
+            if motion is not None:
+                last[user_id] = motion.actual
+
+    streamed_in = USERS * SEND_RATE * SECONDS
+    intent_out = (intents + counts["corrections"]) * (USERS - 1)
+    print(f"room: {USERS} walkers, {ROOM_OBJECTS} obstacles, {SECONDS} s, new heading every ~{TURN_EVERY:.0f} s")
+    print(f"{'':<22} {'inbound':>10} {'outbound':>12} {'presence writes':>16}")
+    print(f"{'update_position':<22} {streamed_in:>10} {streamed_in * (USERS - 1):>12} {streamed_in:>16}")
+    print(f"{'move_intent':<22} {intents:>10} {intent_out:>12} {counts['persisted']:>16}")
+    print(f"corrections: {counts['corrections']}, tick for {USERS} motions: {tick_time / ticks * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Inbound dispatch benchmark: Enum + if/elif chain + Model(**data) +
+WebSocketMessage(...).json() vs. the route table (pre-built TypeAdapters)
++ single-pass envelope encoder.
+
+Each iteration decodes one client frame, finds its handler, validates the
+payload and serializes the outbound envelope the handler would send.
+
+    python benchmarks/bench_dispatch.py
+"""
+import os
+import sys
+import json
+import timeit
+import warnings
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.schemas.websocket import (
+    WebSocketMessage, WebSocketEvent, JoinRoomMessage, LeaveRoomMessage, UpdatePositionMessage,
+    SendMessageData, UseToolData, UserPositionData, ChatMessageData, ToolUsageData,
+    GetRoomStateData, RtcJoinData, RtcLeaveData, RtcOfferData, RtcAnswerData, RtcIceCandidateData,
+)
+from app.schemas.inventory import InventoryPlaceRequest
+from app.services.websocket_service import _ROUTES, _ADAPTERS
+from app.services.ws_codec import JSON_CODEC, event_frame
+
+NOW = datetime.utcnow()
+USER = {"id": 7, "username": "user_0007", "avatar_url": "https://cdn.example.com/avatars/7.png"}
+
+FRAMES = {
+    "update_position": {"event": "update_position", "data": {"room_id": 1, "x": 120, "y": 340}},
+    "join_room": {"event": "join_room", "data": {"room_id": 1, "x": 10, "y": 20}},
+    "send_message": {"event": "send_message", "data": {"room_id": 1, "message": "안녕하세요! coffee?"}},
+    "use_tool": {"event": "use_tool", "data": {"room_id": 1, "target_object_id": 42, "action": "move"}},
+    "rtc_offer": {"event": "rtc_offer", "data": {"room_id": 1, "to_user_id": 9, "sdp": "v=0\r\n" * 40}},
+    "rtc_ice_candidate": {"event": "rtc_ice_candidate", "data": {"room_id": 1, "to_user_id": 9,
+                                                               "candidate": {"candidate": "candidate:1 1 udp 2122260223 10.0.0.2 54321 typ host",
+                                                                             "sdpMid": "0", "sdpMLineIndex": 0}}},
+}
+RAW = {name: json.dumps(frame) for name, frame in FRAMES.items()}
+
+
+# --- 기존 경로: 응답 구성은 핸들러 본문과 동일 -------------------------------
+
+def legacy_position(data):
+    position_data = UpdatePositionMessage(**data)
+    user_data = UserPositionData(user_id=USER["id"], username=USER["username"], avatar_url=USER["avatar_url"],
+                                 x=position_data.x, y=position_data.y)
+    return WebSocketMessage(event=WebSocketEvent.POSITION_UPDATED, data=user_data.dict()).json()
+
+
+def legacy_join(data):
+    join_data = JoinRoomMessage(**data)
+    user_data = UserPositionData(user_id=USER["id"], username=USER["username"], avatar_url=USER["avatar_url"],
+                                 x=join_data.x, y=join_data.y)
+    return WebSocketMessage(event=WebSocketEvent.USER_JOINED, data=user_data.dict()).json()
+
+
+def legacy_message(data):
+    message_data = SendMessageData(**data)
+    chat_data = ChatMessageData(user_id=USER["id"], username=USER["username"], avatar_url=USER["avatar_url"],
+                                message=message_data.message, timestamp=NOW)
+    return WebSocketMessage(event=WebSocketEvent.MESSAGE_RECEIVED, data=chat_data.dict()).json()
+
+
+def legacy_tool(data):
+    tool_data = UseToolData(**data)
+    usage = ToolUsageData(user_id=USER["id"], username=USER["username"], target_object_id=tool_data.target_object_id,
+                          action=tool_data.action, timestamp=NOW)
+    return WebSocketMessage(event=WebSocketEvent.TOOL_USED, data=usage.dict()).json()
+
+
+def legacy_offer(data):
+    offer = RtcOfferData(**data)
+    return WebSocketMessage(event=WebSocketEvent.RTC_OFFER, data={"from_user_id": USER["id"], "sdp": offer.sdp}).json()
+
+
+def legacy_ice(data):
+    ice = RtcIceCandidateData(**data)
+    return WebSocketMessage(event=WebSocketEvent.RTC_ICE_CANDIDATE,
+                            data={"from_user_id": USER["id"], "candidate": ice.candidate}).json()
+
+
+def legacy_noop(data):
+    return None
+
+
+def legacy(raw):
+    message = json.loads(raw)
+    event_val = message.get("event")
+    data = message.get("data", {})
+    try:
+        event = WebSocketEvent(event_val) if isinstance(event_val, str) else event_val
+    except Exception:
+        event = None
+    if event == WebSocketEvent.JOIN_ROOM:
+        return legacy_join(data)
+    elif event == WebSocketEvent.LEAVE_ROOM:
+        return legacy_noop(LeaveRoomMessage(**data))
+    elif event == WebSocketEvent.UPDATE_POSITION:
+        return legacy_position(data)
+    elif event == WebSocketEvent.SEND_MESSAGE:
+        return legacy_message(data)
+    elif event == WebSocketEvent.USE_TOOL:
+        return legacy_tool(data)
+    elif event == "place_object":
+        return legacy_noop(InventoryPlaceRequest(**data))
+    elif event == "get_inventory":
+        return legacy_noop(data)
+    elif event == "get_room_state":
+        return legacy_noop(GetRoomStateData(**data))
+    elif event == WebSocketEvent.RTC_JOIN:
+        return legacy_noop(RtcJoinData(**data))
+    elif event == WebSocketEvent.RTC_LEAVE:
+        return legacy_noop(RtcLeaveData(**data))
+    elif event == WebSocketEvent.RTC_OFFER:
+        return legacy_offer(data)
+    elif event == WebSocketEvent.RTC_ANSWER:
+        return legacy_noop(RtcAnswerData(**data))
+    elif event == WebSocketEvent.RTC_ICE_CANDIDATE:
+        return legacy_ice(data)
+    return None
+
+
+# --- 라우트 테이블 경로 -------------------------------------------------------
+
+def fast_position(p):
+    return event_frame(WebSocketEvent.POSITION_UPDATED, UserPositionData(
+        user_id=USER["id"], username=USER["username"], avatar_url=USER["avatar_url"], x=p.x, y=p.y)).text
+
+
+def fast_join(p):
+    return event_frame(WebSocketEvent.USER_JOINED, UserPositionData(
+        user_id=USER["id"], username=USER["username"], avatar_url=USER["avatar_url"], x=p.x, y=p.y)).text
+
+
+def fast_message(p):
+    return event_frame(WebSocketEvent.MESSAGE_RECEIVED, ChatMessageData(
+        user_id=USER["id"], username=USER["username"], avatar_url=USER["avatar_url"], message=p.message, timestamp=NOW)).text
+
+
+def fast_tool(p):
+    return event_frame(WebSocketEvent.TOOL_USED, ToolUsageData(
+        user_id=USER["id"], username=USER["username"], target_object_id=p.target_object_id, action=p.action, timestamp=NOW)).text
+
+
+def fast_offer(p):
+    return event_frame(WebSocketEvent.RTC_OFFER, {"from_user_id": USER["id"], "sdp": p.sdp}).text
+
+
+def fast_ice(p):
+    return event_frame(WebSocketEvent.RTC_ICE_CANDIDATE, {"from_user_id": USER["id"], "candidate": p.candidate}).text
+
+
+FAST_HANDLERS = {
+    "update_position": fast_position, "join_room": fast_join, "send_message": fast_message,
+    "use_tool": fast_tool, "rtc_offer": fast_offer, "rtc_ice_candidate": fast_ice,
+}
+ROUTES = {event: (_ADAPTERS.get(model), FAST_HANDLERS.get(event)) for event, _, model, *_ in _ROUTES}
+
+
+def fast(raw):
+    message = JSON_CODEC.decode(raw)
+    route = ROUTES.get(message.get("event"))
+    if route is None:
+        return None
+    adapter, handler = route
+    payload = adapter.validate_python(message.get("data", {})) if adapter is not None else None
+    return handler(payload) if handler is not None else None
+
+
+def bench(fn, raw, number=5000):
+    return min(timeit.repeat(lambda: fn(raw), number=number, repeat=5)) / number
+
+
+def main():
+    # 기존 경로는 pydantic v1 스타일 .dict()/.json()을 그대로 재현한다
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    print(f"{'event':<20} {'legacy us':>10} {'routed us':>10} {'speedup':>8}")
+    for name, raw in RAW.items():
+        old = bench(legacy, raw)
+        new = bench(fast, raw)
+        print(f"{name:<20} {old * 1e6:>10.2f} {new * 1e6:>10.2f} {old / new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+LOD room_state benchmark: a room spammed with balloons and bricks.
+
+Builds a RoomState with SPAM_OBJECTS objects packed into a few clusters
+plus SCATTERED single objects, then compares the full room_state with the
+LOD one seen from one corner (size in bytes and objects on the wire), and
+times incremental place/destroy against rebuilding the LOD index.
+
+    python benchmarks/bench_lod.py
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.room_state_cache import ROOM_STATE_LOD_CELL, RoomState
+from app.services.ws_codec import loads
+
+SPAM_OBJECTS = 5000
+CLUSTERS = 8
+SCATTERED = 200
+CHANGES = 2000
+
+
+def rows(rnd):
+    result = []
+    for i in range(SPAM_OBJECTS):
+        cluster = i % CLUSTERS
+        cx, cy = 400 + cluster * 600, 2000 + (cluster % 3) * 600
+        result.append((i, "balloon" if cluster % 2 else "brick",
+                       cx + rnd.randrange(120), cy + rnd.randrange(120), 0, '{"color": "red"}'))
+    for i in range(SCATTERED):
+        result.append((SPAM_OBJECTS + i, "chair", rnd.randrange(5000), rnd.randrange(5000), 0, None))
+    return result
+
+
+def main():
+    rnd = random.Random(7)
+    objects = rows(rnd)
+    state = RoomState(1, [(1, (0, 0, "viewer"))], objects)
+    viewer = state.lod_cell(0, 0)
+
+    full = state.frame().text
+    lod = state.lod_frame(viewer).text
+    data = loads(lod)["data"]
+    print(f"room: {len(objects)} objects, LOD cell {ROOM_STATE_LOD_CELL}")
+    print(f"{'room_state':<12} {'bytes':>10} {'objects':>8} {'aggregates':>11}")
+    print(f"{'full':<12} {len(full.encode('utf-8')):>10} {len(objects):>8} {0:>11}")
+    print(f"{'lod':<12} {len(lod.encode('utf-8')):>10} {len(data['objects']):>8} {len(data['aggregates']):>11}")
+
+    live = {row[0]: row for row in objects}
+    started = time.perf_counter()
+    for step in range(CHANGES):
+        object_id = SPAM_OBJECTS + SCATTERED + step
+        row = (object_id, "balloon", 400 + rnd.randrange(120), 2000 + rnd.randrange(120), 0, None)
+        state.put_object(row)
+        live[object_id] = row
+        if step % 2:
+            state.remove_object(object_id - 1)
+            del live[object_id - 1]
+        state.lod_frame(viewer)
+    incremental = (time.perf_counter() - started) / CHANGES
+
+    started = time.perf_counter()
+    for _ in range(20):
+        RoomState(1, [(1, (0, 0, "viewer"))], live.values()).lod_frame(viewer)
+    rebuild = (time.perf_counter() - started) / 20
+
+    def aggregates(s):
+        return sorted((a["cx"], a["cy"], a["type"], a["count"], a["bbox"]) for a in loads(s.lod_frame(viewer).text)["data"]["aggregates"])
+
+    assert aggregates(state) == aggregates(RoomState(1, [], live.values()))
+    print(f"{'per change':<24} {'us':>10}")
+    print(f"{'incremental + frame':<24} {incremental * 1e6:>10.1f}")
+    print(f"{'rebuild + frame':<24} {rebuild * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
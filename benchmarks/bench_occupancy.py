@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Collision checking benchmark: scanning every object row vs. the per-room
+occupancy grid.
+
+A room holds ROOM_OBJECTS objects of mixed types. For CHECKS random spots
+the naive path tests the candidate footprint against every object's
+footprint (what validating against Object rows would cost); the grid path
+looks the footprint up in the NumPy array. Also times movement clamping and
+incremental place/destroy against rebuilding the grid.
+
+    python benchmarks/bench_occupancy.py
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import ObjectType
+from app.services.occupancy import OCCUPANCY_CELL, ROOM_HEIGHT, ROOM_WIDTH, OccupancyGrid, footprint
+
+ROOM_OBJECTS = 10000
+CHECKS = 2000
+MOVES = 20000
+CHANGES = 5000
+TYPES = [ObjectType.CHAIR, ObjectType.TABLE, ObjectType.DESK, ObjectType.PLANT, ObjectType.BRICK, ObjectType.WALL]
+
+
+def rows(rnd):
+    return [(i, rnd.choice(TYPES), rnd.randrange(ROOM_WIDTH), rnd.randrange(ROOM_HEIGHT), rnd.choice([0.0, 90.0]), None)
+            for i in range(ROOM_OBJECTS)]
+
+
+def naive_can_place(objects, object_type, x, y, rotation):
+    """Overlap test against every object row"""
+    width, height = footprint(object_type, rotation)
+    col, row = x // OCCUPANCY_CELL, y // OCCUPANCY_CELL
+    if col + width > -(-ROOM_WIDTH // OCCUPANCY_CELL) or row + height > -(-ROOM_HEIGHT // OCCUPANCY_CELL):
+        return False
+    for _, other_type, ox, oy, other_rotation, _ in objects:
+        other_width, other_height = footprint(other_type, other_rotation)
+        other_col, other_row = ox // OCCUPANCY_CELL, oy // OCCUPANCY_CELL
+        if (col < other_col + other_width and other_col < col + width
+                and row < other_row + other_height and other_row < row + height):
+            return False
+    return True
+
+
+def timed(fn, count):
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) / count
+
+
+def main():
+    rnd = random.Random(3)
+    objects = rows(rnd)
+    grid = OccupancyGrid(1, objects)
+    spots = [(rnd.choice(TYPES), rnd.randrange(ROOM_WIDTH), rnd.randrange(ROOM_HEIGHT), 0.0) for _ in range(CHECKS)]
+
+    naive = timed(lambda: [naive_can_place(objects, *spot) for spot in spots], CHECKS)
+    lookups = timed(lambda: [grid.can_place(*spot) for spot in spots], CHECKS)
+    assert [naive_can_place(objects, *spot) for spot in spots] == [grid.can_place(*spot) for spot in spots]
+
+    steps = [(rnd.randrange(ROOM_WIDTH), rnd.randrange(ROOM_HEIGHT), rnd.randrange(-8, 9), rnd.randrange(-8, 9))
+             for _ in range(MOVES)]
+    clamp = timed(lambda: [grid.clamp_move(x, y, x + dx, y + dy) for x, y, dx, dy in steps], MOVES)
+
+    def churn():
+        for step in range(CHANGES):
+            object_id = ROOM_OBJECTS + step
+            grid.place(object_id, rnd.choice(TYPES), rnd.randrange(ROOM_WIDTH), rnd.randrange(ROOM_HEIGHT))
+            grid.remove(object_id - 1)
+
+    incremental = timed(churn, CHANGES)
+    rebuild = timed(lambda: [OccupancyGrid(1, objects) for _ in range(5)], 5)
+
+    print(f"room: {ROOM_OBJECTS} objects, grid {grid.shape[1]}x{grid.shape[0]} cells of {OCCUPANCY_CELL}")
+    print(f"{'operation':<32} {'us':>10}")
+    print(f"{'can_place: scan every object':<32} {naive * 1e6:>10.1f}")
+    print(f"{'can_place: grid lookup':<32} {lookups * 1e6:>10.1f}")
+    print(f"{'clamp_move':<32} {clamp * 1e6:>10.1f}")
+    print(f"{'place + destroy (incremental)':<32} {incremental * 1e6:>10.1f}")
+    print(f"{'rebuild grid from rows':<32} {rebuild * 1e6:>10.1f}")
+    print(f"speedup {naive / lookups:.0f}x per placement check")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Click-to-move benchmark: A* on the occupancy grid, cold vs. cached, and
+frames per move compared to streaming update_position.
+
+A room of ROOM_OBJECTS random objects; ROUTES random (start, goal) pairs
+are routed once cold and then REPEATS more times (the same clicks as other
+users would make), then an object is placed to show the grid version
+invalidating the cache. Frames per move counts the update_position events
+a client sending at SEND_RATE Hz would need for the same walk.
+
+    python benchmarks/bench_pathfinding.py
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import ObjectType
+from app.services.occupancy import ROOM_HEIGHT, ROOM_WIDTH, OccupancyGrid
+from app.services.pathfinding import PathCache, Walk
+
+ROOM_OBJECTS = 3000
+ROUTES = 200
+REPEATS = 5
+SEND_RATE = 20
+TYPES = [ObjectType.CHAIR, ObjectType.TABLE, ObjectType.DESK, ObjectType.BRICK, ObjectType.WALL]
+
+
+def free_point(grid, rnd):
+    while True:
+        x, y = rnd.randrange(ROOM_WIDTH), rnd.randrange(ROOM_HEIGHT)
+        if grid.walkable(x, y):
+            return x, y
+
+
+def main():
+    rnd = random.Random(5)
+    grid = OccupancyGrid(1, [(i, rnd.choice(TYPES), rnd.randrange(ROOM_WIDTH), rnd.randrange(ROOM_HEIGHT), 0.0, None)
+                             for i in range(ROOM_OBJECTS)])
+    clicks = [(free_point(grid, rnd), free_point(grid, rnd)) for _ in range(ROUTES)]
+    cache = PathCache()
+
+    started = time.perf_counter()
+    routes = [cache.route(grid, start, goal) for start, goal in clicks]
+    cold = (time.perf_counter() - started) / ROUTES
+
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        for start, goal in clicks:
+            cache.route(grid, start, goal)
+    warm = (time.perf_counter() - started) / (ROUTES * REPEATS)
+
+    found = [route for route in routes if route is not None]
+    walks = [Walk(route) for route in found]
+    streamed = sum(max(1, round(walk.duration * SEND_RATE)) for walk in walks) / len(walks)
+    corners = sum(len(route) for route in found) / len(found)
+
+    misses = cache.misses
+    grid.place(ROOM_OBJECTS, ObjectType.CHAIR, *free_point(grid, rnd))
+    cache.route(grid, *clicks[0])
+    assert cache.misses == misses + 1, "a new grid version must miss the cache"
+
+    print(f"room: {ROOM_OBJECTS} objects, grid {grid.shape[1]}x{grid.shape[0]}, {len(found)}/{ROUTES} reachable")
+    print(f"{'route':<24} {'us':>10}")
+    print(f"{'A* + smoothing (cold)':<24} {cold * 1e6:>10.1f}")
+    print(f"{'cached':<24} {warm * 1e6:>10.1f}")
+    print(f"per move: {streamed:.0f} update_position frames at {SEND_RATE} Hz vs 1 user_path "
+          f"({corners:.1f} waypoints, {sum(w.duration for w in walks) / len(walks):.1f} s walk)")
+
+
+if __name__ == "__main__":
+    main()
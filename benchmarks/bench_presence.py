@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Position write benchmark: one SELECT + UPDATE + COMMIT + REFRESH per move
+vs. the in-memory presence store with a periodic bulk flush.
+
+Runs against a throwaway SQLite file (RoomService.get_session is pointed at
+it, so no database server is needed), with ROOM_USERS users each moving MOVES_PER_USER times. The store path flushes
+every FLUSH_EVERY moves, which stands in for PRESENCE_FLUSH_INTERVAL.
+
+    python benchmarks/bench_presence.py
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Room, RoomUser, User
+from app.services import room_service as room_service_module
+from app.services.presence_store import presence_store
+from app.services.room_service import RoomService
+
+engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_presence.db')}")
+get_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+room_service_module.get_session = get_session
+
+ROOM_USERS = 200
+MOVES_PER_USER = 25
+FLUSH_EVERY = 1000
+
+
+def setup():
+    Base.metadata.create_all(bind=engine, tables=[User.__table__, Room.__table__, RoomUser.__table__])
+    with get_session() as db:
+        owner = User(username="owner")
+        db.add(owner)
+        db.flush()
+        room = Room(name="bench", owner_id=owner.id)
+        db.add(room)
+        users = [User(username=f"user_{i:04d}")
+                 for i in range(ROOM_USERS)]
+        db.add_all(users)
+        db.commit()
+        return room.id, [u.id for u in users]
+
+
+async def legacy_move(user_id: int, room_id: int, x: int, y: int):
+    """The previous update_user_position"""
+    with get_session() as db:
+        room_user = db.query(RoomUser).filter(
+            RoomUser.room_id == room_id,
+            RoomUser.user_id == user_id
+        ).first()
+        if room_user:
+            room_user.x = x
+            room_user.y = y
+            db.commit()
+            db.refresh(room_user)
+        return room_user
+
+
+async def run(room_id, user_ids, move, flush=None):
+    moves = 0
+    started = time.perf_counter()
+    for step in range(MOVES_PER_USER):
+        for user_id in user_ids:
+            await move(user_id, room_id, step, user_id % 97)
+            moves += 1
+            if flush is not None and moves % FLUSH_EVERY == 0:
+                await flush()
+    if flush is not None:
+        await flush()
+    return moves / (time.perf_counter() - started)
+
+
+async def main():
+    room_id, user_ids = setup()
+    service = RoomService()
+    for user_id in user_ids:
+        await service.join_room(user_id, room_id)
+
+    legacy = await run(room_id, user_ids, legacy_move)
+    store = await run(room_id, user_ids, service.update_user_position, service.flush_positions)
+    presence_store.stop()
+
+    # 마지막 flush 이후 DB와 메모리가 같은지 확인
+    with get_session() as db:
+        rows = {ru.user_id: (ru.x, ru.y) for ru in db.query(RoomUser).filter(RoomUser.room_id == room_id)}
+    mismatched = sum(1 for p in presence_store.room(room_id) if rows.get(p.user_id) != (p.x, p.y))
+
+    print(f"{'path':<28} {'moves/s':>10}")
+    print(f"{'select+update+commit':<28} {legacy:>10.0f}")
+    print(f"{'store + bulk flush':<28} {store:>10.0f}")
+    print(f"speedup {store / legacy:.1f}x, rows out of sync after flush: {mismatched}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Connection lookup micro-benchmark.
+
+Compares the previous parallel-dict structure, where
+get_connection_by_user_in_room scanned every socket in the room, with the
+indexed ConnectionRegistry.
+
+    python benchmarks/bench_registry.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.connection_registry import ConnectionRegistry
+
+ROOM_SIZES = [10, 100, 500, 2000]
+LOOKUPS = 20000
+
+
+class LegacyManager:
+    """Parallel dicts + linear scan, as before the registry"""
+
+    def __init__(self):
+        self.active_connections = {}
+        self.connection_users = {}
+        self.connection_rooms = {}
+
+    def add(self, websocket, user_id, room_id):
+        self.connection_users[websocket] = user_id
+        self.active_connections.setdefault(room_id, set()).add(websocket)
+        self.connection_rooms[websocket] = room_id
+
+    def get_connection_by_user_in_room(self, room_id, target_user_id):
+        if room_id not in self.active_connections:
+            return None
+        for connection in self.active_connections[room_id]:
+            if self.connection_users.get(connection) == target_user_id:
+                return connection
+        return None
+
+
+def main():
+    print(f"{'room':>6} {'legacy us':>11} {'registry us':>12} {'speedup':>8}")
+    for size in ROOM_SIZES:
+        legacy = LegacyManager()
+        registry = ConnectionRegistry()
+        for user_id in range(size):
+            ws = object()
+            legacy.add(ws, user_id, 1)
+            registry.set_room(registry.add(ws, user_id), 1)
+        targets = [(i * 7919) % size for i in range(LOOKUPS)]
+
+        def run_legacy():
+            for t in targets:
+                legacy.get_connection_by_user_in_room(1, t)
+
+        def run_registry():
+            for t in targets:
+                registry.latest_for_user_in_room(1, t)
+
+        legacy_t = min(timeit.repeat(run_legacy, number=1, repeat=3)) / LOOKUPS
+        registry_t = min(timeit.repeat(run_registry, number=1, repeat=3)) / LOOKUPS
+        print(f"{size:>6} {legacy_t * 1e6:>11.3f} {registry_t * 1e6:>12.3f} {legacy_t / registry_t:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
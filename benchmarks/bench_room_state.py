@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Join burst benchmark: rebuilding room_state per join vs. the materialized,
+pre-serialized RoomState.
+
+A room with ROOM_USERS users and ROOM_OBJECTS objects lives in a throwaway
+SQLite file. Each round, a few users move and then REJOINS users re-join;
+the rebuild path queries and encodes room_state for every join, the cached
+path re-assembles the frame once per change and hands the same buffer to
+every join after it. Also prints the zlib size of the frame.
+
+    python benchmarks/bench_room_state.py
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Object, ObjectType, Room, RoomUser, User
+from app.services import room_service as room_service_module
+from app.services import room_snapshot as room_snapshot_module
+from app.services.presence_store import presence_store
+from app.services.room_service import RoomService
+from app.services.room_snapshot import object_payload
+from app.services.room_state_cache import RoomStateCache
+from app.services.ws_codec import event_frame, loads
+
+ROOM_USERS = 100
+ROOM_OBJECTS = 300
+ROUNDS = 20
+MOVES_PER_ROUND = 5
+REJOINS = 40
+
+engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'room_state.db')}")
+get_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+room_service_module.get_session = get_session
+room_snapshot_module.get_session = get_session
+
+
+def setup():
+    Base.metadata.create_all(bind=engine, tables=[User.__table__, Room.__table__, RoomUser.__table__, Object.__table__])
+    with get_session() as db:
+        users = [User(username=f"user_{i:04d}") for i in range(ROOM_USERS)]
+        db.add_all(users)
+        db.flush()
+        room = Room(name="bench", owner_id=users[0].id)
+        db.add(room)
+        db.flush()
+        db.add_all([Object(room_id=room.id, type=ObjectType.TABLE, x=i * 8, y=i * 4,
+                           meta_json='{"color": "oak", "seats": 4}') for i in range(ROOM_OBJECTS)])
+        db.commit()
+        return room.id, [u.id for u in users]
+
+
+async def rebuild(service, room_id):
+    """room_state as built per join before the cache"""
+    users = [
+        {"user_id": ru["user_id"], "x": ru["x"], "y": ru["y"], "username": ru["user"]["username"]}
+        for ru in await service.get_room_users(room_id)
+    ]
+    objects = [object_payload(row) for row in service.snapshots.objects(room_id)]
+    return event_frame("room_state", {"room_id": room_id, "users": users, "objects": objects}).text
+
+
+async def run(service, room_id, user_ids, join):
+    started = time.perf_counter()
+    for step in range(ROUNDS):
+        for user_id in user_ids[:MOVES_PER_ROUND]:
+            await service.update_user_position(user_id, room_id, step, step)
+        for _ in range(REJOINS):
+            await join()
+    return (time.perf_counter() - started) / (ROUNDS * REJOINS)
+
+
+async def main():
+    room_id, user_ids = setup()
+    service = RoomService()
+    service.presence_cache = None
+    for user_id in user_ids:
+        await service.join_room(user_id, room_id, 1, 1)
+
+    cache = RoomStateCache()
+    # RoomService가 갱신하는 전역 room_states 대신 이 캐시를 쓰도록 연결
+    room_service_module.room_states = cache
+
+    old = await run(service, room_id, user_ids, lambda: rebuild(service, room_id))
+
+    async def cached():
+        return (await cache.get(room_id, service.load_room_state)).frame().text
+
+    new = await run(service, room_id, user_ids, cached)
+    presence_store.stop()
+
+    fresh = loads(await rebuild(service, room_id))["data"]
+    state = await cache.get(room_id, service.load_room_state)
+    data = loads(state.frame().text)["data"]
+    assert sorted(data["users"], key=lambda u: u["user_id"]) == sorted(fresh["users"], key=lambda u: u["user_id"])
+    assert data["objects"] == fresh["objects"]
+
+    size = len(state.frame().text.encode("utf-8"))
+    compressed = state.compressed(min_size=1)
+    print(f"room: {ROOM_USERS} users, {ROOM_OBJECTS} objects, frame {size} B, zlib {len(compressed)} B")
+    print(f"{'path':<24} {'us/join':>10}")
+    print(f"{'rebuild per join':<24} {old * 1e6:>10.1f}")
+    print(f"{'materialized state':<24} {new * 1e6:>10.1f}")
+    print(f"speedup {old / new:.1f}x (loads: {cache.loads}, hits: {cache.hits})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
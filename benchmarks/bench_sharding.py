@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Room sharding rebalance check: share of rooms that change owner when a
+worker is added, and how evenly rooms are spread.
+
+    python benchmarks/bench_sharding.py
+"""
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.room_sharding import HashRing
+
+ROOMS = 100000
+
+
+def owners(ring):
+    return [ring.get(f"room:{room_id}") for room_id in range(ROOMS)]
+
+
+def main():
+    print(f"{'workers':>8} {'moved %':>9} {'ideal %':>9} {'max/avg load':>13}")
+    for n in (2, 4, 8, 16):
+        before = HashRing([f"worker-{i}" for i in range(n)])
+        after = HashRing([f"worker-{i}" for i in range(n + 1)])
+        a, b = owners(before), owners(after)
+        moved = sum(1 for x, y in zip(a, b) if x != y) / ROOMS
+        load = Counter(b)
+        imbalance = max(load.values()) / (ROOMS / (n + 1))
+        print(f"{n}->{n + 1:<5} {moved * 100:>9.2f} {100 / (n + 1):>9.2f} {imbalance:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
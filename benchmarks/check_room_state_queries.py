@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Query-count check for the room_state snapshot.
+
+Builds rooms of increasing size in a throwaway SQLite file and counts the
+SQL statements needed to load a room's users and objects, both the old way
+(RoomUser rows + one User query per user + ORM Objects) and through
+RoomService.get_room_users / RoomSnapshotRepository with a cold presence
+store. Exits with status 1 if the new path's count changes with room size.
+
+    python benchmarks/check_room_state_queries.py
+"""
+import os
+import sys
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Object, ObjectType, Room, RoomUser, User
+from app.services import room_service as room_service_module
+from app.services import room_snapshot as room_snapshot_module
+from app.services.room_service import RoomService
+from app.services.room_snapshot import object_payload
+
+ROOM_SIZES = [1, 10, 100, 500]
+
+engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'room_state.db')}")
+get_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+room_service_module.get_session = get_session
+room_snapshot_module.get_session = get_session
+
+statements = 0
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+def setup():
+    Base.metadata.create_all(bind=engine, tables=[User.__table__, Room.__table__, RoomUser.__table__, Object.__table__])
+    rooms = {}
+    with get_session() as db:
+        owner = User(username="owner")
+        db.add(owner)
+        db.flush()
+        for size in ROOM_SIZES:
+            room = Room(name=f"room_{size}", owner_id=owner.id)
+            db.add(room)
+            users = [User(username=f"r{size}_u{i}", avatar_url=f"/a/{i}.png") for i in range(size)]
+            db.add_all(users)
+            db.flush()
+            db.add_all([RoomUser(room_id=room.id, user_id=u.id, x=i, y=i) for i, u in enumerate(users)])
+            db.add_all([Object(room_id=room.id, type=ObjectType.CHAIR, x=i, y=i, meta_json='{"color": "red"}')
+                         for i in range(size)])
+            rooms[size] = room.id
+        db.commit()
+    return rooms
+
+
+def legacy(room_id):
+    """The previous _handle_get_room_state"""
+    with get_session() as db:
+        users = db.query(RoomUser).filter(RoomUser.room_id == room_id).all()
+        users_payload = [
+            {"user_id": ru.user_id, "x": ru.x, "y": ru.y,
+             "username": db.query(User).filter(User.id == ru.user_id).first().username}
+            for ru in users
+        ]
+        objects = db.query(Object).filter(Object.room_id == room_id).all()
+        objects_payload = [
+            {"id": o.id, "type": o.type.value, "x": o.x, "y": o.y, "rotation": o.rotation, "metadata": o.get_metadata()}
+            for o in objects
+        ]
+        return users_payload, objects_payload
+
+
+async def snapshot(service, room_id):
+    users = await service.get_room_users(room_id)
+    objects = [object_payload(row) for row in service.snapshots.objects(room_id)]
+    return users, objects
+
+
+def counted(fn, *args):
+    global statements
+    statements = 0
+    result = fn(*args)
+    if asyncio.iscoroutine(result):
+        result = asyncio.run(result)
+    return statements, result
+
+
+def main():
+    rooms = setup()
+    service = RoomService()
+    service.presence_cache = None
+    print(f"{'room size':>10} {'legacy queries':>15} {'snapshot queries':>17}")
+    counts = set()
+    for size, room_id in rooms.items():
+        old, (old_users, old_objects) = counted(legacy, room_id)
+        new, (new_users, new_objects) = counted(snapshot, service, room_id)
+        assert sorted(u["user_id"] for u in old_users) == sorted(u["user_id"] for u in new_users)
+        assert {u["username"] for u in old_users} == {u["user"]["username"] for u in new_users}
+        assert old_objects == new_objects
+        counts.add(new)
+        print(f"{size:>10} {old:>15} {new:>17}")
+    if len(counts) != 1:
+        print("FAIL: snapshot query count grows with room size")
+        sys.exit(1)
+    print(f"OK: {counts.pop()} queries regardless of room size")
+
+
+if __name__ == "__main__":
+    main()
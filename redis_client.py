@@ -1,68 +1,135 @@
 import redis
+import redis.asyncio as aioredis
 import json
 import os
+import time
 from dotenv import load_dotenv
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List
 
 load_dotenv()
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+# presence 항목이 갱신 없이 살아 있는 시간(초) – 죽은 워커의 유저는 이 시간 뒤 사라진다
+ROOM_USER_TTL = int(os.getenv("ROOM_USER_TTL", "60"))
 
 redis_client = redis.from_url(REDIS_URL, decode_responses=True)
 
+# 읽는 동안 다른 워커가 다시 쓴 항목은 지우지 않도록, 값이 그대로인 필드만 HDEL
+_DROP_STALE = """
+local removed = 0
+for i = 1, #ARGV, 2 do
+    if redis.call('HGET', KEYS[1], ARGV[i]) == ARGV[i + 1] then
+        removed = removed + redis.call('HDEL', KEYS[1], ARGV[i])
+    end
+end
+return removed
+"""
+
+# 같은 유저가 그 사이 다시 입장했으면(다른 room_users 행) 그 항목은 남긴다
+_DROP_ROWS = """
+local removed = 0
+for i = 1, #ARGV, 2 do
+    local raw = redis.call('HGET', KEYS[1], ARGV[i])
+    if raw and cjson.decode(raw)['id'] == tonumber(ARGV[i + 1]) then
+        removed = removed + redis.call('HDEL', KEYS[1], ARGV[i])
+    end
+end
+return removed
+"""
+
+
 class RoomUserCache:
+    """Room presence in Redis: one hash per room, one field per user.
+
+    ``room:{id}:users`` maps a user id to a JSON entry stamped with the real
+    time it was written (``ts``). A room is read with a single HGETALL; entries
+    older than ``ttl`` count as gone and are dropped during that read, so the
+    users of a worker that died disappear on their own, and the whole key
+    expires ``ttl`` seconds after its last write. Writes for any number of
+    users and rooms go out as one pipeline.
+    """
+
+    def __init__(self, url: str = REDIS_URL, ttl: int = ROOM_USER_TTL, client: Optional[aioredis.Redis] = None):
+        self.ttl = ttl
+        self._client = client if client is not None else aioredis.from_url(url, decode_responses=True)
+        self._drop_stale = self._client.register_script(_DROP_STALE)
+        self._drop_rows = self._client.register_script(_DROP_ROWS)
+
     @staticmethod
-    def set_user_position(room_id: int, user_id: int, x: int, y: int):
-        """Set user position in room"""
-        key = f"room:{room_id}:user:{user_id}"
-        data = {
-            "x": x,
-            "y": y,
-            "timestamp": json.dumps({"timestamp": "now"})  # You might want to use actual timestamp
-        }
-        redis_client.hset(key, mapping=data)
-        redis_client.expire(key, 300)  # Expire after 5 minutes
-    
-    @staticmethod
-    def get_user_position(room_id: int, user_id: int) -> Optional[Dict[str, Any]]:
-        """Get user position in room"""
-        key = f"room:{room_id}:user:{user_id}"
-        data = redis_client.hgetall(key)
-        if data:
-            return {
-                "x": int(data.get("x", 0)),
-                "y": int(data.get("y", 0)),
-                "timestamp": data.get("timestamp")
-            }
-        return None
-    
-    @staticmethod
-    def get_room_users(room_id: int) -> Dict[str, Dict[str, Any]]:
-        """Get all users in a room"""
-        pattern = f"room:{room_id}:user:*"
-        keys = redis_client.keys(pattern)
-        users = {}
-        for key in keys:
-            user_id = key.split(":")[-1]
-            data = redis_client.hgetall(key)
-            if data:
-                users[user_id] = {
-                    "x": int(data.get("x", 0)),
-                    "y": int(data.get("y", 0)),
-                    "timestamp": data.get("timestamp")
-                }
+    def key(room_id: int) -> str:
+        return f"room:{room_id}:users"
+
+    async def set_users(self, room_users: Dict[int, Dict[int, Dict[str, Any]]]):
+        """Write entries for many users ({room_id: {user_id: entry}}) in one round trip"""
+        now = time.time()
+        pipe = self._client.pipeline(transaction=False)
+        for room_id, users in room_users.items():
+            if not users:
+                continue
+            key = self.key(room_id)
+            pipe.hset(key, mapping={str(user_id): json.dumps({**entry, "ts": now}) for user_id, entry in users.items()})
+            pipe.expire(key, self.ttl)
+        if len(pipe):
+            await pipe.execute()
+
+    async def set_user_position(self, room_id: int, user_id: int, entry: Dict[str, Any]):
+        """Set user entry (position and profile) in room"""
+        await self.set_users({room_id: {user_id: entry}})
+
+    async def get_user_position(self, room_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+        """Get user entry in room, or None if missing or expired"""
+        raw = await self._client.hget(self.key(room_id), str(user_id))
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry if entry.get("ts", 0) >= time.time() - self.ttl else None
+
+    async def get_room_users(self, room_id: int) -> Dict[int, Dict[str, Any]]:
+        """Get all live users in a room ({user_id: entry})"""
+        key = self.key(room_id)
+        raw = await self._client.hgetall(key)
+        cutoff = time.time() - self.ttl
+        users: Dict[int, Dict[str, Any]] = {}
+        stale: List[str] = []
+        for field, value in raw.items():
+            entry = json.loads(value)
+            if entry.get("ts", 0) < cutoff:
+                stale += [field, value]
+            else:
+                users[int(field)] = entry
+        if stale:
+            await self._drop_stale(keys=[key], args=stale)
         return users
-    
-    @staticmethod
-    def remove_user_from_room(room_id: int, user_id: int):
+
+    async def remove_users(self, room_users: Dict[int, Iterable[int]]):
+        """Remove many users ({room_id: user_ids}) in one round trip"""
+        pipe = self._client.pipeline(transaction=False)
+        for room_id, user_ids in room_users.items():
+            fields = [str(user_id) for user_id in user_ids]
+            if fields:
+                pipe.hdel(self.key(room_id), *fields)
+        if len(pipe):
+            await pipe.execute()
+
+    async def remove_rows(self, room_rows: Dict[int, Dict[int, int]]):
+        """Remove users ({room_id: {user_id: room_users row id}}) whose entry still has that row id"""
+        pipe = self._client.pipeline(transaction=False)
+        for room_id, rows in room_rows.items():
+            args: List[Any] = []
+            for user_id, row_id in rows.items():
+                args += [str(user_id), row_id]
+            if args:
+                await self._drop_rows(keys=[self.key(room_id)], args=args, client=pipe)
+        if len(pipe):
+            await pipe.execute()
+
+    async def remove_user_from_room(self, room_id: int, user_id: int):
         """Remove user from room cache"""
-        key = f"room:{room_id}:user:{user_id}"
-        redis_client.delete(key)
-    
-    @staticmethod
-    def clear_room_cache(room_id: int):
+        await self._client.hdel(self.key(room_id), str(user_id))
+
+    async def clear_room_cache(self, room_id: int):
         """Clear all users from a room"""
-        pattern = f"room:{room_id}:user:*"
-        keys = redis_client.keys(pattern)
-        if keys:
-            redis_client.delete(*keys)
+        await self._client.delete(self.key(room_id))
+
+    async def close(self):
+        await self._client.close()